@@ -1,5 +1,16 @@
-from django.contrib import admin
-from core.models import Client, SignupOTP
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from core.bulk import apply_operation
+from core.duplicates import merge_clients
+from core.jobs import enqueue_job
+from core.rollover import rollover_year
+from core.forms import BulkEditForm
+from core.models import Client, SignupOTP, Job, OutboundEmail
 
 # Register your models here.
 @admin.register(Client)
@@ -8,10 +19,151 @@ class ClientAdmin(admin.ModelAdmin):
     list_filter = ['year', 'group']
     search_fields = ['company_name', 'group', 'account_no']
     readonly_fields = ['email', 'months']  # JSONFields are read-only in admin by default
+    actions = ['bulk_edit', 'rollover_to_next_year', 'merge_duplicates']
+    # Adds a "Duplicate report" link above the changelist
+    change_list_template = 'admin/core/client/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('duplicates/', self.admin_site.admin_view(self.duplicates_view), name='core_client_duplicates'),
+        ] + super().get_urls()
+
+    @admin.action(description="Bulk edit selected clients (persons, month done, year)", permissions=['change'])
+    def bulk_edit(self, request, queryset):
+        # Intermediate page: the action is posted again with the form filled in ('apply')
+        form = BulkEditForm(request.POST if 'apply' in request.POST else None, prefix='edit')
+        if 'apply' in request.POST and form.is_valid():
+            updated = apply_operation(queryset, form.cleaned_data['operation'], form.cleaned_data)
+            self.message_user(request, f"Updated {updated} client(s).")
+            return None
+        return TemplateResponse(request, 'admin/core/client/bulk_edit.html', {
+            **self.admin_site.each_context(request),
+            'title': "Bulk edit clients",
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'preview_count': queryset.count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            # "Select all N" applies to the filtered changelist, which is re-read from the URL on submit
+            'select_across': request.POST.get('select_across') == '1',
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        })
+
+    @admin.action(description="Copy selected clients into the next year (months cleared)", permissions=['add'])
+    def rollover_to_next_year(self, request, queryset):
+        # Snapshot the selection: clients copied into year + 1 must not be rolled again when that year's turn comes
+        clients = Client.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        years = clients.order_by('year').values_list('year', flat=True).distinct()
+        for year in years:
+            result = rollover_year(year, year + 1, clients=clients)
+            self.message_user(request, f"{year} -> {year + 1}: copied {result.created} client(s), "
+                                       f"{result.skipped} already present.")
+
+    def has_merge_permission(self, request):
+        # Merging edits one client and deletes the others; admin actions only need any one listed permission
+        return self.has_change_permission(request) and self.has_delete_permission(request)
+
+    @admin.action(description="Merge selected clients into the oldest one (per year)", permissions=['merge'])
+    def merge_duplicates(self, request, queryset):
+        # Intermediate page like delete_selected: the groups are listed and merged only once it is posted back ('post')
+        select_across = request.POST.get('select_across') == '1'
+        groups = []
+        for year in queryset.order_by('year').values_list('year', flat=True).distinct():
+            clients = list(queryset.filter(year=year).order_by('pk'))
+            if len(clients) > 1:
+                groups.append({'year': year, 'keep': clients[0], 'duplicates': clients[1:]})
+        if not groups:
+            self.message_user(request, "Select at least two clients of the same year to merge.", level=messages.WARNING)
+            return None
+        if request.POST.get('post'):
+            # "Select all" merges the whole filtered changelist, so it needs its own confirmation
+            if select_across and request.POST.get('confirm_select_across') != 'yes':
+                self.message_user(request, "Tick the box to confirm merging every client matching the changelist.",
+                                  level=messages.ERROR)
+            else:
+                for group in groups:
+                    keep = merge_clients([group['keep'], *group['duplicates']])
+                    self.message_user(request, f"{group['year']}: merged {len(group['duplicates'])} client(s) into {keep}.")
+                return None
+        return TemplateResponse(request, 'admin/core/client/merge_duplicates.html', {
+            **self.admin_site.each_context(request),
+            'title': "Merge clients",
+            'opts': self.model._meta,
+            'groups': groups,
+            'merged_count': sum(len(group['duplicates']) for group in groups),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'select_across': select_across,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        })
+
+    def duplicates_view(self, request):
+        """Latest duplicate scan (a background job) with a merge button per group."""
+        if not self.has_merge_permission(request):
+            messages.error(request, "You are not authorized to merge clients.")
+            return redirect('admin:index')
+        if request.method == 'POST' and 'scan' in request.POST:
+            year = request.POST.get('year')
+            job = enqueue_job('find_duplicates', params={'year': int(year) if year and year.isdigit() else None},
+                              user=request.user)
+            self.message_user(request, f"Duplicate scan queued (job {job.pk}); refresh this page when it has run.")
+            return redirect('admin:core_client_duplicates')
+        if request.method == 'POST' and 'merge' in request.POST:
+            clients = list(Client.objects.filter(pk__in=request.POST.getlist('ids')))
+            try:
+                keep = merge_clients(clients)
+            except ValueError as e:
+                self.message_user(request, str(e), level=messages.ERROR)
+            else:
+                self.message_user(request, f"Merged {len(clients) - 1} client(s) into {keep}.")
+            return redirect('admin:core_client_duplicates')
+
+        scans = Job.objects.filter(kind='find_duplicates').order_by('-created_at')
+        pending = scans.exclude(status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED]).first()
+        latest = scans.filter(status=Job.STATUS_SUCCEEDED).first()
+        groups = []
+        if latest is not None:
+            report = latest.result.get('groups', [])
+            clients = Client.objects.in_bulk([pk for group in report for pk in group['client_ids']])
+            for group in report:
+                # Clients merged or deleted since the scan drop out of the report
+                members = [clients[pk] for pk in group['client_ids'] if pk in clients]
+                if len(members) > 1:
+                    groups.append({'score': group['score'], 'year': group['year'], 'clients': members})
+        return TemplateResponse(request, 'admin/core/client/duplicates.html', {
+            **self.admin_site.each_context(request),
+            'title': "Duplicate clients",
+            'opts': self.model._meta,
+            'groups': groups,
+            'latest': latest,
+            'pending': pending,
+            'stats': latest.result.get('stats', {}) if latest else {},
+        })
 
 
 @admin.register(SignupOTP)
 class SignupOTPAdmin(admin.ModelAdmin):
     list_display = ['email', 'code', 'is_used', 'created_at']
     list_filter = ['is_used', 'created_at']
-    search_fields = ['email', 'code']
\ No newline at end of file
+    search_fields = ['email', 'code']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['params', 'result', 'error', 'worker', 'started_at', 'heartbeat_at', 'finished_at']
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'status', 'attempts', 'next_attempt_at', 'expires_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['attempts', 'last_error', 'claimed_at', 'sent_at']
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_QUEUED, next_attempt_at=timezone.now(), attempts=0)
+        self.message_user(request, f"{updated} email(s) queued for retry.")
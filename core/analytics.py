@@ -0,0 +1,141 @@
+# core/analytics.py
+"""
+Workload and completion-rate aggregates for the analytics page and JSON API.
+
+Everything is computed in the database with GROUP BY queries over Client and
+the indexed ClientMonthAssignment table (no rows are pulled into Python), and
+the assembled report is cached for ANALYTICS_CACHE_SECONDS so repeated page
+loads cost nothing.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, TextField, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from core.models import Client, ClientMonthAssignment, MONTH_CHOICES
+
+# Report section -> Client field it groups by
+CLIENT_DIMENSIONS = {
+    'by_first_allocated_person': 'first_allocated_person',
+    'by_review_person': 'review_person',
+    'by_group': 'group',
+    'by_bank': 'bank_name',
+    'by_year': 'year',
+}
+
+MONTHS_PER_YEAR = len(MONTH_CHOICES)
+
+# Label of the group holding clients with no value (NULL or '') for a dimension
+NO_VALUE = '(none)'
+
+
+def _completion_rate(completed, clients):
+    possible = clients * MONTHS_PER_YEAR
+    return round(completed / possible, 4) if possible else 0.0
+
+
+def _group_key(field_path, field):
+    """
+    Expression to group ``field`` (reached through ``field_path``) by. NULL and
+    '' text values fall into a single NO_VALUE group in the query itself.
+    """
+    if isinstance(field, (CharField, TextField)):
+        return Coalesce(NullIf(field_path, Value('')), Value(NO_VALUE))
+    return F(field_path)
+
+
+def client_aggregates(field_name, year=None):
+    """Clients and completed months per value of ``field_name`` (largest first)."""
+    clients = Client.objects.all()
+    assignments = ClientMonthAssignment.objects.all()
+    if year is not None:
+        clients = clients.filter(year=year)
+        assignments = assignments.filter(year=year)
+
+    field = Client._meta.get_field(field_name)
+    counts = clients.values(key=_group_key(field_name, field)).annotate(clients=Count('id')).order_by()
+    completed = dict(
+        assignments.values_list(_group_key(f'client__{field_name}', field)).annotate(completed=Count('id')).order_by()
+    )
+    rows = []
+    for row in counts:
+        key = row['key']
+        done = completed.get(key, 0)
+        rows.append({
+            'key': key,
+            'clients': row['clients'],
+            'months_completed': done,
+            'completion_rate': _completion_rate(done, row['clients']),
+        })
+    rows.sort(key=lambda item: (-item['clients'], str(item['key'])))
+    return rows
+
+
+def completions_by_person(year=None):
+    """Months actually completed per person (from the months map), busiest first."""
+    assignments = ClientMonthAssignment.objects.all()
+    if year is not None:
+        assignments = assignments.filter(year=year)
+    label = _group_key('person', ClientMonthAssignment._meta.get_field('person'))
+    rows = assignments.values(label=label).annotate(
+        months_completed=Count('id'),
+        clients=Count('client', distinct=True),
+    ).order_by('-months_completed', 'label')
+    return [
+        {
+            'person': row['label'],
+            'months_completed': row['months_completed'],
+            'clients': row['clients'],
+        }
+        for row in rows
+    ]
+
+
+def completions_by_month(year=None):
+    """Completed clients for each calendar month (all twelve months listed)."""
+    assignments = ClientMonthAssignment.objects.all()
+    if year is not None:
+        assignments = assignments.filter(year=year)
+    counts = dict(assignments.values_list('month').annotate(completed=Count('id')).order_by())
+    return [
+        {'month': number, 'name': name, 'completed': counts.get(number, 0)}
+        for number, name in MONTH_CHOICES
+    ]
+
+
+def build_report(year=None):
+    """Assemble every section of the analytics report (uncached)."""
+    clients = Client.objects.all()
+    assignments = ClientMonthAssignment.objects.all()
+    if year is not None:
+        clients = clients.filter(year=year)
+        assignments = assignments.filter(year=year)
+    total_clients = clients.count()
+    total_completed = assignments.count()
+    report = {
+        'year': year,
+        'totals': {
+            'clients': total_clients,
+            'months_completed': total_completed,
+            'completion_rate': _completion_rate(total_completed, total_clients),
+        },
+        'completed_by_person': completions_by_person(year),
+        'by_month': completions_by_month(year),
+    }
+    for section, field_name in CLIENT_DIMENSIONS.items():
+        report[section] = client_aggregates(field_name, year)
+    return report
+
+
+def get_report(year=None, refresh=False):
+    """Cached analytics report; ``refresh`` forces recomputation."""
+    key = f"analytics:report:{year if year is not None else 'all'}"
+    report = None if refresh else cache.get(key)
+    if report is None:
+        report = build_report(year)
+        cache.set(key, report, timeout=getattr(settings, 'ANALYTICS_CACHE_SECONDS', 300))
+    return report
+
+
+def available_years():
+    return list(Client.objects.order_by('-year').values_list('year', flat=True).distinct())
@@ -0,0 +1,107 @@
+# core/api.py
+"""
+JSON API for client data (Django REST framework).
+
+``GET /api/clients/`` returns one keyset-paginated page of clients:
+
+    ?fields=id,company_name,year     sparse fieldset (default: every field in API_FIELDS)
+    ?year=2025&group=A&person=Ann    filters; ``person`` matches the first allocated
+                                     or the review person
+    ?page_size=200&cursor=...        page size and the cursor from ``next``/``previous``
+
+Rows are read with ``values()`` and returned as plain dicts, so a large page
+costs one query and no per-object model or serializer instances.
+
+Responses carry an ``ETag`` derived from the client cache version (bumped on
+every client write, see core.caching) plus the query string, and a
+``Last-Modified`` time of the last write. Polling clients that send
+``If-None-Match``/``If-Modified-Since`` get ``304 Not Modified`` without the
+page being queried.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.caching import client_cache
+from core.models import Client
+from core.pagination import DEFAULT_ORDERING, get_page_size, paginate_keyset
+from msystem.db_routers import use_replica
+
+API_FIELDS = (
+    'id', 'company_name', 'group', 'account_no', 'bank_name', 'email',
+    'first_allocated_person', 'review_person', 'year', 'months', 'remark',
+)
+
+
+def _requested_fields(request):
+    value = request.query_params.get('fields', '')
+    if not value:
+        return list(API_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}. "
+                                         f"Available: {', '.join(API_FIELDS)}."})
+    return fields
+
+
+def _filtered_clients(request):
+    clients = Client.objects.all()
+    params = request.query_params
+    if params.get('year'):
+        try:
+            clients = clients.filter(year=int(params['year']))
+        except ValueError:
+            raise ValidationError({'year': "Must be an integer."})
+    if params.get('group'):
+        clients = clients.filter(group=params['group'])
+    if params.get('person'):
+        person = params['person']
+        clients = clients.filter(Q(first_allocated_person=person) | Q(review_person=person))
+    return clients
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.query_params.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+
+def _clients_etag(request, *args, **kwargs):
+    raw = f"{client_cache.version()}:{request.get_full_path()}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _clients_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(client_cache.last_modified(), tz=dt_timezone.utc)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=_clients_etag, last_modified_func=_clients_last_modified)
+@use_replica
+def clients(request):
+    fields = _requested_fields(request)
+    page_size = get_page_size(request.query_params.get('page_size'))
+    # The ordering columns are needed to build the cursors even if not requested
+    columns = list(dict.fromkeys([*fields, *DEFAULT_ORDERING]))
+    page = paginate_keyset(
+        _filtered_clients(request).values(*columns),
+        cursor=request.query_params.get('cursor'), page_size=page_size)
+    rows = page.object_list
+    if len(columns) != len(fields):
+        rows = [{name: row[name] for name in fields} for row in rows]
+    return Response({
+        'results': rows,
+        'page_size': page_size,
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.prev_cursor),
+    })
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Register model signal handlers
+        from core import signals  # noqa: F401
+        # Time queries and template rendering for the request metrics middleware
+        from core.metrics import install_query_timer, install_template_timer
+        install_query_timer()
+        install_template_timer()
@@ -0,0 +1,105 @@
+# core/assignments.py
+"""
+Keeps ``ClientMonthAssignment`` rows in sync with ``Client.months`` and
+answers workload questions from the indexed table.
+
+``Client.months`` (month number -> person) stays the editable representation
+used by the forms; every write path calls into this module so the normalized
+rows always mirror it. Single saves are handled by a post_save signal and
+``update()``/``bulk_update`` by ``ClientQuerySet.update`` (core/models.py);
+``bulk_create`` callers (imports, seeding) call ``sync_clients`` explicitly
+because it sends no signals.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Client, ClientMonthAssignment
+
+logger = logging.getLogger(__name__)
+
+
+def assignments_for(client_id, year, months):
+    """Unsaved assignment rows for one client's ``months`` mapping (invalid keys skipped)."""
+    if not isinstance(months, dict):
+        return []
+    rows = []
+    for month_key, person in months.items():
+        try:
+            month = int(month_key)
+        except (TypeError, ValueError):
+            logger.warning(f"Skipping invalid month {month_key!r} for client {client_id}")
+            continue
+        if 1 <= month <= 12:
+            rows.append(ClientMonthAssignment(
+                client_id=client_id, year=year, month=month, person=str(person or '')[:100]))
+    return rows
+
+
+def sync_month_assignments(rows, batch_size=1000):
+    """
+    Replace the assignments of the given clients.
+    ``rows`` is an iterable of (client_id, year, months) tuples.
+    """
+    rows = list(rows)
+    with transaction.atomic():
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            ClientMonthAssignment.objects.filter(
+                client_id__in=[client_id for client_id, _, _ in batch]).delete()
+            objs = []
+            for client_id, year, months in batch:
+                objs.extend(assignments_for(client_id, year, months))
+            ClientMonthAssignment.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def sync_clients(clients, batch_size=1000):
+    """Sync assignments for saved Client instances (e.g. straight after bulk_create)."""
+    clients = [client for client in clients if client.pk is not None]
+    sync_month_assignments(((c.pk, c.year, c.months) for c in clients), batch_size=batch_size)
+
+
+def sync_client_ids(client_ids, batch_size=1000):
+    """Re-read the given clients' year/months and sync their assignments."""
+    client_ids = list(client_ids)
+    for start in range(0, len(client_ids), batch_size):
+        rows = Client.objects.filter(pk__in=client_ids[start:start + batch_size]).values_list(
+            'id', 'year', 'months')
+        sync_month_assignments(rows, batch_size=batch_size)
+
+
+def months_by_client(client_ids):
+    """{client_id: {'<month>': person}} for many clients in one query (no N+1)."""
+    months = {client_id: {} for client_id in client_ids}
+    rows = ClientMonthAssignment.objects.filter(client_id__in=client_ids).order_by(
+        'client_id', 'month').values_list('client_id', 'month', 'person')
+    for client_id, month, person in rows:
+        months[client_id][str(month)] = person
+    return months
+
+
+async def amonths_by_client(client_ids):
+    """Async version of ``months_by_client``."""
+    months = {client_id: {} for client_id in client_ids}
+    rows = ClientMonthAssignment.objects.filter(client_id__in=client_ids).order_by(
+        'client_id', 'month').values_list('client_id', 'month', 'person')
+    async for client_id, month, person in rows:
+        months[client_id][str(month)] = person
+    return months
+
+
+def workload_by_person(year, month=None):
+    """Completed months per person for a year (optionally one month), busiest first."""
+    queryset = ClientMonthAssignment.objects.filter(year=year)
+    if month is not None:
+        queryset = queryset.filter(month=month)
+    return queryset.values('person').annotate(completed=Count('id')).order_by('-completed', 'person')
+
+
+def completed_by(person, year, month=None):
+    """Clients whose months in ``year`` (optionally ``month``) were completed by ``person``."""
+    assignments = ClientMonthAssignment.objects.filter(person=person, year=year)
+    if month is not None:
+        assignments = assignments.filter(month=month)
+    return Client.objects.filter(pk__in=assignments.values('client_id'))
@@ -0,0 +1,134 @@
+# core/async_views.py
+"""
+Async versions of the read-only views, served under ``/async/``.
+
+They render the same templates as their counterparts in core.views but
+query through Django's async ORM (``aiterator``, ``afirst``, ``acount``), so
+under ASGI (see msystem/gunicorn_asgi.py) a worker keeps serving other
+requests while one waits on the database. Under WSGI they still work;
+Django runs them in an event loop per request.
+
+Templates must not touch the database while rendering in async code, so
+every queryset is materialized before ``render`` and ``request.user`` is
+resolved up front (the auth context processor would otherwise load it
+lazily through the sync ORM).
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from core.assignments import amonths_by_client
+from core.caching import client_cache, normalize_term
+from core.fuzzy import did_you_mean
+from core.models import Client
+from core.pagination import acount_for_listing, apaginate_keyset, get_page_size
+from core.search import exact_company_matches, filter_clients, search_clients
+from core.views import MONTH_ASSIGNMENTS_PREFETCH, _company_search_limit, _in_id_order
+from msystem.db_routers import use_replica
+
+
+def _with_user(view):
+    """Replace the lazy ``request.user`` with the user loaded through the async session API."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+@_with_user
+async def dashboard(request):
+    return render(request, 'dashboard.html')
+
+
+@login_required
+@_with_user
+@use_replica
+async def client_list(request):
+    query = request.GET.get('search', '')
+    if query:
+        clients = filter_clients(query, match_all=False)
+    else:
+        clients = Client.objects.all()
+    page_size = get_page_size(request.GET.get('page_size'))
+    page = await apaginate_keyset(
+        clients.prefetch_related(MONTH_ASSIGNMENTS_PREFETCH),
+        cursor=request.GET.get('cursor'), page_size=page_size)
+    total, total_is_estimate = await acount_for_listing(clients, search=query)
+    return render(request, 'client_list.html', {
+        'clients': page.object_list,
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'total_is_estimate': total_is_estimate,
+        'search': query,
+    })
+
+
+async def _find_company_id(search_term):
+    company_id = await exact_company_matches(search_term).order_by('id').values_list('id', flat=True).afirst()
+    if company_id is None:
+        company_id = await search_clients(search_term).values_list('id', flat=True).afirst()
+    return company_id
+
+
+async def _client_with_months(company_id):
+    company = await Client.objects.filter(pk=company_id).afirst()
+    company_months = (await amonths_by_client([company.pk]))[company.pk] if company else {}
+    return company, company_months
+
+
+async def _company_search_ids(query):
+    limit = _company_search_limit()
+    exact = exact_company_matches(query).order_by('id').values_list('id', flat=True)[:limit]
+    ids = [pk async for pk in exact.aiterator()]
+    if not ids:
+        ids = [pk async for pk in search_clients(query).values_list('id', flat=True)[:limit].aiterator()]
+    return ids
+
+
+@login_required
+@_with_user
+@use_replica
+async def search_details(request):
+    company = None
+    company_months = {}
+    search_term = request.GET.get('search', '')
+    if search_term:
+        # Shares cache entries with the sync view (same namespaces and values)
+        company_id = await client_cache.aget_or_set(
+            'details_term', normalize_term(search_term), lambda: _find_company_id(search_term))
+        if company_id is not None:
+            company, company_months = await client_cache.aget_or_set(
+                'client', company_id, lambda: _client_with_months(company_id))
+    # The fuzzy index may need loading from the database, so it runs in a thread
+    suggestions = await sync_to_async(did_you_mean)(search_term, shown=company) if search_term else []
+    months_list = [
+        (1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'),
+        (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'),
+        (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')
+    ]
+    return render(request, 'search_details.html', {
+        'company': company,
+        'company_months': company_months,
+        'months_list': months_list,
+        'did_you_mean': suggestions,
+        'search': search_term,
+    })
+
+
+@login_required
+@_with_user
+@use_replica
+async def search_company(request):
+    query = request.GET.get('q', '')
+    if query:
+        ids = await client_cache.aget_or_set(
+            'company_search_ids', normalize_term(query), lambda: _company_search_ids(query))
+        results = _in_id_order([client async for client in Client.objects.filter(pk__in=ids).aiterator()], ids)
+    else:
+        results = [client async for client in Client.objects.all().aiterator()]
+    return render(request, 'search_results.html', {'results': results, 'search': query})
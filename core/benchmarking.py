@@ -0,0 +1,71 @@
+# core/benchmarking.py
+"""
+Small helpers shared by the benchmark management commands and the view
+budget tests: percentiles, latency summaries and a per-call measurement of
+wall time, query count and peak Python memory.
+"""
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (``pct`` between 0 and 100)."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings):
+    """p50/p95/p99/mean/max of a list of millisecond timings, rounded for reports."""
+    return {
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'max_ms': round(max(timings), 2),
+    }
+
+
+def measure(func, trace_memory=False):
+    """
+    Call ``func()`` once and return (result, elapsed_ms, query_count, peak_kb).
+    With ``trace_memory`` the peak is what tracemalloc saw allocated during the
+    call (tracing slows the call down, so time those runs separately);
+    otherwise peak_kb is None.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func()
+            elapsed = (time.perf_counter() - started) * 1000
+        peak = tracemalloc.get_traced_memory()[1] / 1024 if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, elapsed, len(queries), peak
+
+
+def consume_response(response):
+    """Read the whole body (streaming responses are only produced when iterated); returns its size."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def git_revision():
+    """Short commit hash of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,105 @@
+# core/bulk.py
+"""
+Bulk edits across many clients (used by the bulk edit page and ClientAdmin actions).
+
+Every operation runs inside one transaction and avoids per-object saves:
+
+* ``set_persons`` and ``change_year`` are single ``UPDATE`` statements
+* ``mark_month_done`` has to change the ``months`` JSON of each client, so it
+  uses ``bulk_update`` in batches
+
+Month assignments follow ``months``/``year`` changes through
+``ClientQuerySet.update`` (core/models.py).
+
+``update()``/``bulk_update`` send no signals, so each operation invalidates
+the client cache itself.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.caching import invalidate_client_cache
+from core.models import Client
+from core.search import filter_clients
+
+logger = logging.getLogger(__name__)
+
+OPERATION_PERSONS = 'persons'
+OPERATION_MONTH = 'month'
+OPERATION_YEAR = 'year'
+
+
+def select_clients(ids=None, search='', year=None, group='', person=''):
+    """
+    Clients targeted by a bulk edit: explicit ``ids``, or everything matching the
+    filters (``search`` works like the client_list search box).
+    """
+    if ids:
+        return Client.objects.filter(pk__in=ids)
+    clients = filter_clients(search, match_all=False) if search else Client.objects.all()
+    if year:
+        clients = clients.filter(year=year)
+    if group:
+        clients = clients.filter(group=group)
+    if person:
+        clients = clients.filter(Q(first_allocated_person=person) | Q(review_person=person))
+    return clients
+
+
+def set_persons(clients, first_allocated_person=None, review_person=None):
+    """Reassign the first allocated and/or review person. Returns the number of clients updated."""
+    changes = {}
+    if first_allocated_person:
+        changes['first_allocated_person'] = first_allocated_person.upper()
+    if review_person:
+        changes['review_person'] = review_person.upper()
+    if not changes:
+        return 0
+    with transaction.atomic():
+        updated = clients.update(**changes)
+        invalidate_client_cache()
+    logger.info(f"Bulk edit: set {', '.join(changes)} on {updated} clients")
+    return updated
+
+
+def change_year(clients, year):
+    """Move clients to ``year`` (their month assignments follow). Returns the number updated."""
+    with transaction.atomic():
+        updated = clients.update(year=year)
+        invalidate_client_cache()
+    logger.info(f"Bulk edit: moved {updated} clients to {year}")
+    return updated
+
+
+def mark_month_done(clients, month, person, batch_size=None):
+    """Record ``month`` as completed by ``person`` for every client. Returns the number updated."""
+    batch_size = batch_size or getattr(settings, 'BULK_EDIT_BATCH_SIZE', 1000)
+    key, person = str(month), person.upper()
+    updated = 0
+    with transaction.atomic():
+        batch = []
+        for client in clients.only('id', 'year', 'months').order_by('pk').iterator(chunk_size=batch_size):
+            months = client.months if isinstance(client.months, dict) else {}
+            client.months = {**months, key: person}
+            batch.append(client)
+            if len(batch) >= batch_size:
+                updated += Client.objects.bulk_update(batch, ['months'], batch_size=batch_size)
+                batch = []
+        if batch:
+            updated += Client.objects.bulk_update(batch, ['months'], batch_size=batch_size)
+        invalidate_client_cache()
+    logger.info(f"Bulk edit: marked month {month} done by {person} for {updated} clients")
+    return updated
+
+
+def apply_operation(clients, operation, data):
+    """Run ``operation`` with the cleaned ``BulkEditForm`` data. Returns the number of clients updated."""
+    if operation == OPERATION_PERSONS:
+        return set_persons(clients, data.get('first_allocated_person'), data.get('review_person'))
+    if operation == OPERATION_MONTH:
+        return mark_month_done(clients, data['month'], data['person'])
+    if operation == OPERATION_YEAR:
+        return change_year(clients, data['year'])
+    raise ValueError(f"Unknown bulk operation: {operation}")
@@ -0,0 +1,248 @@
+# core/caching.py
+"""
+Cache for client detail and search results.
+
+Entries are keyed on a namespace plus the normalized search term or client
+id, prefixed with a global version number (``client_cache:<version>:...``).
+Any write to Client bumps the version, which invalidates every cached entry
+at once without having to know which searches a client appeared in. Single
+saves and deletes bump it from post_save/post_delete signals (core/signals.py);
+bulk writes (imports, bulk edits, seeding) call ``invalidate_client_cache()``
+explicitly because ``bulk_create``/``bulk_update``/``update()`` send no signals.
+
+The version always lives in the shared Django cache so every worker process
+sees an invalidation. Values are stored according to CLIENT_CACHE_BACKEND:
+
+* ``'default'`` - the Django cache alias named by CLIENT_CACHE_ALIAS
+* ``'lru'``     - an in-process least-recently-used dict (no serialization)
+* ``'off'``     - no caching, every lookup is computed
+
+Hit/miss counters per namespace are kept per process and shown on the
+superuser metrics page.
+
+Values are always computed from the primary database: one computed from a
+lagging read replica would stay cached under the new version after an
+invalidation.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from msystem.db_routers import primary_reads
+
+VERSION_KEY = 'client_cache:version'
+MODIFIED_KEY = 'client_cache:modified'
+
+_MISSING = object()
+
+
+def _fresh_version():
+    """
+    Starting value for a missing version key. The key can be evicted (the
+    file cache culls random entries), so it is seeded from the clock rather
+    than 1: a re-seeded version is always newer than any version already
+    used, so old entries and ETags never become current again.
+    """
+    return time.time_ns()
+
+
+def normalize_term(term):
+    """Cache key form of a search term: surrounding space and case do not change the results."""
+    return (term or '').strip().lower()
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1000, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ClientCache:
+    """Versioned get-or-compute cache; configuration is read from settings on first use."""
+
+    def __init__(self, backend=None, alias=None, timeout=None, max_entries=None):
+        self._backend = backend
+        self._alias = alias
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._store = None
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def backend(self):
+        return self._backend or getattr(settings, 'CLIENT_CACHE_BACKEND', 'default')
+
+    @property
+    def timeout(self):
+        return self._timeout if self._timeout is not None else getattr(settings, 'CLIENT_CACHE_TIMEOUT', 300)
+
+    @property
+    def shared(self):
+        """The cross-process Django cache holding the version number."""
+        return caches[self._alias or getattr(settings, 'CLIENT_CACHE_ALIAS', 'default')]
+
+    @property
+    def store(self):
+        if self._store is None:
+            if self.backend == 'lru':
+                self._store = LRUCache(
+                    max_entries=self._max_entries or getattr(settings, 'CLIENT_CACHE_LRU_SIZE', 1000),
+                    timeout=self.timeout,
+                )
+            else:
+                self._store = self.shared
+        return self._store
+
+    def version(self):
+        version = self.shared.get(VERSION_KEY)
+        if version is None:
+            seed = _fresh_version()
+            self.shared.add(VERSION_KEY, seed, timeout=None)
+            version = self.shared.get(VERSION_KEY, seed)
+        return version
+
+    async def aversion(self):
+        version = await self.shared.aget(VERSION_KEY)
+        if version is None:
+            seed = _fresh_version()
+            await self.shared.aadd(VERSION_KEY, seed, timeout=None)
+            version = await self.shared.aget(VERSION_KEY, seed)
+        return version
+
+    def make_key(self, namespace, identifier, version=None):
+        version = self.version() if version is None else version
+        if isinstance(identifier, str):
+            # Search terms may contain spaces or be long; keep keys short and portable
+            identifier = hashlib.sha1(identifier.encode('utf-8')).hexdigest()
+        return f"client_cache:{version}:{namespace}:{identifier}"
+
+    def get_or_set(self, namespace, identifier, compute):
+        """Cached value for (namespace, identifier), calling ``compute()`` on a miss. None is cached too."""
+        if self.backend == 'off':
+            return compute()
+        key = self.make_key(namespace, identifier)
+        value = self.store.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count(self.hits, namespace)
+            return value
+        self._count(self.misses, namespace)
+        with primary_reads():
+            value = compute()
+        self.store.set(key, value, timeout=self.timeout)
+        return value
+
+    async def aget_or_set(self, namespace, identifier, compute):
+        """Async version of ``get_or_set``; ``compute`` is an async callable."""
+        if self.backend == 'off':
+            return await compute()
+        key = self.make_key(namespace, identifier, version=await self.aversion())
+        if isinstance(self.store, LRUCache):
+            value = self.store.get(key, _MISSING)
+        else:
+            value = await self.store.aget(key, _MISSING)
+        if value is not _MISSING:
+            self._count(self.hits, namespace)
+            return value
+        self._count(self.misses, namespace)
+        with primary_reads():
+            value = await compute()
+        if isinstance(self.store, LRUCache):
+            self.store.set(key, value, timeout=self.timeout)
+        else:
+            await self.store.aset(key, value, timeout=self.timeout)
+        return value
+
+    def last_modified(self):
+        """Unix time of the last invalidation, i.e. the last client write (for Last-Modified headers)."""
+        modified = self.shared.get(MODIFIED_KEY)
+        if modified is None:
+            # Unknown (first use or evicted): claim "now" so no client wrongly keeps an older copy
+            self.shared.add(MODIFIED_KEY, int(time.time()), timeout=None)
+            modified = self.shared.get(MODIFIED_KEY, int(time.time()))
+        return modified
+
+    def invalidate(self):
+        """Bump the version so every existing entry is ignored (they expire on their own)."""
+        self.shared.set(MODIFIED_KEY, int(time.time()), timeout=None)
+        try:
+            self.shared.incr(VERSION_KEY)
+        except ValueError:
+            # No version yet (or it was evicted): any new value differs from what readers cached under
+            self.shared.set(VERSION_KEY, _fresh_version(), timeout=None)
+        if isinstance(self._store, LRUCache):
+            self._store.clear()
+
+    def _count(self, counter, namespace):
+        with self._lock:
+            counter[namespace] += 1
+
+    def stats(self):
+        """Hits, misses and hit rate per namespace for this process."""
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            rows = []
+            for namespace in namespaces:
+                hits, misses = self.hits[namespace], self.misses[namespace]
+                rows.append({
+                    'namespace': namespace,
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                })
+        return {'backend': self.backend, 'namespaces': rows}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+
+client_cache = ClientCache()
+
+
+def invalidate_client_cache():
+    """Invalidate cached client data once the current transaction commits (immediately outside one)."""
+    transaction.on_commit(client_cache.invalidate)
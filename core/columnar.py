@@ -0,0 +1,171 @@
+# core/columnar.py
+"""
+Columnar client exports and imports: Parquet and Arrow IPC (Feather v2).
+
+Exports read the table with ``values_list`` in chunks (see
+``core.exporters.iter_client_chunks``) and transpose each chunk straight
+into an Arrow record batch, so no model instances or per-row dicts are
+built. ``email`` is written as ``list<string>`` and ``months`` as a struct
+with one nullable string field per month (the person), so reporting tools
+can query both without parsing JSON. Batches are grouped into row groups of
+EXPORT_COLUMNAR_ROW_GROUP_SIZE rows and compressed with zstd.
+
+Imports read such files back batch by batch and hand ``SheetReader`` the
+same raw DataFrames a spreadsheet produces, so validation is shared with the
+XLSX/CSV path. Row numbers in the error report are the rows of the
+equivalent spreadsheet export (the first record is row 2).
+
+pyarrow is imported on first use, which keeps it off the startup path.
+"""
+from functools import lru_cache
+
+import pandas as pd
+from django.conf import settings
+
+from core.exporters import CLIENT_FIELDS, EXPORT_FIELDS, MONTH_NAMES, _StreamBuffer, iter_client_chunks
+
+# Struct field names of the months column, in month order
+MONTH_FIELDS = [name.lower() for name in MONTH_NAMES]
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+
+@lru_cache(maxsize=None)
+def client_schema():
+    """Arrow schema of an exported client table (columns in EXPORT_FIELDS order)."""
+    import pyarrow as pa
+
+    types = {
+        'id': pa.int64(),
+        'year': pa.int32(),
+        'email': pa.list_(pa.string()),
+        'months': pa.struct([(name, pa.string()) for name in MONTH_FIELDS]),
+    }
+    return pa.schema([(field_name, types.get(field_name, pa.string())) for field_name in EXPORT_FIELDS])
+
+
+def _email_list(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(email) for email in value]
+    return [str(value)]
+
+
+def _month_struct(months):
+    struct = {}
+    for month, person in months.items():
+        number = int(month)
+        if 1 <= number <= len(MONTH_FIELDS):
+            struct[MONTH_FIELDS[number - 1]] = person
+    return struct
+
+
+def record_batch(chunk, months):
+    """One Arrow record batch from ``iter_client_chunks`` output (CLIENT_FIELDS tuples + months map)."""
+    import pyarrow as pa
+
+    schema = client_schema()
+    columns = dict(zip(CLIENT_FIELDS, zip(*chunk)))
+    columns['email'] = [_email_list(value) for value in columns['email']]
+    columns['months'] = [_month_struct(months[client_id]) for client_id in columns['id']]
+    arrays = [pa.array(columns[field.name], type=field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _open_writer(kind, sink):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if kind == 'parquet':
+        return pq.ParquetWriter(sink, client_schema(), compression='zstd')
+    return pa.ipc.new_file(sink, client_schema(), options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+
+def stream_columnar(kind, queryset=None, progress=None):
+    """Yield a Parquet or Arrow IPC file of the client table as byte chunks, one per row group."""
+    import pyarrow as pa
+
+    row_group_size = getattr(settings, 'EXPORT_COLUMNAR_ROW_GROUP_SIZE', 50000)
+    buffer = _StreamBuffer()
+    writer = _open_writer(kind, buffer)
+    yield buffer.drain()
+    pending, pending_rows = [], 0
+    for chunk, months in iter_client_chunks(queryset, progress=progress):
+        pending.append(record_batch(chunk, months))
+        pending_rows += len(chunk)
+        if pending_rows >= row_group_size:
+            # One contiguous batch per row group instead of one per database chunk
+            writer.write_table(pa.Table.from_batches(pending).combine_chunks())
+            pending, pending_rows = [], 0
+            yield buffer.drain()
+    if pending:
+        writer.write_table(pa.Table.from_batches(pending).combine_chunks())
+    writer.close()
+    yield buffer.drain()
+
+
+def _cell_converter(data_type):
+    """Turn a list/struct/map cell (as pyarrow gives it to pandas) into what prepare_rows parses."""
+    import pyarrow as pa
+
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return lambda value: None if value is None else ', '.join(str(item) for item in value if item is not None)
+    if pa.types.is_struct(data_type):
+        return lambda value: None if value is None else {
+            key: person for key, person in value.items() if person is not None}
+    if pa.types.is_map(data_type):
+        return lambda value: None if value is None else {
+            key: person for key, person in value if person is not None}
+    return None
+
+
+def _frame(batch, first_index):
+    frame = batch.to_pandas()
+    frame.index = pd.RangeIndex(first_index, first_index + len(frame))
+    for field in batch.schema:
+        convert = _cell_converter(field.type)
+        if convert is not None:
+            frame[field.name] = frame[field.name].astype(object).map(convert)
+    return frame
+
+
+class ColumnarReader:
+    """
+    Reads a Parquet or Arrow IPC upload as raw DataFrames of at most
+    ``batch_size`` rows. ``total_rows`` comes from the file's metadata.
+    """
+
+    def __init__(self, kind, file, batch_size):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.batch_size = batch_size
+        if kind == 'parquet':
+            self._parquet = pq.ParquetFile(file)
+            self._ipc = None
+            self.schema = self._parquet.schema_arrow
+            self.total_rows = self._parquet.metadata.num_rows
+        else:
+            self._parquet = None
+            self._ipc = pa.ipc.open_file(file)
+            self.schema = self._ipc.schema
+            self.total_rows = self._ipc.count_rows()
+
+    def _batches(self):
+        if self._parquet is not None:
+            yield from self._parquet.iter_batches(batch_size=self.batch_size)
+            return
+        for i in range(self._ipc.num_record_batches):
+            batch = self._ipc.get_batch(i)
+            for start in range(0, batch.num_rows, self.batch_size):
+                yield batch.slice(start, self.batch_size)
+
+    def frames(self):
+        """Yield the DataFrames; an empty file yields one empty frame so its columns are still checked."""
+        done = 0
+        for batch in self._batches():
+            yield _frame(batch, done)
+            done += batch.num_rows
+        if not done:
+            yield _frame(self.schema.empty_table(), 0)
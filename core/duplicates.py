@@ -0,0 +1,310 @@
+# core/duplicates.py
+"""
+Near-duplicate client detection and merging.
+
+Imports append rows as typed, so the same company can appear several times
+in a year with small differences ("SILVER PEAK LOGISTICS LLC" / "SILVER PEAK
+LOGISTIC LLC", or the same account number under a re-worded name). Comparing
+every pair of clients is quadratic, so candidates are *blocked* first: only
+clients of the same year sharing one of these keys are compared:
+
+* the core name (lowercase words without legal suffixes, sorted)
+* a MinHash LSH band of the name's character trigrams, so names a typo or
+  two apart usually share at least one band
+* the normalized account number
+* the bank plus the first letters of the core name
+
+Blocks bigger than DUPLICATE_MAX_BLOCK (e.g. a very common name) are skipped
+rather than compared pairwise, which keeps the work close to linear in the
+number of clients.
+
+Candidate pairs are then scored all at once with numpy: name similarity is
+the share of equal MinHash values (an estimate of the trigram Jaccard
+similarity of the full names, so "ABC LLC" and "ABC INC" are close but not
+equal), raised when the account numbers match and lowered when both
+are present and differ. Pairs at or above DUPLICATE_MIN_SCORE are joined
+into groups, best pairs first (union-find), never putting two different
+account numbers in one group; a row without an account number would
+otherwise chain similarly named companies together. ``merge_clients`` folds
+a group into its oldest client, combining ``months`` and ``email``.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from core.fuzzy import trigrams
+from core.models import Client
+from core.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+LEGAL_SUFFIXES = {
+    'llc', 'inc', 'corp', 'corporation', 'incorporated', 'ltd', 'limited', 'llp', 'lp', 'co', 'company', 'pllc',
+}
+# Fields filled from a duplicate when the kept client has them blank
+FILL_FIELDS = ('group', 'account_no', 'bank_name', 'first_allocated_person', 'review_person', 'remark')
+
+SIGNATURE_SIZE = 48
+BAND_ROWS = 6
+_ACCOUNT_RE = re.compile(r'[^0-9A-Za-z]')
+
+
+def match_name(name):
+    """Name compared for similarity: lowercase words, dots dropped (L.L.C. -> llc), sorted."""
+    return ' '.join(sorted(tokenize((name or '').replace('.', ''))))
+
+
+def core_name(name):
+    """Name used for blocking: ``match_name`` without legal suffixes."""
+    tokens = match_name(name).split()
+    return ' '.join([token for token in tokens if token not in LEGAL_SUFFIXES] or tokens)
+
+
+def account_key(account_no):
+    return _ACCOUNT_RE.sub('', account_no or '').upper()
+
+
+@dataclass
+class DuplicateGroup:
+    year: int
+    client_ids: list
+    score: float                  # best pair score inside the group
+    names: list = field(default_factory=list)
+
+    @property
+    def keep_id(self):
+        """The client the others are merged into (the oldest row)."""
+        return min(self.client_ids)
+
+
+def _codes(values):
+    """Dense integer code per distinct value; blank values get -1."""
+    mapping = {}
+    return np.fromiter(
+        (mapping.setdefault(value, len(mapping)) if value else -1 for value in values),
+        dtype=np.int64, count=len(values))
+
+
+def minhash_signatures(names, size=SIGNATURE_SIZE, seed=0):
+    """(len(names), size) uint32 MinHash signatures of each name's trigram set."""
+    vocabulary = {}
+    grams, owners = [], []
+    for position, name in enumerate(names):
+        name_grams = trigrams(name) or {f"#{position}"}  # blank names match nothing
+        grams.extend(vocabulary.setdefault(gram, len(vocabulary)) for gram in name_grams)
+        owners.extend([position] * len(name_grams))
+    rng = np.random.default_rng(seed)
+    # A random 64-bit value per distinct trigram, then `size` multiply-shift hashes of it
+    # (uint64 arithmetic wraps, which is the "mod 2**64" the scheme needs)
+    gram_values = rng.integers(0, 2 ** 63, size=len(vocabulary), dtype=np.uint64)[np.asarray(grams)]
+    starts = np.flatnonzero(np.r_[True, np.diff(np.asarray(owners)) != 0])
+    a = rng.integers(0, 2 ** 63, size=size, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=size, dtype=np.uint64)
+    signatures = np.empty((len(names), size), dtype=np.uint32)
+    with np.errstate(over='ignore'):
+        for i in range(size):
+            hashed = ((a[i] * gram_values + b[i]) >> np.uint64(32)).astype(np.uint32)
+            signatures[:, i] = np.minimum.reduceat(hashed, starts)
+    return signatures
+
+
+def _block_pairs(keys, valid, max_block):
+    """
+    (a, b) index arrays of every pair of rows sharing a key row in ``keys``
+    (an (n, m) int array), ignoring rows where ``valid`` is False and blocks
+    larger than ``max_block``. Returns the arrays plus the number of skipped blocks.
+    """
+    rows = np.flatnonzero(valid)
+    if len(rows) < 2:
+        return np.empty(0, np.int64), np.empty(0, np.int64), 0
+    _, group = np.unique(keys[rows], axis=0, return_inverse=True)
+    group = group.ravel()
+    order = np.argsort(group, kind='stable')
+    members, group = rows[order], group[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    sizes = np.diff(np.r_[starts, len(group)])
+    pairs_a, pairs_b = [], []
+    # Blocks of the same size are expanded together: an (blocks, size) matrix indexed by triu pairs
+    for size in np.unique(sizes[(sizes >= 2) & (sizes <= max_block)]):
+        block_starts = starts[sizes == size]
+        block = members[block_starts[:, None] + np.arange(size)]
+        first, second = np.triu_indices(size, 1)
+        pairs_a.append(block[:, first].ravel())
+        pairs_b.append(block[:, second].ravel())
+    skipped = int((sizes > max_block).sum())
+    if not pairs_a:
+        return np.empty(0, np.int64), np.empty(0, np.int64), skipped
+    return np.concatenate(pairs_a), np.concatenate(pairs_b), skipped
+
+
+def score_pairs(a, b, signatures, name_codes, account_codes, bank_codes, chunk_size=500000):
+    """Duplicate score (0..1) of each candidate pair, computed in chunks of ``chunk_size`` pairs."""
+    scores = np.empty(len(a), dtype=np.float32)
+    for start in range(0, len(a), chunk_size):
+        i, j = a[start:start + chunk_size], b[start:start + chunk_size]
+        name = (signatures[i] == signatures[j]).mean(axis=1)
+        name[name_codes[i] == name_codes[j]] = 1.0
+        has_accounts = (account_codes[i] >= 0) & (account_codes[j] >= 0)
+        same_account = has_accounts & (account_codes[i] == account_codes[j])
+        # A shared account number is strong evidence on its own; two different ones are evidence against
+        score = np.where(same_account, 0.5 + 0.5 * name, name)
+        score = np.where(has_accounts & ~same_account, name - 0.5, score)
+        same_bank = (bank_codes[i] >= 0) & (bank_codes[i] == bank_codes[j])
+        scores[start:start + chunk_size] = np.clip(score + 0.05 * same_bank, 0.0, 1.0)
+    return scores
+
+
+def find_duplicates(records, min_score=None, max_block=None):
+    """
+    Groups of likely duplicates among ``records``, an iterable of
+    (id, year, company_name, account_no, bank_name) tuples. Returns
+    (groups sorted best first, stats dict).
+    """
+    min_score = getattr(settings, 'DUPLICATE_MIN_SCORE', 0.75) if min_score is None else min_score
+    max_block = max_block or getattr(settings, 'DUPLICATE_MAX_BLOCK', 200)
+    started = time.perf_counter()
+    records = list(records)
+    stats = {'clients': len(records), 'candidate_pairs': 0, 'skipped_blocks': 0, 'groups': 0}
+    if len(records) < 2:
+        return [], stats
+    ids = np.asarray([record[0] for record in records], dtype=np.int64)
+    names = [record[2] for record in records]
+    match_names = [match_name(name) for name in names]
+    core_names = [core_name(name) for name in match_names]
+    years = _codes([record[1] for record in records])
+    name_codes = _codes(match_names)
+    core_codes = _codes(core_names)
+    account_codes = _codes([account_key(record[3]) for record in records])
+    bank_codes = _codes([(record[4] or '').strip().upper() for record in records])
+    prefix_codes = _codes([name.replace(' ', '')[:4] for name in core_names])
+    signatures = minhash_signatures(match_names)
+
+    blockings = [
+        (np.c_[years, core_codes], core_codes >= 0),
+        (np.c_[years, account_codes], account_codes >= 0),
+        (np.c_[years, bank_codes, prefix_codes], (bank_codes >= 0) & (prefix_codes >= 0)),
+    ]
+    for band in range(0, SIGNATURE_SIZE - BAND_ROWS + 1, BAND_ROWS):
+        blockings.append((np.c_[years, signatures[:, band:band + BAND_ROWS].astype(np.int64)], name_codes >= 0))
+    # Each blocking's pairs are scored straight away and only matches kept, so memory
+    # stays proportional to one blocking (a pair found by several blockings is scored again)
+    matched_a, matched_b, matched_scores = [], [], []
+    for keys, valid in blockings:
+        a, b, skipped = _block_pairs(keys, valid, max_block)
+        scores = score_pairs(a, b, signatures, name_codes, account_codes, bank_codes)
+        keep = scores >= min_score
+        matched_a.append(np.minimum(a[keep], b[keep]))
+        matched_b.append(np.maximum(a[keep], b[keep]))
+        matched_scores.append(scores[keep])
+        stats['candidate_pairs'] += len(a)
+        stats['skipped_blocks'] += skipped
+    n = len(records)
+    _, first = np.unique(np.concatenate(matched_a) * n + np.concatenate(matched_b), return_index=True)
+    a, b = np.concatenate(matched_a)[first], np.concatenate(matched_b)[first]
+    groups = _cluster(a, b, np.concatenate(matched_scores)[first], account_codes)
+    result = []
+    for members, score in groups:
+        result.append(DuplicateGroup(
+            year=records[members[0]][1],
+            client_ids=sorted(int(ids[m]) for m in members),
+            score=round(float(score), 3),
+            names=[names[m] for m in sorted(members, key=lambda m: ids[m])],
+        ))
+    result.sort(key=lambda group: (-group.score, group.names[0]))
+    stats['groups'] = len(result)
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Duplicate scan: {stats}")
+    return result, stats
+
+
+def _cluster(a, b, scores, account_codes):
+    """
+    Groups of matched pairs, joined best score first: [(member positions, best pair score)].
+    Two groups holding different account numbers are not joined.
+    """
+    parent = {}
+    accounts = {}  # root -> the group's account code (-1 while none)
+
+    def root(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    members, best = {}, {}
+    order = np.argsort(-scores, kind='stable')
+    for x, y, score in zip(a[order].tolist(), b[order].tolist(), scores[order].tolist()):
+        rx, ry = root(x), root(y)
+        if rx == ry:
+            continue
+        account_x = accounts.get(rx, int(account_codes[x]))
+        account_y = accounts.get(ry, int(account_codes[y]))
+        if account_x >= 0 and account_y >= 0 and account_x != account_y:
+            continue
+        top, child = min(rx, ry), max(rx, ry)
+        parent[child] = top
+        accounts[top] = max(account_x, account_y)
+        best[top] = max(best.pop(child, score), best.get(top, score), score)
+    for x in parent:
+        members.setdefault(root(x), []).append(x)
+    return [(group, best[r]) for r, group in members.items() if len(group) > 1]
+
+
+def client_duplicates(year=None, queryset=None, min_score=None):
+    """Duplicate groups among the clients of ``queryset`` (default all), optionally one year."""
+    clients = Client.objects.all() if queryset is None else queryset
+    if year is not None:
+        clients = clients.filter(year=year)
+    records = clients.order_by('id').values_list('id', 'year', 'company_name', 'account_no', 'bank_name')
+    return find_duplicates(records.iterator(chunk_size=5000), min_score=min_score)
+
+
+def _emails(value):
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+
+def merge_clients(clients):
+    """
+    Fold ``clients`` (all in one year) into the oldest one and delete the rest.
+    Months are combined (the kept client's entry wins for a month both have),
+    emails are combined without duplicates and blank fields are filled from
+    the duplicates. Returns the kept client.
+    """
+    clients = sorted(clients, key=lambda client: client.pk)
+    if len(clients) < 2:
+        raise ValueError("Select at least two clients to merge.")
+    if len({client.year for client in clients}) > 1:
+        raise ValueError("Only clients of the same year can be merged.")
+    keep, duplicates = clients[0], clients[1:]
+
+    months = {}
+    for client in reversed(clients):
+        months.update(client.months if isinstance(client.months, dict) else {})
+    keep.months = dict(sorted(months.items(), key=lambda item: int(item[0]) if str(item[0]).isdigit() else 99))
+    emails, seen = [], set()
+    for client in clients:
+        for email in _emails(client.email):
+            if email and email.lower() not in seen:
+                seen.add(email.lower())
+                emails.append(email)
+    keep.email = emails
+    for name in FILL_FIELDS:
+        if not getattr(keep, name):
+            value = next((getattr(client, name) for client in duplicates if getattr(client, name)), None)
+            if value:
+                setattr(keep, name, value)
+
+    with transaction.atomic():
+        # save() syncs the month assignments and invalidates the client cache (core/signals.py)
+        keep.save()
+        Client.objects.filter(pk__in=[client.pk for client in duplicates]).delete()
+    logger.info(f"Merged clients {[client.pk for client in duplicates]} into {keep.pk} ({keep.company_name})")
+    return keep
@@ -0,0 +1,321 @@
+# core/exporters.py
+"""
+Streaming client exports (XLSX, CSV, NDJSON, Parquet, Arrow IPC).
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` so no model
+instances are built and only one chunk is held in memory. Each writer is a
+generator of byte chunks meant for ``StreamingHttpResponse``: the first bytes
+leave the server immediately and memory stays flat however large the table is.
+
+The XLSX writer produces the workbook incrementally (inline strings inside a
+zip written to a non-seekable buffer) instead of building an openpyxl
+``Workbook`` in memory. Parquet and Arrow IPC are written by core.columnar.
+"""
+import csv
+import json
+import logging
+import re
+import zipfile
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+from core.assignments import months_by_client
+from core.models import Client
+
+logger = logging.getLogger(__name__)
+
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December',
+]
+
+# (header, model field) in the column order of the original export
+EXPORT_COLUMNS = [
+    ("Company Name", 'company_name'),
+    ("Group", 'group'),
+    ("Account No", 'account_no'),
+    ("First Allocated Person", 'first_allocated_person'),
+    ("Review Person", 'review_person'),
+    ("Year", 'year'),
+    ("Months", 'months'),
+    ("Remark", 'remark'),
+    ("Email", 'email'),
+    ("Bank Name", 'bank_name'),
+]
+EXPORT_FIELDS = ['id'] + [field_name for _, field_name in EXPORT_COLUMNS]
+# Columns read from the Client table (months is joined from ClientMonthAssignment)
+CLIENT_FIELDS = [field_name for field_name in EXPORT_FIELDS if field_name != 'months']
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def format_months(months, client_id=None):
+    """Render a months mapping as 'January (PERSON), March (PERSON)'."""
+    months_assigned = []
+    if months:
+        for month_num, person_name in months.items():
+            try:
+                num = int(month_num)
+                if 1 <= num <= len(MONTH_NAMES):
+                    months_assigned.append(f"{MONTH_NAMES[num - 1]} ({person_name})")
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Invalid month format for client {client_id}: {e}")
+    return ", ".join(months_assigned)
+
+
+def iter_client_chunks(queryset=None, chunk_size=None, progress=None):
+    """
+    Yield (rows, months) per chunk of clients, in id order: ``rows`` are
+    CLIENT_FIELDS tuples from ``values_list`` and ``months`` maps each client
+    id to its months, from the ClientMonthAssignment table in one query per
+    chunk. ``progress(rows_done)`` is called after each chunk, if given.
+    """
+    queryset = Client.objects.all() if queryset is None else queryset
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    rows = queryset.order_by('id').values_list(*CLIENT_FIELDS).iterator(chunk_size=chunk_size)
+    done = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk, months_by_client([row[0] for row in chunk])
+        done += len(chunk)
+        if progress:
+            progress(done)
+
+
+def iter_client_values(queryset=None, chunk_size=None, progress=None):
+    """Yield one dict of raw export field values per client, in id order."""
+    for chunk, months in iter_client_chunks(queryset, chunk_size, progress=progress):
+        for row in chunk:
+            values = dict(zip(CLIENT_FIELDS, row))
+            values['months'] = months[values['id']]
+            yield {field_name: values[field_name] for field_name in EXPORT_FIELDS}
+
+
+def iter_client_rows(queryset=None, chunk_size=None, progress=None):
+    """Yield spreadsheet rows (same cells as the original Excel export), one per client."""
+    for values in iter_client_values(queryset, chunk_size, progress=progress):
+        yield [
+            values['company_name'],
+            values['group'] or '',
+            values['account_no'],
+            values['first_allocated_person'],
+            values['review_person'],
+            values['year'],
+            format_months(values['months'], values['id']),
+            values['remark'] or '',
+            ", ".join(values['email']) if values['email'] else '',
+            values['bank_name'] or '',
+        ]
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink that hands its contents back in chunks."""
+
+    closed = False  # pyarrow checks this on file-like sinks
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield UTF-8 CSV (with BOM so Excel detects the encoding) for header + ``rows``."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'.encode('utf-8') + writer.writerow([header for header, _ in EXPORT_COLUMNS]).encode('utf-8')
+    for row in rows:
+        yield writer.writerow(row).encode('utf-8')
+
+
+def stream_ndjson(records):
+    """Yield one JSON object per line; ``email`` and ``months`` keep their JSON structure."""
+    for record in records:
+        yield (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _column_letter(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA'."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = _ILLEGAL_XML_CHARS_RE.sub('', str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(row_number, values, letters):
+    cells = ''.join(
+        _xlsx_cell(f'{letters[i]}{row_number}', value) for i, value in enumerate(values)
+    )
+    return f'<row r="{row_number}">{cells}</row>'.encode('utf-8')
+
+
+def stream_xlsx(rows, flush_size=64 * 1024):
+    """
+    Yield an .xlsx workbook (single sheet, header row + ``rows``) as byte chunks.
+    Output is flushed whenever roughly ``flush_size`` compressed bytes are ready.
+    """
+    header = [header for header, _ in EXPORT_COLUMNS]
+    letters = [_column_letter(i) for i in range(len(header))]
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+        with archive.open('xl/worksheets/sheet1.xml', mode='w') as sheet:
+            sheet.write(_SHEET_HEADER.encode('utf-8'))
+            sheet.write(_xlsx_row(1, header, letters))
+            for row_number, row in enumerate(rows, start=2):
+                if len(row) > len(letters):
+                    letters = [_column_letter(i) for i in range(len(row))]
+                sheet.write(_xlsx_row(row_number, row, letters))
+                if buffer.size >= flush_size:
+                    yield buffer.drain()
+            sheet.write(_SHEET_FOOTER.encode('utf-8'))
+    yield buffer.drain()
+
+
+class ExportFormat:
+    """A named output format: HTTP metadata plus a function producing byte chunks."""
+
+    def __init__(self, name, content_type, extension, render):
+        self.name = name
+        self.content_type = content_type
+        self.extension = extension
+        self._render = render
+
+    def stream(self, queryset=None, progress=None):
+        return self._render(queryset, progress)
+
+
+def _columnar(kind):
+    def render(queryset, progress):
+        # core.columnar imports this module (and pyarrow), so load it on first use
+        from core.columnar import stream_columnar
+        return stream_columnar(kind, queryset, progress=progress)
+    return render
+
+
+EXPORT_FORMATS = {
+    'xlsx': ExportFormat(
+        'xlsx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'xlsx',
+        lambda queryset, progress: stream_xlsx(iter_client_rows(queryset, progress=progress)),
+    ),
+    'csv': ExportFormat(
+        'csv', 'text/csv; charset=utf-8', 'csv',
+        lambda queryset, progress: stream_csv(iter_client_rows(queryset, progress=progress)),
+    ),
+    'ndjson': ExportFormat(
+        'ndjson', 'application/x-ndjson', 'ndjson',
+        lambda queryset, progress: stream_ndjson(iter_client_values(queryset, progress=progress)),
+    ),
+    'parquet': ExportFormat('parquet', 'application/vnd.apache.parquet', 'parquet', _columnar('parquet')),
+    'arrow': ExportFormat('arrow', 'application/vnd.apache.arrow.file', 'arrow', _columnar('arrow')),
+}
+
+
+def get_export_format(list_type):
+    """
+    Map the export URL's ``list_type`` to a format. 'client' (the original
+    Excel link) and any unknown value fall back to XLSX.
+    """
+    return EXPORT_FORMATS.get((list_type or '').lower(), EXPORT_FORMATS['xlsx'])
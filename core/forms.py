@@ -1,6 +1,6 @@
 # forms.py
 from django import forms
-from core.models import Client
+from core.models import Client, MONTH_CHOICES
 
 
 class ClientForm(forms.ModelForm):
@@ -35,4 +35,60 @@ class ClientForm(forms.ModelForm):
             field_value = cleaned_data.get(field_name)
             if field_value:
                 cleaned_data[field_name] = field_value.upper()
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class BulkSelectionForm(forms.Form):
+    """Which clients a bulk edit applies to: explicit ids, or the client_list search plus filters."""
+    ids = forms.CharField(required=False, widget=forms.HiddenInput())
+    search = forms.CharField(max_length=255, required=False)
+    year = forms.IntegerField(required=False)
+    group = forms.CharField(max_length=100, required=False)
+    person = forms.CharField(max_length=100, required=False,
+                             help_text="First allocated or review person")
+
+    def clean_ids(self):
+        value = self.cleaned_data.get('ids') or ''
+        try:
+            return [int(pk) for pk in value.split(',') if pk.strip()]
+        except ValueError:
+            raise forms.ValidationError("Invalid client selection.")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field_name in ['group', 'person']:
+            if cleaned_data.get(field_name):
+                cleaned_data[field_name] = cleaned_data[field_name].upper()
+        # An empty selection would otherwise mean every client in the table
+        if not any(cleaned_data.get(field_name) for field_name in ['ids', 'search', 'year', 'group', 'person']):
+            raise forms.ValidationError("Select clients on the list or enter at least one filter.")
+        return cleaned_data
+
+
+class BulkEditForm(forms.Form):
+    OPERATION_CHOICES = [
+        ('persons', 'Reassign first allocated / review person'),
+        ('month', 'Mark a month done'),
+        ('year', 'Change year'),
+    ]
+    operation = forms.ChoiceField(choices=OPERATION_CHOICES)
+    first_allocated_person = forms.CharField(max_length=100, required=False)
+    review_person = forms.CharField(max_length=100, required=False)
+    month = forms.TypedChoiceField(choices=[('', '---------')] + MONTH_CHOICES, coerce=int,
+                                   empty_value=None, required=False)
+    person = forms.CharField(max_length=100, required=False, label="Done by")
+    year = forms.IntegerField(required=False, label="New year")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        operation = cleaned_data.get('operation')
+        if operation == 'persons' and not (cleaned_data.get('first_allocated_person') or cleaned_data.get('review_person')):
+            raise forms.ValidationError("Enter a first allocated person, a review person or both.")
+        if operation == 'month':
+            if not cleaned_data.get('month'):
+                self.add_error('month', "Choose the month to mark as done.")
+            if not cleaned_data.get('person'):
+                self.add_error('person', "Enter who completed the month.")
+        if operation == 'year' and not cleaned_data.get('year'):
+            self.add_error('year', "Enter the new year.")
+        return cleaned_data
@@ -0,0 +1,208 @@
+# core/fuzzy.py
+"""
+Typo-tolerant company name matching for the "Did you mean" list on search_details.
+
+Names are normalized (case-folded, punctuation dropped, tokens sorted) so
+word order does not matter, then broken into character trigrams. An
+inverted index maps each trigram to the ids of the distinct normalized names
+containing it, stored as numpy arrays. A lookup:
+
+1. counts shared trigrams for every name at once (``np.bincount`` over the
+   query's posting lists), so the table is never scanned row by row
+2. keeps the FUZZY_CANDIDATES names with the highest trigram overlap
+   (Dice coefficient, so long names are not favoured just for their length)
+3. re-ranks those by matching each word to its closest word on the other
+   side (edit-distance ratio), in both directions, so typos cost part of a
+   word and missing or extra words lower the score
+
+The index lives in each process, is built on first use and is rebuilt after
+client writes (client cache version change, see core.caching), at most every
+FUZZY_INDEX_REBUILD_SECONDS.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+import numpy as np
+from django.conf import settings
+
+from core.caching import client_cache
+from core.models import Client
+from core.search import tokenize
+from msystem.db_routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name):
+    """Comparison form of a company name: lowercase word tokens, sorted, single-spaced."""
+    return ' '.join(sorted(tokenize(name)))
+
+
+def trigrams(normalized):
+    """Character trigrams of each token, padded so short words and word starts count."""
+    grams = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _ratio(a, b):
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _aligned(tokens, others, ratios):
+    """Length-weighted mean of each token's best edit ratio against ``others``."""
+    total = weight = 0.0
+    for token in tokens:
+        best = 0.0
+        for other in others:
+            key = (token, other) if token <= other else (other, token)
+            ratio = ratios.get(key)
+            if ratio is None:
+                ratio = ratios[key] = 1.0 if token == other else _ratio(token, other)
+            if ratio > best:
+                best = ratio
+        total += best * len(token)
+        weight += len(token)
+    return total / weight if weight else 0.0
+
+
+def similarity(query, candidate, ratios=None):
+    """
+    0..1 similarity of two normalized names. Every word is matched to its
+    closest word on the other side (so order does not matter and a typo only
+    costs part of one word), in both directions, so missing or extra words
+    lower the score too. ``ratios`` caches word ratios across calls.
+    """
+    if query == candidate:
+        return 1.0
+    ratios = {} if ratios is None else ratios
+    query_tokens, candidate_tokens = query.split(), candidate.split()
+    return (_aligned(query_tokens, candidate_tokens, ratios) + _aligned(candidate_tokens, query_tokens, ratios)) / 2
+
+
+@dataclass
+class FuzzyMatch:
+    company_name: str
+    client_id: int
+    score: float
+
+
+class FuzzyIndex:
+    """Trigram inverted index over distinct normalized company names."""
+
+    def __init__(self, rows):
+        """``rows`` yields (client_id, company_name); each distinct name keeps its first id and spelling."""
+        started = time.perf_counter()
+        names = []       # normalized
+        originals = []   # (company_name, client_id) of the first row with that name
+        positions = {}
+        sizes = []       # trigrams per name
+        postings = defaultdict(list)
+        for client_id, company_name in rows:
+            normalized = normalize_name(company_name)
+            if not normalized or normalized in positions:
+                continue
+            position = positions[normalized] = len(names)
+            names.append(normalized)
+            originals.append((company_name, client_id))
+            grams = trigrams(normalized)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+        self.names = names
+        self.originals = originals
+        self.sizes = np.asarray(sizes, dtype=np.float32)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.version = None
+        self.built_at = time.monotonic()
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, query_grams, limit):
+        """Positions of up to ``limit`` names with the highest trigram Dice coefficient against the query."""
+        lists = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not lists:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        hits = np.flatnonzero(counts)
+        if len(hits) > limit:
+            dice = 2 * counts[hits] / (len(query_grams) + self.sizes[hits])
+            hits = hits[np.argpartition(dice, -limit)[-limit:]]
+        return hits.tolist()
+
+    def search(self, term, limit=5, min_score=None, candidates=None):
+        """Best ``limit`` FuzzyMatch results for ``term`` scoring at least ``min_score``, best first."""
+        min_score = getattr(settings, 'FUZZY_MIN_SCORE', 0.6) if min_score is None else min_score
+        candidates = candidates or getattr(settings, 'FUZZY_CANDIDATES', 50)
+        query = normalize_name(term)
+        if not query:
+            return []
+        scored = []
+        ratios = {}
+        for position in self.candidates(trigrams(query), candidates):
+            score = similarity(query, self.names[position], ratios)
+            if score >= min_score:
+                company_name, client_id = self.originals[position]
+                scored.append(FuzzyMatch(company_name, client_id, round(score, 3)))
+        scored.sort(key=lambda match: (-match.score, match.company_name))
+        return scored[:limit]
+
+
+class ClientFuzzyIndex:
+    """The process-wide FuzzyIndex over Client names, rebuilt when the client cache version moves on."""
+
+    def __init__(self):
+        self.index = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        with primary_reads():
+            # Read the version first: a write during the load makes the index look stale, never fresh
+            version = client_cache.version()
+            rows = Client.objects.order_by('id').values_list('id', 'company_name').iterator(chunk_size=5000)
+            index = FuzzyIndex(rows)
+        index.version = version
+        logger.info(f"Fuzzy name index built: {len(index)} distinct names in {index.build_ms:.0f}ms")
+        return index
+
+    def current(self):
+        index = self.index
+        if index is not None:
+            if index.version == client_cache.version():
+                return index
+            min_age = getattr(settings, 'FUZZY_INDEX_REBUILD_SECONDS', 60)
+            if time.monotonic() - index.built_at < min_age:
+                return index
+        with self._lock:
+            # Another thread may have rebuilt it while this one waited
+            if self.index is None or self.index.version != client_cache.version():
+                self.index = self._build()
+            return self.index
+
+    def search(self, term, limit=5, min_score=None):
+        return self.current().search(term, limit=limit, min_score=min_score)
+
+
+fuzzy_index = ClientFuzzyIndex()
+
+
+def did_you_mean(term, shown=None, limit=None):
+    """
+    Close company names for ``term`` for the "Did you mean" list, leaving out
+    ``shown`` (the client already displayed). Empty when ``term`` is exactly
+    the shown company's name.
+    """
+    limit = limit or getattr(settings, 'FUZZY_SUGGESTIONS', 5)
+    shown_name = normalize_name(shown.company_name) if shown is not None else None
+    if shown is not None and tokenize(term) == tokenize(shown.company_name):
+        return []
+    matches = fuzzy_index.search(term, limit=limit + 1)
+    return [match for match in matches if normalize_name(match.company_name) != shown_name][:limit]
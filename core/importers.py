@@ -0,0 +1,613 @@
+# core/importers.py
+"""
+Bulk client import pipeline for uploaded spreadsheets.
+
+``SheetReader`` streams the upload in batches of IMPORT_READ_BATCH_SIZE rows
+(openpyxl ``read_only`` for .xlsx, the csv module for .csv, pyarrow for
+.parquet/.arrow via core.columnar), so memory stays flat however large the
+file is; only legacy .xls files are loaded whole.
+
+Each batch is validated and normalized column-by-column with pandas rather
+than row-by-row: text is stripped and uppercased the way ``ClientForm.clean``
+does, lengths are checked against the model, years are coerced, emails are
+split into lists and months are parsed into the ``{month: person}`` mapping.
+Valid rows are written with ``bulk_create`` in batches inside one
+transaction; rejected rows are streamed into a CSV error report instead of
+aborting the whole upload.
+"""
+import ast
+import codecs
+import csv
+import json
+import logging
+import math
+import os
+import re
+import uuid
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from core.assignments import sync_clients
+from core.caching import invalidate_client_cache
+from core.exporters import MONTH_NAMES
+from core.models import Client
+
+logger = logging.getLogger(__name__)
+
+# Normalized (stripped, lowercased) sheet header -> Client field
+COLUMN_ALIASES = {
+    'company name': 'company_name',
+    'company_name': 'company_name',
+    'group': 'group',
+    'account no': 'account_no',
+    'account_no': 'account_no',
+    'bank name': 'bank_name',
+    'bank_name': 'bank_name',
+    'email': 'email',
+    'emails': 'email',
+    'first allocated person': 'first_allocated_person',
+    'first_allocated_person': 'first_allocated_person',
+    'review person': 'review_person',
+    'review_person': 'review_person',
+    'year': 'year',
+    'month': 'months',
+    'months': 'months',
+    'remark': 'remark',
+}
+REQUIRED_COLUMNS = ['company_name']
+
+# Columnar upload extensions -> core.columnar format
+COLUMNAR_EXTENSIONS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+
+# Same fields ClientForm.clean uppercases
+UPPERCASE_FIELDS = [
+    'company_name', 'group', 'account_no', 'bank_name',
+    'first_allocated_person', 'review_person', 'remark',
+]
+TEXT_FIELDS = UPPERCASE_FIELDS
+
+MONTH_LOOKUP = {}
+for _number, _name in enumerate(MONTH_NAMES, start=1):
+    MONTH_LOOKUP[_name.lower()] = str(_number)
+    MONTH_LOOKUP[_name[:3].lower()] = str(_number)
+    MONTH_LOOKUP[str(_number)] = str(_number)
+
+# "January (JOHN)", "Jan: JOHN", "3 - JOHN" or just "March"
+_MONTH_ENTRY_RE = re.compile(r'^\s*([A-Za-z]+|\d{1,2})\s*(?:\((.*)\)|[:=\-]\s*(.*))?\s*$')
+_EMAIL_RE = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+
+
+class ImportFileError(Exception):
+    """The upload cannot be read or is missing required columns."""
+
+
+IMPORT_MODE_APPEND = 'append'
+IMPORT_MODE_MERGE = 'merge'
+IMPORT_MODES = (IMPORT_MODE_APPEND, IMPORT_MODE_MERGE)
+
+
+class ImportResult:
+    """Outcome of one import: counts, the diff summary and report tokens."""
+
+    def __init__(self, total=0, created=0, rejected=0, report_token=None, mode=IMPORT_MODE_APPEND,
+                 updated=0, unchanged=0, missing=0, missing_token=None, dry_run=False, summary=None):
+        self.total = total
+        self.created = created
+        self.rejected = rejected
+        self.report_token = report_token
+        self.mode = mode
+        self.updated = updated
+        self.unchanged = unchanged
+        self.missing = missing
+        self.missing_token = missing_token
+        self.dry_run = dry_run
+        self.summary = summary or {}
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class SheetReader:
+    """
+    Reads an uploaded .xlsx/.xls/.csv/.parquet/.arrow file as DataFrames of
+    at most ``batch_size`` raw rows. Each frame's index is the spreadsheet row
+    number minus 2 (header row, 1-based), so row numbers stay right across
+    batches. Completely empty rows are skipped.
+    """
+
+    def __init__(self, uploaded_file, batch_size=None):
+        self.file = uploaded_file
+        self.name = (getattr(uploaded_file, 'name', '') or '').lower()
+        self.batch_size = batch_size or getattr(settings, 'IMPORT_READ_BATCH_SIZE', 5000)
+        # Row count from the sheet's dimension record where the format has one (for progress)
+        self.estimated_rows = None
+
+    def batches(self):
+        try:
+            if self.name.endswith('.csv'):
+                yield from self._frames(self._csv_rows())
+            elif self.name.endswith('.xls'):
+                yield from self._legacy_excel()
+            elif self.name.endswith(tuple(COLUMNAR_EXTENSIONS)):
+                yield from self._columnar()
+            else:
+                yield from self._xlsx()
+        except ImportFileError:
+            raise
+        except Exception as e:
+            raise ImportFileError(f"Error reading Excel file: {e}") from e
+
+    def _frames(self, rows):
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError("The file is empty.")
+        columns = [str(column).strip() if column is not None else '' for column in header]
+        batch, index = [], []
+        yielded = False
+        for row_number, row in enumerate(rows, start=2):
+            if all(value is None or value == '' for value in row):
+                continue
+            # Pad/trim ragged rows to the header width
+            batch.append(tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row)))
+            index.append(row_number - 2)
+            if len(batch) >= self.batch_size:
+                yield pd.DataFrame(batch, columns=columns, index=pd.Index(index, dtype='int64'))
+                batch, index = [], []
+                yielded = True
+        if batch or not yielded:
+            # A header-only file still yields one (empty) frame so its columns are checked
+            yield pd.DataFrame(batch, columns=columns, index=pd.Index(index, dtype='int64'))
+
+    def _csv_rows(self):
+        # Decoded line by line (utf-8, optional BOM); blank cells become None like empty Excel cells
+        lines = codecs.iterdecode(self.file, 'utf-8-sig')
+        for row in csv.reader(lines):
+            yield [value if value != '' else None for value in row]
+
+    def _xlsx(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            if sheet.max_row:
+                self.estimated_rows = max(sheet.max_row - 1, 0)
+            yield from self._frames(sheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    def _columnar(self):
+        from core.columnar import ColumnarReader
+
+        kind = COLUMNAR_EXTENSIONS[os.path.splitext(self.name)[1]]
+        reader = ColumnarReader(kind, self.file, self.batch_size)
+        self.estimated_rows = reader.total_rows
+        yield from reader.frames()
+
+    def _legacy_excel(self):
+        # openpyxl cannot read the old binary format; pandas loads it whole
+        df = pd.read_excel(self.file, dtype=object)
+        self.estimated_rows = len(df)
+        for start in range(0, len(df), self.batch_size):
+            yield df.iloc[start:start + self.batch_size]
+        if not len(df):
+            yield df
+
+
+def normalize_columns(df):
+    """Map sheet headers onto Client fields; raise ImportFileError if required ones are missing."""
+    df = df.rename(columns=lambda column: str(column).strip().lower())
+    df = df.rename(columns=COLUMN_ALIASES)
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        labels = [header for header, field in COLUMN_ALIASES.items() if field in missing and ' ' in header]
+        raise ImportFileError(f"Missing columns: {', '.join(labels or missing)}")
+    known = [column for column in dict.fromkeys(COLUMN_ALIASES.values()) if column in df.columns]
+    return df.loc[:, ~df.columns.duplicated()][known]
+
+
+def _is_blank(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)) or value == ''
+
+
+def parse_months(value, default_person=None):
+    """
+    Parse a months cell into ``{'<month number>': '<person>'}``.
+
+    Accepts a dict or JSON/dict literal, the export format
+    ('January (JOHN), March (ANN)') and bare month names or numbers, which are
+    credited to ``default_person``. Raises ValueError for anything else.
+    """
+    if _is_blank(value):
+        return {}
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        text = str(value).strip()
+        if text.startswith('{'):
+            try:
+                items = json.loads(text).items()
+            except ValueError:
+                try:
+                    items = ast.literal_eval(text).items()
+                except (ValueError, SyntaxError, AttributeError):
+                    raise ValueError(f"Invalid months value: {text}")
+        else:
+            items = []
+            for entry in filter(None, (part.strip() for part in text.split(','))):
+                match = _MONTH_ENTRY_RE.match(entry)
+                if not match:
+                    raise ValueError(f"Invalid month entry: {entry}")
+                person = (match.group(2) or match.group(3) or '').strip() or default_person
+                items.append((match.group(1), person))
+    months = {}
+    for month, person in items:
+        number = MONTH_LOOKUP.get(str(month).strip().lower())
+        if number is None:
+            raise ValueError(f"Unknown month: {month}")
+        months[number] = '' if _is_blank(person) else str(person).strip()
+    return months
+
+
+def _text_column(series):
+    """Strip a column to pandas strings, with blanks as <NA>."""
+    text = series.astype('string').str.strip()
+    return text.mask(text == '')
+
+
+def prepare_rows(df):
+    """
+    Validate and normalize a DataFrame of sheet rows.
+
+    Returns (valid, rejected): ``valid`` holds Client field values ready for
+    ``bulk_create``; ``rejected`` holds the original cells plus ``row`` (the
+    spreadsheet row number) and ``errors`` (a '; '-joined message list).
+    """
+    df = normalize_columns(df)
+    original = df.copy()
+    errors = pd.Series([[] for _ in range(len(df))], index=df.index, dtype=object)
+
+    def flag(mask, message):
+        for index in mask[mask.fillna(False)].index:
+            errors[index].append(message)
+
+    clean = pd.DataFrame(index=df.index)
+    for field_name in TEXT_FIELDS:
+        if field_name in df.columns:
+            column = _text_column(df[field_name])
+            if field_name in UPPERCASE_FIELDS:
+                column = column.str.upper()
+            max_length = Client._meta.get_field(field_name).max_length
+            if max_length:
+                flag(column.str.len() > max_length, f"{field_name} longer than {max_length} characters")
+            clean[field_name] = column
+        else:
+            clean[field_name] = pd.Series(pd.NA, index=df.index, dtype='string')
+
+    flag(clean['company_name'].isna(), "company_name is required")
+
+    default_year = Client._meta.get_field('year').default
+    if 'year' in df.columns:
+        raw_year = df['year'].mask(df['year'].astype('string').str.strip() == '')
+        year = pd.to_numeric(raw_year, errors='coerce')
+        flag(raw_year.notna() & year.isna(), "year is not a number")
+        flag(year.notna() & (year % 1 != 0), "year must be a whole number")
+        clean['year'] = year.fillna(default_year)
+    else:
+        clean['year'] = default_year
+
+    if 'email' in df.columns:
+        # Accept "a@x.com, b@y.com", semicolons, whitespace and "['a@x.com']" literals
+        emails = (
+            _text_column(df['email']).fillna('')
+            .str.replace(r"[\[\]'\"]", ' ', regex=True)
+            .str.split(r'[,;\s]+', regex=True)
+            .map(lambda parts: [part for part in parts if part])
+        )
+        exploded = emails.explode().dropna()
+        bad = ~exploded.str.fullmatch(_EMAIL_RE)
+        flag(bad.groupby(level=0).any().reindex(df.index, fill_value=False), "invalid email address")
+        clean['email'] = emails
+    else:
+        clean['email'] = [[] for _ in range(len(df))]
+
+    if 'months' in df.columns:
+        def parse_cell(args):
+            value, person = args
+            try:
+                return parse_months(value, default_person=None if _is_blank(person) else person), None
+            except ValueError as e:
+                return {}, str(e)
+        parsed = pd.Series(
+            list(map(parse_cell, zip(df['months'], clean['first_allocated_person']))),
+            index=df.index, dtype=object,
+        )
+        clean['months'] = parsed.map(lambda pair: pair[0])
+        for index, message in parsed.map(lambda pair: pair[1]).dropna().items():
+            errors[index].append(f"invalid months ({message})")
+    else:
+        clean['months'] = [{} for _ in range(len(df))]
+
+    has_errors = errors.map(bool)
+    rejected = original[has_errors].copy()
+    rejected.insert(0, 'errors', errors[has_errors].map('; '.join))
+    # +2: one for the header row, one because spreadsheets count from 1
+    rejected.insert(0, 'row', rejected.index + 2)
+    valid = clean[~has_errors]
+    return valid, rejected
+
+
+def _records(valid):
+    """Prepared rows as plain dicts (``<NA>`` -> None) with their spreadsheet row in '_row'."""
+    records = []
+    for index, record in zip(valid.index, valid.to_dict('records')):
+        for key, value in record.items():
+            if value is pd.NA:
+                record[key] = None
+        record['year'] = int(record['year'])
+        record['_row'] = index + 2
+        records.append(record)
+    return records
+
+
+def build_clients(records):
+    """Turn prepared records into unsaved Client instances."""
+    return [
+        Client(**{key: value for key, value in record.items() if key != '_row'})
+        for record in records
+    ]
+
+
+def present_fields(df):
+    """Client fields actually supplied by the sheet (merges must not blank the others)."""
+    return list(normalize_columns(df).columns)
+
+
+def natural_key_fields():
+    return tuple(getattr(settings, 'CLIENT_IMPORT_NATURAL_KEY', ('company_name', 'account_no', 'year')))
+
+
+def _key_part(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    return str(value).strip().upper()
+
+
+def natural_key(record, fields):
+    """Normalized natural key of a record/values() row, so legacy lowercase rows still match."""
+    return tuple(_key_part(record.get(field_name)) for field_name in fields)
+
+
+def _same(old, new):
+    if old in (None, '') and new in (None, ''):
+        return True
+    return old == new
+
+
+class MergePlan:
+    """In-memory diff between a sheet and the existing clients, computed before any write."""
+
+    def __init__(self):
+        self.to_create = []     # records to insert
+        self.to_update = []     # (client id, {field: new value}) with changed fields only
+        self.unchanged = 0
+        self.missing = []       # existing rows (values dicts) in scope but absent from the sheet
+        self.duplicates = []    # sheet records superseded by a later row with the same key
+
+    def summary(self):
+        field_changes = {}
+        for _, changes in self.to_update:
+            for field_name in changes:
+                field_changes[field_name] = field_changes.get(field_name, 0) + 1
+        return {
+            'create': len(self.to_create),
+            'update': len(self.to_update),
+            'unchanged': self.unchanged,
+            'missing': len(self.missing),
+            'duplicates': len(self.duplicates),
+            'field_changes': field_changes,
+        }
+
+
+def plan_merge(records, fields, key_fields=None, report_missing=False):
+    """
+    Match ``records`` against existing clients on ``key_fields`` and work out
+    what to insert and which fields to update. When the key includes ``year``
+    only clients from the sheet's years are loaded (and count as "missing").
+    """
+    key_fields = tuple(key_fields or natural_key_fields())
+    plan = MergePlan()
+
+    incoming = {}
+    for record in records:
+        key = natural_key(record, key_fields)
+        if key in incoming:
+            plan.duplicates.append(incoming[key])
+        incoming[key] = record
+
+    scope = Client.objects.all()
+    if 'year' in key_fields:
+        scope = scope.filter(year__in={record['year'] for record in records})
+    existing = {}
+    columns = ['id'] + list(dict.fromkeys(list(fields) + list(key_fields)))
+    for row in scope.order_by('id').values(*columns).iterator(chunk_size=5000):
+        # With pre-existing duplicates the oldest row is the one kept in sync
+        existing.setdefault(natural_key(row, key_fields), row)
+
+    for key, record in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            plan.to_create.append(record)
+            continue
+        changes = {
+            field_name: record[field_name]
+            for field_name in fields
+            if not _same(current[field_name], record[field_name])
+        }
+        if changes:
+            plan.to_update.append((current['id'], changes))
+        else:
+            plan.unchanged += 1
+
+    if report_missing:
+        plan.missing = [row for key, row in existing.items() if key not in incoming]
+    return plan
+
+
+def apply_merge(plan, batch_size, progress=None, done_offset=0, total=None):
+    """Write a MergePlan: bulk_create new rows, bulk_update each group of changed fields."""
+    done = done_offset
+    with transaction.atomic():
+        clients = build_clients(plan.to_create)
+        for start in range(0, len(clients), batch_size):
+            batch = Client.objects.bulk_create(clients[start:start + batch_size])
+            sync_clients(batch, batch_size=batch_size)
+            done += len(batch)
+            if progress:
+                progress(done, total)
+        groups = {}
+        for pk, changes in plan.to_update:
+            groups.setdefault(tuple(sorted(changes)), []).append(Client(pk=pk, **changes))
+        for fields, objs in groups.items():
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                # Month assignments follow through ClientQuerySet.update
+                Client.objects.bulk_update(batch, list(fields))
+                done += len(batch)
+                if progress:
+                    progress(done, total)
+        # bulk writes send no signals
+        invalidate_client_cache()
+
+
+def write_report(frame):
+    """Save a report DataFrame as CSV under IMPORT_REPORT_DIR and return its token."""
+    report = ReportWriter()
+    report.add(frame)
+    return report.close()
+
+
+class ReportWriter:
+    """
+    Appends report rows to a CSV under IMPORT_REPORT_DIR as they come, so a
+    large import never holds its rejected rows in memory. The first frame
+    fixes the columns; later frames are aligned to them.
+    """
+
+    def __init__(self):
+        self.token = None
+        self.rows = 0
+        self.columns = None
+        self._file = None
+
+    def add(self, frame):
+        if not len(frame):
+            return
+        if self._file is None:
+            report_dir = getattr(settings, 'IMPORT_REPORT_DIR', os.path.join(settings.MEDIA_ROOT, 'import_reports'))
+            os.makedirs(report_dir, exist_ok=True)
+            self.token = uuid.uuid4().hex
+            self._file = open(os.path.join(report_dir, f"{self.token}.csv"), 'w', newline='', encoding='utf-8')
+            self.columns = list(frame.columns)
+            frame.to_csv(self._file, index=False)
+        else:
+            frame.reindex(columns=self.columns).to_csv(self._file, index=False, header=False)
+        self.rows += len(frame)
+
+    def close(self):
+        """Finish the file; returns its token (None when no rows were written)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.token
+
+
+def error_report_path(token):
+    """Filesystem path of a report token, or None if the token is malformed or unknown."""
+    if not re.fullmatch(r'[0-9a-f]{32}', token or ''):
+        return None
+    report_dir = getattr(settings, 'IMPORT_REPORT_DIR', os.path.join(settings.MEDIA_ROOT, 'import_reports'))
+    path = os.path.join(report_dir, f"{token}.csv")
+    return path if os.path.exists(path) else None
+
+
+def import_clients(uploaded_file, batch_size=None, progress=None, mode=IMPORT_MODE_APPEND,
+                   report_missing=False, dry_run=False):
+    """
+    Import an uploaded spreadsheet.
+
+    ``append`` inserts every valid row. ``merge`` matches rows to existing
+    clients on CLIENT_IMPORT_NATURAL_KEY, updates only the fields that changed
+    and inserts the rest; with ``report_missing`` the clients absent from the
+    sheet are written to a second report. Writes happen in batches inside one
+    transaction (all or nothing on database errors); invalid rows are skipped
+    and written to an error report. ``dry_run`` computes the same summary
+    without writing. ``progress(rows_done, rows_total)`` is called per batch
+    (``rows_total`` is an estimate, or None when the file does not say).
+
+    The file is read batch by batch. An append import holds one batch at a
+    time; a merge keeps the prepared rows (not the sheet) for the diff
+    against the existing clients.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    batch_size = batch_size or getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+    reader = SheetReader(uploaded_file)
+    report = ReportWriter()
+    result = ImportResult(mode=mode, dry_run=dry_run)
+    fields = None
+    records = []
+    try:
+        with transaction.atomic():
+            for chunk in reader.batches():
+                if fields is None:
+                    # Raises ImportFileError for missing columns before anything is written
+                    fields = present_fields(chunk)
+                result.total += len(chunk)
+                valid, rejected = prepare_rows(chunk)
+                report.add(rejected)
+                if mode == IMPORT_MODE_MERGE:
+                    records.extend(_records(valid))
+                    continue
+                created = _records(valid)
+                result.created += len(created)
+                if not dry_run:
+                    clients = build_clients(created)
+                    for start in range(0, len(clients), batch_size):
+                        batch = Client.objects.bulk_create(clients[start:start + batch_size])
+                        # bulk_create skips post_save, so mirror months into the assignment table here
+                        sync_clients(batch, batch_size=batch_size)
+                if progress:
+                    progress(result.total, reader.estimated_rows)
+
+            if mode == IMPORT_MODE_MERGE:
+                plan = plan_merge(records, fields, report_missing=report_missing)
+                if plan.duplicates:
+                    duplicates = pd.DataFrame(plan.duplicates).rename(columns={'_row': 'row'})
+                    duplicates.insert(1, 'errors', "duplicate key in file; a later row was used instead")
+                    report.add(duplicates)
+                result.summary = plan.summary()
+                result.created = len(plan.to_create)
+                result.updated = len(plan.to_update)
+                result.unchanged = plan.unchanged
+                result.missing = len(plan.missing)
+                if not dry_run:
+                    apply_merge(plan, batch_size, progress=progress, done_offset=report.rows, total=result.total)
+                if plan.missing:
+                    result.missing_token = write_report(pd.DataFrame(plan.missing))
+            else:
+                result.summary = {'create': result.created}
+                if result.created and not dry_run:
+                    invalidate_client_cache()
+    finally:
+        result.report_token = report.close()
+    result.rejected = report.rows
+
+    logger.info(
+        f"{'Planned' if dry_run else 'Ran'} {mode} import of {result.total} client rows: "
+        f"{result.created} created, {result.updated} updated, {result.rejected} rejected")
+    return result
@@ -0,0 +1,292 @@
+# core/jobs.py
+"""
+Lightweight database-backed job queue.
+
+Long-running work (spreadsheet imports and exports) is stored as ``Job``
+rows and executed by ``manage.py run_jobs``, so requests return immediately
+and nothing beyond the existing database is needed (no Redis/Celery).
+
+Workers claim jobs with a conditional UPDATE (``status='queued'`` ->
+``'running'``), which is atomic on every database, so several worker
+threads or processes can poll the same table safely.
+
+A running job's ``heartbeat_at`` is refreshed by its progress reports and by
+a heartbeat thread, and only a job whose heartbeat stopped for
+JOB_STALE_SECONDS is re-queued, so a second worker never restarts an import
+that is still running. Files a job reads or writes are deleted once it has
+finished for JOB_FILES_RETENTION_SECONDS (``expire_job_files``, run
+periodically by ``manage.py run_jobs``).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def register_job(kind):
+    """Decorator registering ``handler(job, reporter)`` for jobs of ``kind``."""
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def job_files_dir():
+    path = getattr(settings, 'JOB_FILES_DIR', os.path.join(settings.MEDIA_ROOT, 'jobs'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def enqueue_job(kind, params=None, user=None, uploaded_file=None):
+    """Create a queued Job; an uploaded file is copied to JOB_FILES_DIR for the worker."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    input_path = ''
+    if uploaded_file is not None:
+        safe_name = os.path.basename(uploaded_file.name or 'upload')
+        input_path = os.path.join(job_files_dir(), f"{uuid.uuid4().hex}_{safe_name}")
+        with open(input_path, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                destination.write(chunk)
+    job = Job.objects.create(
+        kind=kind,
+        params=params or {},
+        input_file=input_path,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    logger.info(f"Enqueued job {job.pk} ({kind})")
+    return job
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def claim_next_job(worker_name=None, kinds=None):
+    """Atomically move the oldest queued job to 'running' and return it (or None)."""
+    worker_name = worker_name or default_worker_name()
+    queued = Job.objects.filter(status=Job.STATUS_QUEUED)
+    if kinds:
+        queued = queued.filter(kind__in=kinds)
+    for candidate_id in queued.order_by('created_at', 'id').values_list('id', flat=True)[:10]:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=candidate_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, started_at=now, heartbeat_at=now, worker=worker_name[:100])
+        if claimed:
+            return Job.objects.get(pk=candidate_id)
+    return None
+
+
+def requeue_stale_jobs(max_age_seconds=None):
+    """Put 'running' jobs whose heartbeat stopped (their worker died) back in the queue."""
+    max_age_seconds = max_age_seconds or getattr(settings, 'JOB_STALE_SECONDS', 300)
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return Job.objects.filter(stale, status=Job.STATUS_RUNNING).update(
+        status=Job.STATUS_QUEUED, worker='', started_at=None, heartbeat_at=None)
+
+
+def expire_job_files(max_age_seconds=None):
+    """Delete the input and result files of jobs finished more than JOB_FILES_RETENTION_SECONDS ago."""
+    max_age_seconds = max_age_seconds or getattr(settings, 'JOB_FILES_RETENTION_SECONDS', 86400)
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    finished = Job.objects.filter(status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED], finished_at__lt=cutoff)
+    expired = 0
+    for job in finished.exclude(input_file='', result_file='').only('id', 'input_file', 'result_file'):
+        for path in (job.input_file, job.result_file):
+            if path:
+                _remove(path)
+        Job.objects.filter(pk=job.pk).update(input_file='', result_file='')
+        expired += 1
+    if expired:
+        logger.info(f"Deleted the files of {expired} finished job(s)")
+    return expired
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not delete job file {path}: {e}")
+
+
+class ProgressReporter:
+    """
+    Publishes job progress at most every ``interval`` seconds.
+
+    Handlers often run inside a transaction (imports), where updates through
+    the main connection would stay invisible to pollers until commit. So on
+    databases with row-level locking the reporter writes through its own
+    short-lived connection.
+    """
+
+    def __init__(self, job, interval=1.0):
+        self.job = job
+        self.interval = interval
+        self._last = 0.0
+        self._connection = None
+
+    def __call__(self, done, total=None, force=False):
+        self.job.progress = done
+        if total is not None:
+            self.job.total = total
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        try:
+            self._write()
+        except DatabaseError as e:
+            logger.warning(f"Could not record progress for job {self.job.pk}: {e}")
+
+    def _write(self):
+        alias = Job.objects.db
+        now = timezone.now()
+        if connections[alias].vendor == 'sqlite':
+            # SQLite allows one writer at a time; a second connection would just block
+            Job.objects.filter(pk=self.job.pk).update(
+                progress=self.job.progress, total=self.job.total, heartbeat_at=now)
+            return
+        if self._connection is None:
+            self._connection = connections.create_connection(alias)
+        with self._connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Job._meta.db_table} SET progress = %s, total = %s, heartbeat_at = %s WHERE id = %s",
+                [self.job.progress, self.job.total, now, self.job.pk],
+            )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refreshes a running job's ``heartbeat_at`` every ``interval`` seconds from
+    its own thread (and so its own connection), so a long step that reports
+    no progress still shows the job is alive.
+    """
+
+    def __init__(self, job, interval):
+        super().__init__(name=f"job-{job.pk}-heartbeat", daemon=True)
+        self.job_id = job.pk
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job_id, status=Job.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+                except DatabaseError as e:
+                    logger.warning(f"Could not record heartbeat for job {self.job_id}: {e}")
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome. Never raises."""
+    handler = JOB_HANDLERS.get(job.kind)
+    reporter = ProgressReporter(job, interval=getattr(settings, 'JOB_PROGRESS_INTERVAL', 1.0))
+    heartbeat = None
+    if connections[Job.objects.db].vendor != 'sqlite':
+        # On SQLite the progress reports are the heartbeat: a second writer would only wait for the lock
+        heartbeat = Heartbeat(job, interval=getattr(settings, 'JOB_HEARTBEAT_SECONDS', 30))
+        heartbeat.start()
+    started = time.monotonic()
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        job.result = handler(job, reporter) or {}
+        job.status = Job.STATUS_SUCCEEDED
+        if job.total is not None:
+            job.progress = job.total
+    except Exception as e:
+        logger.error(f"Job {job.pk} ({job.kind}) failed: {e}")
+        job.status = Job.STATUS_FAILED
+        job.error = f"{e}\n\n{traceback.format_exc()}"
+    finally:
+        if heartbeat is not None:
+            heartbeat.stop()
+        reporter.close()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'result_file', 'progress', 'total', 'error', 'finished_at'])
+    logger.info(f"Job {job.pk} ({job.kind}) {job.status} in {time.monotonic() - started:.1f}s")
+    return job
+
+
+@register_job('import_clients')
+def _import_clients_job(job, reporter):
+    from core.importers import import_clients
+
+    try:
+        with open(job.input_file, 'rb') as upload:
+            # The importer picks the reader from the original file name
+            result = import_clients(
+                File(upload, name=job.params.get('filename') or job.input_file),
+                progress=reporter,
+                mode=job.params.get('mode', 'append'),
+                report_missing=job.params.get('report_missing', False),
+                dry_run=job.params.get('dry_run', False),
+            )
+    finally:
+        # Failed imports are not retried, so the upload is never needed again
+        _remove(job.input_file)
+    return result.as_dict()
+
+
+@register_job('export_clients')
+def _export_clients_job(job, reporter):
+    from core.exporters import get_export_format
+    from core.models import Client
+
+    export_format = get_export_format(job.params.get('format'))
+    queryset = Client.objects.all()
+    total = queryset.count()
+    reporter(0, total, force=True)
+    path = os.path.join(job_files_dir(), f"export_{job.pk}.{export_format.extension}")
+    with open(path, 'wb') as output:
+        for chunk in export_format.stream(queryset, progress=lambda done: reporter(done, total)):
+            output.write(chunk)
+    job.result_file = path
+    return {
+        'rows': total,
+        'format': export_format.name,
+        'filename': f"client_list.{export_format.extension}",
+        'content_type': export_format.content_type,
+    }
+
+
+@register_job('find_duplicates')
+def _find_duplicates_job(job, reporter):
+    from dataclasses import asdict
+
+    from core.duplicates import client_duplicates
+
+    groups, stats = client_duplicates(year=job.params.get('year'), min_score=job.params.get('min_score'))
+    limit = getattr(settings, 'DUPLICATE_REPORT_LIMIT', 500)
+    # The admin report re-reads the listed clients, so ids and names are enough here
+    return {'stats': stats, 'groups': [asdict(group) for group in groups[:limit]]}
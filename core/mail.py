@@ -0,0 +1,150 @@
+# core/mail.py
+"""
+Outbox for transactional email (signup OTPs, password resets).
+
+Views call ``queue_mail`` which only inserts an ``OutboundEmail`` row, so a
+slow or failing provider never blocks a request. ``manage.py
+send_queued_mail`` delivers due messages in batches over one backend
+connection (one SMTP/API session per batch instead of one per message).
+Failed sends are retried with exponential backoff until
+EMAIL_QUEUE_MAX_ATTEMPTS is reached, then marked failed.
+
+Messages can carry an ``expires_at`` (OTPs, reset links): one still undelivered
+by then is marked failed instead of sent, since its content no longer works.
+
+Messages are claimed with a conditional UPDATE (``status='queued'`` ->
+``'sending'``) as in core.jobs, so several senders can run safely.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from core.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(subject, message, recipient_list, from_email=None, html_message=None, expires_at=None):
+    """
+    Store an email for background delivery (same arguments as ``send_mail``).
+    ``expires_at``: don't deliver it after this time.
+    """
+    email = OutboundEmail.objects.create(
+        subject=subject[:255],
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipient_list),
+        expires_at=expires_at,
+    )
+    logger.info(f"Queued email {email.pk} to {', '.join(email.to)}")
+    return email
+
+
+def backoff_delay(attempts):
+    """Wait before retry number ``attempts``: base * 2**(attempts - 1), capped."""
+    base = getattr(settings, 'EMAIL_QUEUE_BACKOFF_SECONDS', 30)
+    cap = getattr(settings, 'EMAIL_QUEUE_MAX_BACKOFF_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def claim_due(limit):
+    """Atomically claim up to ``limit`` messages whose next attempt is due."""
+    now = timezone.now()
+    candidates = OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_QUEUED, next_attempt_at__lte=now,
+    ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit]
+    claimed = []
+    for pk in candidates:
+        if OutboundEmail.objects.filter(pk=pk, status=OutboundEmail.STATUS_QUEUED).update(
+                status=OutboundEmail.STATUS_SENDING, claimed_at=now):
+            claimed.append(pk)
+    return list(OutboundEmail.objects.filter(pk__in=claimed).order_by('id'))
+
+
+def requeue_stale(max_age_seconds=None):
+    """Return messages stuck in 'sending' (sender died mid-batch) to the queue."""
+    max_age_seconds = max_age_seconds or getattr(settings, 'EMAIL_QUEUE_STALE_SECONDS', 600)
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    return OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=cutoff).update(
+        status=OutboundEmail.STATUS_QUEUED, claimed_at=None)
+
+
+def _build(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject, body=email.body, from_email=email.from_email,
+        to=email.to, connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    if email.attempts >= getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5):
+        email.status = OutboundEmail.STATUS_FAILED
+        logger.error(f"Giving up on email {email.pk} after {email.attempts} attempts: {error}")
+    else:
+        email.status = OutboundEmail.STATUS_QUEUED
+        email.next_attempt_at = timezone.now() + backoff_delay(email.attempts)
+        logger.warning(f"Email {email.pk} failed (attempt {email.attempts}), retrying at "
+                       f"{email.next_attempt_at:%H:%M:%S}: {error}")
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _expire(email):
+    email.status = OutboundEmail.STATUS_FAILED
+    email.last_error = f"Expired at {email.expires_at:%Y-%m-%d %H:%M:%S} before delivery"
+    email.save(update_fields=['status', 'last_error'])
+    logger.warning(f"Email {email.pk} expired before delivery, not sending it")
+
+
+def send_batch(batch_size=None):
+    """
+    Deliver one batch of due messages over a single backend connection.
+    Returns (sent, failed) counts, expired messages counting as failed;
+    (0, 0) means nothing was due.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 50)
+    emails = claim_due(batch_size)
+    if not emails:
+        return 0, 0
+    now = timezone.now()
+    sent = failed = 0
+    for email in [email for email in emails if email.is_expired(now)]:
+        _expire(email)
+        failed += 1
+    emails = [email for email in emails if not email.is_expired(now)]
+    if not emails:
+        return 0, failed
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Provider unreachable: every message in the batch counts as one failed attempt
+        for email in emails:
+            _record_failure(email, e)
+        return 0, failed + len(emails)
+    try:
+        for email in emails:
+            try:
+                _build(email, connection).send()
+            except Exception as e:
+                _record_failure(email, e)
+                failed += 1
+                continue
+            email.attempts += 1
+            email.status = OutboundEmail.STATUS_SENT
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            email.save(update_fields=['attempts', 'status', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+    logger.info(f"Email batch done: {sent} sent, {failed} failed")
+    return sent, failed
@@ -0,0 +1,223 @@
+"""
+Compare concurrent-request throughput of the WSGI and ASGI deployments.
+
+Starts one gunicorn server per mode on local ports, all with the same number of workers:
+
+* ``wsgi``      - ``gunicorn msystem.wsgi`` (the current deployment), sync views
+* ``asgi``      - ``gunicorn -c msystem/gunicorn_asgi.py msystem.asgi``, async views under /async/
+* ``asgi-sync`` - the ASGI server running the sync views (cost of the sync adapter)
+
+then sends --requests requests per view at each --concurrency level from a
+thread pool and reports requests/second, latency percentiles and errors.
+A temporary superuser is logged in for the run; both are removed afterwards,
+as are clients added with --seed-clients.
+
+    python manage.py benchmark_asgi --workers 2 --concurrency 1,10,50
+    python manage.py benchmark_asgi --seed-clients 10000 --output benchmark_asgi.json
+
+The servers read the same settings and database as this command, so run it
+against a PostgreSQL copy for numbers that mean something (SQLite serializes
+writes and its async support is limited).
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.test import Client as TestClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmarking import git_revision, summarize
+from core.caching import invalidate_client_cache
+from core.models import Client
+from core.synthetic import seed_clients
+
+VIEWS = ('dashboard', 'client_list', 'search_details', 'search_company')
+
+MODES = {
+    # mode: (gunicorn arguments, suffix of the benchmarked URL names)
+    'wsgi': (['msystem.wsgi:application'], ''),
+    'asgi': (['-c', 'msystem/gunicorn_asgi.py', 'msystem.asgi:application'], '_async'),
+    'asgi-sync': (['-c', 'msystem/gunicorn_asgi.py', 'msystem.asgi:application'], ''),
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent throughput of the WSGI (sync) and ASGI (async) deployments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default='wsgi,asgi,asgi-sync',
+                            help=f"Comma-separated servers to test ({', '.join(MODES)})")
+        parser.add_argument('--concurrency', default='1,10,50', help='Comma-separated concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and concurrency level')
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers for every server')
+        parser.add_argument('--port', type=int, default=8101, help='First local port to bind')
+        parser.add_argument('--view', action='append', dest='views', choices=VIEWS,
+                            help='Only benchmark this view (repeatable)')
+        parser.add_argument('--seed-clients', type=int, default=0,
+                            help='Insert this many synthetic clients for the run (deleted afterwards)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--startup-timeout', type=float, default=30.0)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(unknown)}")
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of integers.")
+        if not levels or min(levels) <= 0:
+            raise CommandError("--concurrency must contain positive integers.")
+
+        # The servers are separate processes, so the user and seeded rows have to be committed
+        last_id = Client.objects.aggregate(last=Max('id'))['last'] or 0
+        if options['seed_clients']:
+            self.stdout.write(f"Seeding {options['seed_clients']} clients...")
+            seed_clients(options['seed_clients'], seed=options['seed'])
+        user = User.objects.create_superuser(
+            f"benchmark-asgi-{os.getpid()}", 'benchmark@example.com', None)
+        results = []
+        try:
+            session = self._login(user)
+            sample = Client.objects.order_by('id').values('company_name').first()
+            term = sample['company_name'] if sample else 'BENCHMARK'
+            for index, mode in enumerate(modes):
+                port = options['port'] + index
+                with self._server(mode, port, options):
+                    base = f"http://127.0.0.1:{port}"
+                    for view in options['views'] or VIEWS:
+                        url, params = self._request_for(view, MODES[mode][1], term)
+                        for level in levels:
+                            results.append(self._load(
+                                base + url, params, session, mode, view, level, options['requests']))
+        finally:
+            user.delete()
+            if options['seed_clients']:
+                Client.objects.filter(id__gt=last_id).delete()
+                invalidate_client_cache()
+
+        self._print_comparison(results)
+        if options['output']:
+            report = {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'workers': options['workers'],
+                'requests': options['requests'],
+                'results': results,
+            }
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+
+    def _login(self, user):
+        """Session cookie for ``user``, stored in the database the servers read."""
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            client = TestClient()
+            client.force_login(user)
+        return {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+    def _request_for(self, view, suffix, term):
+        params = {
+            'dashboard': {},
+            'client_list': {},
+            'search_details': {'search': term},
+            'search_company': {'q': term.split()[0] if term.split() else term},
+        }[view]
+        return reverse(view + suffix), params
+
+    @contextmanager
+    def _server(self, mode, port, options):
+        """Run one gunicorn server for the duration of the block, once it answers HTTP."""
+        args = [sys.executable, '-m', 'gunicorn', *MODES[mode][0],
+                '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+                '--access-logfile', '/dev/null']
+        self.stdout.write(f"Starting {mode} server on port {port}...")
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(args, cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                deadline = time.monotonic() + options['startup_timeout']
+                while True:
+                    try:
+                        requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+                        break
+                    except requests.RequestException:
+                        if process.poll() is not None or time.monotonic() > deadline:
+                            log.seek(0)
+                            output = log.read().decode('utf-8', 'replace')[-2000:]
+                            raise CommandError(f"The {mode} server did not start:\n{output}")
+                        time.sleep(0.2)
+                yield
+            finally:
+                if process.poll() is None:
+                    process.terminate()
+                    try:
+                        process.wait(timeout=15)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.wait()
+
+    def _load(self, url, params, cookies, mode, view, concurrency, total):
+        local = threading.local()
+
+        def one_request(_):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.cookies.update(cookies)
+            started = time.perf_counter()
+            try:
+                response = local.session.get(url, params=params, timeout=60, allow_redirects=False)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Warm up every worker process and connection before timing
+            list(pool.map(one_request, range(concurrency)))
+            started = time.perf_counter()
+            outcomes = list(pool.map(one_request, range(total)))
+            elapsed = time.perf_counter() - started
+
+        timings = [ms for ms, _ in outcomes]
+        errors = sum(1 for _, ok in outcomes if not ok)
+        result = {
+            'mode': mode,
+            'view': view,
+            'concurrency': concurrency,
+            'requests_per_second': round(total / elapsed, 1),
+            **summarize(timings),
+            'errors': errors,
+        }
+        self.stdout.write(
+            f"{mode:10} {view:15} c={concurrency:<4} {result['requests_per_second']:8.1f} req/s "
+            f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms errors={errors}"
+        )
+        return result
+
+    def _print_comparison(self, results):
+        baseline = {(row['view'], row['concurrency']): row for row in results if row['mode'] == 'wsgi'}
+        rows = [row for row in results if row['mode'] != 'wsgi' and (row['view'], row['concurrency']) in baseline]
+        if not rows:
+            return
+        self.stdout.write("\nThroughput relative to WSGI:")
+        for row in rows:
+            base = baseline[(row['view'], row['concurrency'])]['requests_per_second']
+            change = (row['requests_per_second'] - base) / base * 100 if base else 0.0
+            self.stdout.write(
+                f"{row['mode']:10} {row['view']:15} c={row['concurrency']:<4} "
+                f"{base:8.1f} -> {row['requests_per_second']:8.1f} req/s ({change:+.1f}%)"
+            )
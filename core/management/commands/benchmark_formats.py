@@ -0,0 +1,92 @@
+"""
+Compare export/import formats on the whole client table: file size and speed.
+
+Tops the table up to N synthetic clients inside a transaction (rolled back
+afterwards), then for each format exports the table to a temporary file and
+imports that file back (validation only by default, so database writes do
+not drown out the format's own cost). Prints file size and export/import
+time per format relative to XLSX, plus peak Python memory with --memory.
+
+    python manage.py benchmark_formats --rows 100000
+    python manage.py benchmark_formats --rows 100000 --formats xlsx,parquet --write
+"""
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.benchmarking import measure
+from core.exporters import EXPORT_FORMATS
+from core.importers import import_clients
+from core.models import Client
+from core.synthetic import seed_clients
+
+# Formats the importer can read back
+FORMATS = ('xlsx', 'csv', 'parquet', 'arrow')
+
+
+class Command(BaseCommand):
+    help = "Measure size and export/import speed of XLSX, CSV, Parquet and Arrow at N clients (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Synthetic clients seeded')
+        parser.add_argument('--formats', default='xlsx,csv,parquet,arrow', help='Comma-separated formats')
+        parser.add_argument('--write', action='store_true',
+                            help='Let the import write rows too (rolled back), not just validate them')
+        parser.add_argument('--memory', action='store_true',
+                            help='Repeat each step under tracemalloc to report peak memory (slower)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        formats = [name.strip() for name in options['formats'].split(',') if name.strip()]
+        unknown = [name for name in formats if name not in FORMATS]
+        if unknown:
+            raise CommandError(f"Unknown format(s): {', '.join(unknown)}")
+        with transaction.atomic():
+            seeded = Client.objects.count()
+            if options['rows'] > seeded:
+                self.stdout.write(f"Seeding {options['rows'] - seeded} clients...")
+                seed_clients(options['rows'] - seeded, seed=options['seed'] + seeded)
+            rows = Client.objects.count()
+            with tempfile.TemporaryDirectory() as directory:
+                results = [self._run(name, directory, options) for name in formats]
+            transaction.set_rollback(True)
+
+        baseline = next((result for result in results if result['format'] == 'xlsx'), results[0])
+        self.stdout.write(f"{rows} clients"
+                          + (" (import writes rows)" if options['write'] else " (import validates only)"))
+        for result in results:
+            line = (f"{result['format']:8} {result['bytes'] / (1024 * 1024):8.2f}MB "
+                    f"({result['bytes'] / baseline['bytes']:5.2f}x)  "
+                    f"export {result['export_ms'] / 1000:6.2f}s ({result['export_ms'] / baseline['export_ms']:5.2f}x)  "
+                    f"import {result['import_ms'] / 1000:6.2f}s ({result['import_ms'] / baseline['import_ms']:5.2f}x)")
+            if options['memory']:
+                line += f"  peak export {result['export_peak_kb'] / 1024:.1f}MB import {result['import_peak_kb'] / 1024:.1f}MB"
+            self.stdout.write(line)
+
+    def _run(self, name, directory, options):
+        export_format = EXPORT_FORMATS[name]
+        path = os.path.join(directory, f"clients.{export_format.extension}")
+
+        def export():
+            with open(path, 'wb') as output:
+                for chunk in export_format.stream(Client.objects.all()):
+                    output.write(chunk)
+
+        def import_back():
+            with transaction.atomic(), open(path, 'rb') as upload:
+                result = import_clients(File(upload, name=os.path.basename(path)), dry_run=not options['write'])
+                transaction.set_rollback(True)
+            if result.rejected:
+                raise CommandError(f"{name}: {result.rejected} rows rejected on re-import")
+            return result
+
+        _, export_ms, _, _ = measure(export)
+        _, import_ms, _, _ = measure(import_back)
+        result = {'format': name, 'bytes': os.path.getsize(path), 'export_ms': export_ms, 'import_ms': import_ms}
+        if options['memory']:
+            result['export_peak_kb'] = measure(export, trace_memory=True)[3]
+            result['import_peak_kb'] = measure(import_back, trace_memory=True)[3]
+        return result
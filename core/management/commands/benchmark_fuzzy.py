@@ -0,0 +1,57 @@
+"""
+Benchmark the fuzzy company name matcher behind the "Did you mean" list.
+
+Builds a core.fuzzy.FuzzyIndex over a synthetic corpus of company names (in
+memory, no database rows), then searches for corrupted copies of names from
+the corpus (typos, dropped letters, swapped letters, shuffled word order)
+and prints latency percentiles plus recall: how often the original name is
+the first result or among the first five.
+
+    python manage.py benchmark_fuzzy --names 100000 --queries 500
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import percentile
+from core.fuzzy import FuzzyIndex, normalize_name
+from core.synthetic import company_name, corrupt
+
+
+class Command(BaseCommand):
+    help = "Measure fuzzy name match latency and recall on a synthetic corpus (default 100k names)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=100000, help='Synthetic company names in the corpus')
+        parser.add_argument('--queries', type=int, default=500, help='Corrupted names searched for')
+        parser.add_argument('--candidates', type=int, default=None,
+                            help='Trigram candidates re-ranked per query (default FUZZY_CANDIDATES)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        corpus = [(i, company_name(rng)) for i in range(options['names'])]
+        index = FuzzyIndex(corpus)
+        self.stdout.write(f"Indexed {len(corpus)} names ({len(index)} distinct) in {index.build_ms:.0f}ms, "
+                          f"{len(index.postings)} trigrams")
+
+        timings = []
+        top1 = top5 = 0
+        for _ in range(options['queries']):
+            original = rng.choice(corpus)[1]
+            query = corrupt(rng, original)
+            started = time.perf_counter()
+            matches = index.search(query, limit=5, min_score=0, candidates=options['candidates'])
+            timings.append((time.perf_counter() - started) * 1000)
+            found = [normalize_name(match.company_name) for match in matches]
+            target = normalize_name(original)
+            top1 += bool(found) and found[0] == target
+            top5 += target in found
+
+        queries = options['queries']
+        self.stdout.write(
+            f"latency p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+            f"p99={percentile(timings, 99):.2f}ms mean={statistics.mean(timings):.2f}ms")
+        self.stdout.write(f"recall@1={top1 / queries:.1%} recall@5={top5 / queries:.1%} over {queries} queries")
@@ -0,0 +1,82 @@
+"""
+Benchmark spreadsheet imports by file size: time and peak Python memory.
+
+Writes synthetic .xlsx and .csv files of each size to a temporary directory,
+imports each one (inside a transaction that is rolled back) and prints the
+rows/s and the tracemalloc peak, which should stay roughly flat as the file
+grows because core.importers.SheetReader streams the file in batches.
+
+    python manage.py benchmark_import --sizes 10000,50000,200000
+"""
+import csv
+import os
+import random
+import tempfile
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmarking import measure
+from core.exporters import EXPORT_COLUMNS, format_months
+from core.importers import import_clients
+from core.synthetic import client_values
+
+
+def sheet_rows(count, seed=0):
+    """Synthetic rows in the export column layout (what users re-import)."""
+    rng = random.Random(seed)
+    for index in range(count):
+        values = client_values(rng, index)
+        values['months'] = format_months(values['months'])
+        values['email'] = ', '.join(values['email'])
+        yield [values[field_name] for _, field_name in EXPORT_COLUMNS]
+
+
+def write_file(path, count):
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            writer.writerow([header for header, _ in EXPORT_COLUMNS])
+            writer.writerows(sheet_rows(count))
+        return
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in sheet_rows(count):
+        sheet.append(row)
+    workbook.save(path)
+
+
+class Command(BaseCommand):
+    help = "Measure import time and peak memory for growing .xlsx/.csv files (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,50000,100000', help='Comma-separated row counts')
+        parser.add_argument('--formats', default='xlsx,csv', help='Comma-separated file formats')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, no database writes')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        formats = [name.strip() for name in options['formats'].split(',')]
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in formats:
+                for size in sizes:
+                    path = os.path.join(directory, f"import_{size}.{extension}")
+                    write_file(path, size)
+                    megabytes = os.path.getsize(path) / (1024 * 1024)
+                    _, elapsed, _, _ = self._import(path, options['dry_run'])
+                    _, _, _, peak_kb = self._import(path, options['dry_run'], trace_memory=True)
+                    self.stdout.write(
+                        f"{extension:5} {size:>8} rows {megabytes:7.1f}MB  {elapsed / 1000:7.1f}s  "
+                        f"{size / (elapsed / 1000):8.0f} rows/s  peak {peak_kb / 1024:7.1f}MB")
+
+    def _import(self, path, dry_run, trace_memory=False):
+        def run():
+            with transaction.atomic(), open(path, 'rb') as upload:
+                result = import_clients(File(upload, name=os.path.basename(path)), dry_run=dry_run)
+                transaction.set_rollback(True)
+            return result
+        return measure(run, trace_memory=trace_memory)
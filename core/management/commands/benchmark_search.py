@@ -0,0 +1,95 @@
+"""
+Benchmark the client search service against the legacy icontains filters.
+
+Seeds synthetic clients inside a transaction (rolled back afterwards unless
+--keep is given), then times ranked searches for random name/account
+prefixes and prints p50/p95/p99 latency for each strategy, including the
+in-memory prefix index behind /search/suggest/.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.benchmarking import percentile
+from core.models import Client
+from core.search import get_search_backend, search_clients
+from core.suggest import PrefixIndex
+from core.synthetic import seed_clients
+
+
+def _legacy_search(term):
+    # The pre-search-service filter used by search_details
+    q_object = Q()
+    for word in term.split():
+        q_object &= Q(company_name__icontains=word)
+    return Client.objects.filter(q_object)
+
+
+class Command(BaseCommand):
+    help = "Measure client search latency on a seeded dataset (default 100k clients)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Synthetic clients to seed')
+        parser.add_argument('--queries', type=int, default=200, help='Searches per strategy')
+        parser.add_argument('--limit', type=int, default=20, help='Results fetched per search')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']} synthetic clients...")
+            started = time.perf_counter()
+            seed_clients(options['rows'], seed=options['seed'])
+            self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE core_client")
+
+            terms = self._sample_terms(options['queries'], options['seed'])
+            limit = options['limit']
+            suggest = PrefixIndex()
+            started = time.perf_counter()
+            suggest.build()
+            self.stdout.write(f"Suggest index built in {(time.perf_counter() - started) * 1000:.0f}ms")
+            strategies = [
+                ("suggest prefix index", lambda t: suggest.lookup(t, limit=limit)),
+                (f"search service ({get_search_backend().name})", lambda t: search_clients(t)[:limit]),
+                ("legacy icontains", lambda t: _legacy_search(t)[:limit]),
+            ]
+            for label, run in strategies:
+                timings = []
+                for term in terms:
+                    started = time.perf_counter()
+                    list(run(term))
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:32} p50={percentile(timings, 50):8.2f}ms "
+                    f"p95={percentile(timings, 95):8.2f}ms p99={percentile(timings, 99):8.2f}ms "
+                    f"mean={statistics.mean(timings):8.2f}ms"
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+                self.stdout.write("Rolled back seeded rows (use --keep to retain them).")
+
+    def _sample_terms(self, count, seed):
+        """Prefixes of real names/accounts so every search has matches."""
+        rng = random.Random(seed)
+        rows = list(
+            Client.objects.order_by('?').values_list('company_name', 'account_no')[:max(count, 1)]
+        )
+        terms = []
+        for name, account_no in rows:
+            words = name.split()
+            choice = rng.random()
+            if choice < 0.5:
+                terms.append(' '.join(words[:2]))
+            elif choice < 0.8:
+                terms.append(words[0][:rng.randint(3, len(words[0]))])
+            else:
+                terms.append((account_no or '')[:6])
+        return terms[:count]
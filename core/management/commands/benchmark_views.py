@@ -0,0 +1,160 @@
+"""
+Benchmark the core views against seeded synthetic data.
+
+For each dataset size (default 1k, 10k and 100k clients) the command seeds
+clients with realistic ``months``/``email`` JSON inside a transaction, calls
+client_list, search_details, search_company, export_excel and import_excel
+through the Django test client, and records latency percentiles, query count,
+peak Python memory and response size. Everything is rolled back afterwards.
+
+The results are written as JSON so runs can be compared between commits:
+
+    python manage.py benchmark_views --output before.json
+    python manage.py benchmark_views --output after.json --compare before.json
+"""
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client as TestClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmarking import consume_response, git_revision, measure, summarize
+from core.exporters import get_export_format
+from core.models import Client
+from core.synthetic import seed_clients
+
+
+class Command(BaseCommand):
+    help = "Measure latency, query count and peak memory of the core views at several dataset sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated client counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed requests per view and size')
+        parser.add_argument('--import-rows', type=int, default=500, help='Rows in the uploaded import file')
+        parser.add_argument('--view', action='append', dest='views',
+                            help='Only benchmark this view (repeatable)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark_views.json', help='Where to write the JSON report')
+        parser.add_argument('--compare', help='Previous JSON report to print p50 deltas against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+        if not sizes or sizes[0] <= 0:
+            raise CommandError("--sizes must contain positive integers.")
+
+        results = []
+        # The test client sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            user = User.objects.create_superuser('benchmark-views', 'benchmark@example.com', None)
+            client = TestClient()
+            client.force_login(user)
+            seeded = Client.objects.count()
+            for size in sizes:
+                if size > seeded:
+                    self.stdout.write(f"Seeding {size - seeded} clients (total {size})...")
+                    seed_clients(size - seeded, seed=options['seed'] + seeded)
+                    seeded = size
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute("ANALYZE core_client")
+                            cursor.execute("ANALYZE core_clientmonthassignment")
+                for name, run in self._scenarios(client, options):
+                    if options['views'] and name.split(' ')[0] not in options['views']:
+                        continue
+                    results.append(self._benchmark(size, name, run, options['repeat']))
+            transaction.set_rollback(True)
+
+        report = {
+            'revision': git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _scenarios(self, client, options):
+        """(name, callable returning a response) for every benchmarked request."""
+        sample = Client.objects.order_by('?').values('company_name').first()
+        name = sample['company_name'] if sample else 'BENCHMARK'
+        token = name.split()[0]
+        import_ids = list(Client.objects.order_by('id').values_list('id', flat=True)[:options['import_rows']])
+        import_body = b''.join(get_export_format('csv').stream(Client.objects.filter(pk__in=import_ids)))
+
+        def import_file():
+            upload = SimpleUploadedFile('benchmark.csv', import_body, content_type='text/csv')
+            # Each import runs in a savepoint so repeats do not grow the dataset
+            with transaction.atomic():
+                response = client.post(reverse('import_excel'), {'excel_file': upload, 'mode': 'append'})
+                transaction.set_rollback(True)
+            return response
+
+        return [
+            ('client_list', lambda: client.get(reverse('client_list'))),
+            ('client_list search', lambda: client.get(reverse('client_list'), {'search': token})),
+            ('search_details', lambda: client.get(reverse('search_details'), {'search': name})),
+            ('search_company', lambda: client.get(reverse('search_company'), {'q': token})),
+            ('export_excel xlsx', lambda: client.get(reverse('export_excel', args=['xlsx']))),
+            ('export_excel csv', lambda: client.get(reverse('export_excel', args=['csv']))),
+            ('export_excel ndjson', lambda: client.get(reverse('export_excel', args=['ndjson']))),
+            (f"import_excel {options['import_rows']} rows", import_file),
+        ]
+
+    def _benchmark(self, size, name, run, repeat):
+        def request():
+            response = run()
+            return response.status_code, consume_response(response)
+
+        # First call doubles as warm-up and as the traced run for memory/queries
+        (status, body_size), cold_ms, queries, peak_kb = measure(request, trace_memory=True)
+        timings = []
+        started = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            timings.append(measure(request)[1])
+        result = {
+            'rows': size,
+            'view': name,
+            'status': status,
+            'cold_ms': round(cold_ms, 2),
+            **summarize(timings),
+            'queries': queries,
+            'peak_kb': round(peak_kb, 1),
+            'response_bytes': body_size,
+        }
+        self.stdout.write(
+            f"{size:>7} {name:28} p50={result['p50_ms']:9.2f}ms p95={result['p95_ms']:9.2f}ms "
+            f"queries={queries:<4} peak={peak_kb / 1024:7.1f}MB status={status} "
+            f"({time.perf_counter() - started:.1f}s)"
+        )
+        return result
+
+    def _compare(self, path, results):
+        try:
+            with open(path) as fh:
+                previous = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        baseline = {(row['rows'], row['view']): row for row in previous.get('results', [])}
+        self.stdout.write(f"\nCompared with {path} (revision {previous.get('revision')}):")
+        for row in results:
+            old = baseline.get((row['rows'], row['view']))
+            if not old:
+                continue
+            change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+            self.stdout.write(
+                f"{row['rows']:>7} {row['view']:28} p50 {old['p50_ms']:9.2f} -> {row['p50_ms']:9.2f}ms "
+                f"({change:+.1f}%) queries {old['queries']} -> {row['queries']}"
+            )
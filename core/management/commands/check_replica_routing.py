@@ -0,0 +1,93 @@
+"""
+Manual probe of a deployment's replica: show where reads and writes are
+routed and spot-check the replica rules against the real databases.
+
+    python manage.py check_replica_routing
+
+Prints the replica alias and its current replication lag, then checks the
+router's decisions: opted-in reads use the replica, writes and reads after a
+write use the primary, pinned reads use the primary, and reads fall back to
+the primary while the replica lags. The same rules are tested in
+core.tests.ReplicaRoutingTests; this command is for checking a configured
+environment, not a substitute for them. Without a real replica, point
+DATABASE_REPLICA_URL at the same database as DATABASE_URL to exercise it.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, router
+from django.test import override_settings
+
+from core.models import Client
+from msystem.db_routers import (
+    PRIMARY, lag_monitor, primary_reads, replica_alias, replica_reads, tracking_writes,
+)
+
+
+class Command(BaseCommand):
+    help = "Report the read replica's lag and check the primary/replica routing rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag-only', action='store_true', help='Only report the replication lag')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            self.stdout.write("No replica configured (set DATABASE_REPLICA_URL); every query uses the primary.")
+            return
+        try:
+            lag = lag_monitor.lag_seconds(alias)
+        except DatabaseError as e:
+            raise CommandError(f"Replica '{alias}' is unreachable: {e}")
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+        self.stdout.write(f"Replica '{alias}': lag {lag:.2f}s (limit {max_lag}s)")
+        if options['lag_only']:
+            return
+
+        lag_monitor.reset()
+        checks = [
+            ("reads outside use_replica use the primary", self._db_for_read(), PRIMARY),
+            ("use_replica reads use the replica", self._db_for_read(replica=True), alias),
+            ("writes use the primary", self._db_for_write(), PRIMARY),
+            ("pinned reads use the primary", self._db_for_read(replica=True, pinned=True), PRIMARY),
+            ("reads after a write use the primary", self._read_after_write(), PRIMARY),
+            ("cache fills read the primary", self._db_for_read(replica=True, primary=True), PRIMARY),
+            ("lagging replica falls back to the primary", self._lagging_read(), PRIMARY),
+        ]
+        failed = 0
+        for label, actual, expected in checks:
+            if actual == expected:
+                self.stdout.write(self.style.SUCCESS(f"ok    {label} ({actual})"))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"FAIL  {label}: got {actual}, expected {expected}"))
+        lag_monitor.reset()
+        if failed:
+            raise CommandError(f"{failed} routing check(s) failed.")
+
+    def _db_for_read(self, replica=False, pinned=False, primary=False):
+        with tracking_writes(pinned=pinned):
+            if not replica:
+                return Client.objects.all().db
+            with replica_reads():
+                if primary:
+                    with primary_reads():
+                        return Client.objects.all().db
+                return Client.objects.all().db
+
+    def _db_for_write(self):
+        with tracking_writes(), replica_reads():
+            return router.db_for_write(Client)
+
+    def _read_after_write(self):
+        with tracking_writes(), replica_reads():
+            router.db_for_write(Client)
+            return Client.objects.all().db
+
+    def _lagging_read(self):
+        # Any measured lag exceeds a negative limit, so the monitor reports the replica unhealthy
+        lag_monitor.reset()
+        with override_settings(REPLICA_MAX_LAG_SECONDS=-1):
+            try:
+                return self._db_for_read(replica=True)
+            finally:
+                lag_monitor.reset()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.ratelimit import cleanup
+
+
+class Command(BaseCommand):
+    help = "Delete rate-limit buckets too old to affect any limit."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None,
+                            help='Age in seconds (default: twice the longest configured window)')
+
+    def handle(self, *args, **options):
+        deleted = cleanup(older_than=options['older_than'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} rate-limit bucket(s)."))
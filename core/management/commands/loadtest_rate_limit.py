@@ -0,0 +1,89 @@
+"""
+Load test for core.ratelimit under concurrent worker processes.
+
+Forks --workers processes (like gunicorn workers). They wait on a barrier,
+then all hammer the same rate-limit key at once inside a single window. The
+test passes when:
+
+* exactly --limit attempts were allowed, and
+* the stored counter equals the total number of attempts (no lost updates).
+
+    python manage.py loadtest_rate_limit --workers 8 --attempts 50 --limit 20
+"""
+import multiprocessing
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.ratelimit import hit, reset
+from core.models import RateLimitBucket
+
+
+def _worker(key, limit, window, now, attempts, barrier, results):
+    barrier.wait()
+    allowed = 0
+    try:
+        for _ in range(attempts):
+            if hit(key, limit, window, now=now).allowed:
+                allowed += 1
+        results.put(('ok', allowed))
+    except Exception as e:  # reported to the parent instead of dying silently
+        results.put(('error', repr(e)))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Check that the database rate limiter enforces exact limits under concurrent processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=50, help='Attempts per worker')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--window', type=int, default=60)
+
+    def handle(self, *args, **options):
+        workers, attempts = options['workers'], options['attempts']
+        limit, window = options['limit'], options['window']
+        key = f"loadtest:{uuid.uuid4().hex}"
+        # Pin every attempt to the start of one window so the previous bucket is empty
+        now = (int(time.time() // window) * window) + 0.001
+
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        # Children must not share the parent's database socket
+        connections.close_all()
+        processes = [
+            context.Process(target=_worker, args=(key, limit, window, now, attempts, barrier, results))
+            for _ in range(workers)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            errors = [detail for status, detail in outcomes if status == 'error']
+            if errors:
+                raise CommandError(f"{len(errors)} worker(s) failed: {errors[0]}")
+            allowed = sum(detail for _, detail in outcomes)
+            stored = sum(RateLimitBucket.objects.filter(key=key).values_list('count', flat=True))
+        finally:
+            reset(key)
+
+        total = workers * attempts
+        self.stdout.write(
+            f"{workers} workers x {attempts} attempts = {total} in {elapsed:.2f}s "
+            f"({total / elapsed:.0f} hits/s): allowed={allowed} (limit {limit}), counted={stored}"
+        )
+        if stored != total:
+            raise CommandError(f"Lost updates: counted {stored} of {total} attempts.")
+        if allowed != min(limit, total):
+            raise CommandError(f"Allowed {allowed} attempts, expected {min(limit, total)}.")
+        self.stdout.write(self.style.SUCCESS("Rate limiter enforced the limit exactly."))
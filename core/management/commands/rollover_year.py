@@ -0,0 +1,48 @@
+"""
+Start a new year: copy every client of one year into the next with no months done.
+
+    python manage.py rollover_year --from 2025 --to 2026 --dry-run
+    python manage.py rollover_year --from 2025 --to 2026
+
+Safe to re-run; clients already present in the target year are skipped.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rollover import rollover_year
+
+
+class Command(BaseCommand):
+    help = "Clone a year's clients into a new year with cleared months (idempotent)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='from_year', type=int, required=True, help='Year to copy')
+        parser.add_argument('--to', dest='to_year', type=int, default=None,
+                            help='Target year (default: the year after --from)')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per INSERT')
+        parser.add_argument('--show', type=int, default=20, help='Clients listed in the dry-run diff')
+
+    def handle(self, *args, **options):
+        from_year = options['from_year']
+        to_year = options['to_year'] or from_year + 1
+        started = time.perf_counter()
+        try:
+            result = rollover_year(from_year, to_year, dry_run=options['dry_run'],
+                                   batch_size=options['batch_size'], sample_size=options['show'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            for name, account_no in result.new:
+                self.stdout.write(self.style.SUCCESS(f"+ {name} ({account_no or 'no account'})"))
+            for name, account_no in result.existing:
+                self.stdout.write(f"= {name} ({account_no or 'no account'}) already in {to_year}")
+            self.stdout.write(f"Dry run: {result.created} client(s) would be copied from {from_year} to "
+                              f"{to_year}, {result.skipped} already present.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {result.created} client(s) from {from_year} to {to_year} in {elapsed:.1f}s "
+            f"({result.skipped} already present)."))
@@ -0,0 +1,93 @@
+"""
+Background worker for the database-backed job queue (see core/jobs.py).
+
+Runs as its own process (the Procfile's worker, a worker service on Render), e.g.:
+    python manage.py run_jobs --concurrency 2
+
+Every JOB_MAINTENANCE_SECONDS the main thread also re-queues jobs whose
+heartbeat stopped, deletes the files of jobs finished long ago and prunes
+rate-limit buckets that no longer affect any limit.
+"""
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core import ratelimit
+from core.jobs import claim_next_job, expire_job_files, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (imports/exports) from the Job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Worker threads')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+        parser.add_argument('--kind', action='append', dest='kinds',
+                            help='Only run jobs of this kind (repeatable)')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+
+        self._maintain()
+        maintenance_seconds = getattr(settings, 'JOB_MAINTENANCE_SECONDS', 300)
+        next_maintenance = time.monotonic() + maintenance_seconds
+
+        concurrency = max(1, options['concurrency'])
+        self.stdout.write(f"Job worker started with {concurrency} thread(s).")
+        threads = [
+            threading.Thread(target=self._work, args=(options,), name=f"job-worker-{i}", daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+                    if time.monotonic() >= next_maintenance:
+                        self._maintain()
+                        next_maintenance = time.monotonic() + maintenance_seconds
+        except KeyboardInterrupt:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
+
+    def _maintain(self):
+        close_old_connections()
+        try:
+            requeued = requeue_stale_jobs()
+            expire_job_files()
+            ratelimit.cleanup()
+        except DatabaseError as e:
+            self.stderr.write(f"Job maintenance failed: {e}")
+            return
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale job(s)."))
+
+    def _work(self, options):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_next_job(kinds=options['kinds'])
+                if job is None:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                self.stdout.write(f"Running {job}...")
+                job = run_job(job)
+                style = self.style.SUCCESS if job.status == job.STATUS_SUCCEEDED else self.style.ERROR
+                self.stdout.write(style(f"Finished {job}"))
+        finally:
+            # Each thread has its own connection; release it before exiting
+            connection.close()
@@ -0,0 +1,48 @@
+"""
+Deliver queued outbound email (see core/mail.py).
+
+    python manage.py send_queued_mail           # send everything due, then exit
+    python manage.py send_queued_mail --loop    # keep polling (runs beside gunicorn)
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.mail import requeue_stale, send_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued emails in batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages per connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when idle')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is due (with --loop)')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if options['loop']:
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale email(s)."))
+
+        total_sent = total_failed = 0
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                sent, failed = send_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    continue
+                if not options['loop']:
+                    break
+                stop.wait(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} email(s), {total_failed} failed."))
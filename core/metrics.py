@@ -0,0 +1,247 @@
+# core/metrics.py
+"""
+Per-request performance metrics: wall time, database queries and time,
+template render time and response size.
+
+``RequestMetricsMiddleware`` (core/middleware.py) opens a ``RequestMetrics``
+for each request. ``QueryTimer`` is added to the execute wrappers of every
+database connection when it is created (see ``install_query_timer``), so
+queries are counted in whatever thread runs them, including the threads
+``sync_to_async`` uses under ASGI. Template time is collected by
+wrapping the Django template backend's ``Template.render`` once at startup
+(see ``install_template_timer``), so it covers ``render()`` and
+``render_to_string()`` in every view.
+
+Finished requests are logged as one JSON line on the ``core.metrics`` logger
+and kept in a rolling window per view, from which the superuser metrics page
+computes percentiles. The window lives in process memory, so each gunicorn
+worker reports its own traffic.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from core.benchmarking import percentile
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters for one request; also usable on its own around any block of code."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total_ms(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return (end - self.started) * 1000
+
+    @property
+    def db_ms(self):
+        return self.db_time * 1000
+
+    @property
+    def template_ms(self):
+        return self.template_time * 1000
+
+    @property
+    def view_ms(self):
+        """Time not spent in the database or templates (Python code in the view/middleware)."""
+        return max(0.0, self.total_ms - self.db_ms - self.template_ms)
+
+    @property
+    def duplicate_queries(self):
+        """Executions of the most repeated SQL statement (an N+1 pattern shows up as a large number)."""
+        return max(self.statements.values(), default=0)
+
+
+def current_metrics():
+    """The ``RequestMetrics`` of the request being handled, or None."""
+    return _current.get()
+
+
+def activate(metrics):
+    """Make ``metrics`` current; returns a token for ``deactivate``."""
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class QueryTimer:
+    """Database execute wrapper adding each query to the current metrics."""
+
+    def __call__(self, execute, sql, params, many, context):
+        metrics = _current.get()
+        if metrics is None:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.db_time += time.perf_counter() - started
+            metrics.queries += 1
+            # Parameters are separate, so the same query with different ids counts as a repeat
+            metrics.statements[sql] += 1
+
+
+def _add_query_timer(sender, connection, **kwargs):
+    if not any(isinstance(wrapper, QueryTimer) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(QueryTimer())
+
+
+def install_query_timer():
+    """Time queries on every database connection, current and future (outside requests it is a no-op)."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_add_query_timer, dispatch_uid='core.metrics.query_timer')
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(None, connection)
+
+
+def install_template_timer():
+    """Wrap the Django template backend so render time is added to the current metrics."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_timed', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+    render._timed = True
+    Template.render = render
+
+
+def server_timing_header(metrics):
+    """``Server-Timing`` value splitting the request into db, template and view time."""
+    return ", ".join([
+        f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+        f'tpl;dur={metrics.template_ms:.1f};desc="Templates"',
+        f'view;dur={metrics.view_ms:.1f};desc="View"',
+        f'total;dur={metrics.total_ms:.1f};desc="Total"',
+    ])
+
+
+class MetricsStore:
+    """Rolling window of recent requests per view, kept in memory and thread-safe."""
+
+    def __init__(self, window=None):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._new_window)
+
+    def _new_window(self):
+        return deque(maxlen=self.window or getattr(settings, 'REQUEST_METRICS_WINDOW', 500))
+
+    def add(self, view, total_ms, db_ms, template_ms, queries):
+        with self._lock:
+            self._samples[view].append((total_ms, db_ms, template_ms, queries))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """Per-view request count and percentiles, slowest p95 first."""
+        with self._lock:
+            snapshot = {view: list(samples) for view, samples in self._samples.items()}
+        rows = []
+        for view, samples in snapshot.items():
+            totals = [sample[0] for sample in samples]
+            rows.append({
+                'view': view,
+                'requests': len(samples),
+                'p50_ms': round(percentile(totals, 50), 1),
+                'p95_ms': round(percentile(totals, 95), 1),
+                'p99_ms': round(percentile(totals, 99), 1),
+                'max_ms': round(max(totals), 1),
+                'db_p95_ms': round(percentile([sample[1] for sample in samples], 95), 1),
+                'template_p95_ms': round(percentile([sample[2] for sample in samples], 95), 1),
+                'queries_p95': percentile([sample[3] for sample in samples], 95),
+            })
+        rows.sort(key=lambda row: -row['p95_ms'])
+        return rows
+
+
+store = MetricsStore()
+
+
+def _user_id(request):
+    """Id of the user the request already loaded; never loads it (not allowed in async code)."""
+    for attr in ('_cached_user', '_acached_user'):
+        user = getattr(request, attr, None)
+        if user is not None:
+            return user.pk
+    user = request.__dict__.get('user')
+    if user is not None and not isinstance(user, SimpleLazyObject):
+        return user.pk
+    return None
+
+
+def record_request(request, response, metrics, size=None):
+    """
+    Log one finished request and add it to the rolling window. ``size`` is
+    the body length for streamed responses (measured while streaming).
+    """
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else '<unresolved>'
+    if size is None and response is not None and not response.streaming:
+        size = len(response.content)
+    payload = {
+        'method': request.method,
+        'path': request.path,
+        'view': view,
+        'status': response.status_code if response is not None else 500,
+        'total_ms': round(metrics.total_ms, 1),
+        'db_ms': round(metrics.db_ms, 1),
+        'template_ms': round(metrics.template_ms, 1),
+        'queries': metrics.queries,
+        'duplicate_queries': metrics.duplicate_queries,
+        'response_bytes': size,
+        'user': _user_id(request),
+        'pid': os.getpid(),
+    }
+    flags = []
+    if metrics.total_ms >= getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000):
+        flags.append('slow')
+    if metrics.queries >= getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', 50):
+        flags.append('many_queries')
+    if metrics.duplicate_queries >= getattr(settings, 'REQUEST_METRICS_DUPLICATE_QUERIES', 10):
+        flags.append('n_plus_one')
+    payload['flags'] = flags
+
+    store.add(view, metrics.total_ms, metrics.db_ms, metrics.template_ms, metrics.queries)
+    if flags:
+        logger.warning(f"request {json.dumps(payload)}")
+    else:
+        logger.info(f"request {json.dumps(payload)}")
+    return payload
@@ -0,0 +1,279 @@
+# core/middleware.py
+"""
+Request middleware for the core app.
+
+``RequestMetricsMiddleware`` measures every request (wall time, database
+queries/time, template time, response size), hands the numbers to
+``core.metrics`` for logging and the per-view percentiles page, and adds a
+``Server-Timing`` header so browser dev tools show the DB/template/view split.
+
+``ProfilerMiddleware`` lets a superuser run a single request under cProfile
+by adding ``?_profile=1`` (or the ``X-Profile: 1`` header); the response is
+replaced by the profile. It only looks at the query string and headers when
+the flag is absent, so normal requests pay nothing.
+
+``WhiteNoiseMiddleware`` is WhiteNoise's static file middleware with an
+async code path.
+
+``ReplicaStickinessMiddleware`` keeps a user's reads on the primary database
+for a few seconds after they write (see msystem/db_routers.py).
+
+All four support both WSGI and ASGI. Under ASGI a sync-only middleware
+makes Django adapt the rest of the chain back to sync code, which would run
+the async views (core/async_views.py) in a thread and lose their benefit.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from core.metrics import RequestMetrics, activate, deactivate, record_request, server_timing_header
+from msystem.db_routers import lag_monitor, replica_alias, tracking_writes
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        response = None
+        try:
+            with self._measuring(metrics):
+                response = self.get_response(request)
+        except Exception:
+            metrics.finish()
+            record_request(request, response, metrics)
+            raise
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        response = None
+        try:
+            with self._measuring(metrics):
+                response = await self.get_response(request)
+        except Exception:
+            metrics.finish()
+            record_request(request, response, metrics)
+            raise
+        return self._finish(request, response, metrics)
+
+    def _finish(self, request, response, metrics):
+        if response.streaming and not isinstance(response, FileResponse):
+            # Exports do most of their work while the body is iterated
+            # (file downloads are left alone so the server can still sendfile them)
+            if response.is_async:
+                response.streaming_content = self._ameasure_stream(
+                    request, response, aiter(response.streaming_content), metrics)
+            else:
+                response.streaming_content = self._measure_stream(
+                    request, response, iter(response.streaming_content), metrics)
+        else:
+            metrics.finish()
+            record_request(request, response, metrics)
+        if self.server_timing:
+            # For streamed responses this covers the work done before the body starts
+            response['Server-Timing'] = server_timing_header(metrics)
+        return response
+
+    @contextmanager
+    def _measuring(self, metrics):
+        # Queries are counted by the QueryTimer on each connection (core.metrics.install_query_timer),
+        # which reads the current metrics from a context variable; sync_to_async copies it into its thread
+        token = activate(metrics)
+        try:
+            yield
+        finally:
+            deactivate(token)
+
+    def _measure_stream(self, request, response, content, metrics):
+        size = 0
+        try:
+            while True:
+                with self._measuring(metrics):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.finish()
+            record_request(request, response, metrics, size=size)
+
+    async def _ameasure_stream(self, request, response, content, metrics):
+        size = 0
+        try:
+            while True:
+                with self._measuring(metrics):
+                    chunk = await anext(content, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.finish()
+            record_request(request, response, metrics, size=size)
+
+
+class ProfilerMiddleware:
+    """
+    Superuser opt-in cProfile of one request. ``?_profile=1`` (or header
+    ``X-Profile: 1``) returns the top functions by cumulative time as text;
+    ``?_profile=prof`` downloads the raw pstats file for snakeviz/flameprof.
+    Must come after AuthenticationMiddleware. Under ASGI only the event loop
+    thread is profiled, not work handed to ``sync_to_async``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILER_ENABLED', True)
+        self.limit = getattr(settings, 'PROFILER_TOP_FUNCTIONS', 60)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = request.GET.get('_profile') or request.headers.get('X-Profile')
+        if not (self.enabled and mode and request.user.is_superuser):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+            if response.streaming:
+                # Generate the whole body so the export work is profiled too
+                for _ in response.streaming_content:
+                    pass
+        finally:
+            profiler.disable()
+        return self._report(request, response, profiler, mode)
+
+    async def __acall__(self, request):
+        mode = request.GET.get('_profile') or request.headers.get('X-Profile')
+        if not (self.enabled and mode and (await request.auser()).is_superuser):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+            if response.streaming:
+                if response.is_async:
+                    async for _ in response.streaming_content:
+                        pass
+                else:
+                    await sync_to_async(lambda: [None for _ in response.streaming_content])()
+        finally:
+            profiler.disable()
+        return self._report(request, response, profiler, mode)
+
+    def _report(self, request, response, profiler, mode):
+        profiler.create_stats()
+        if mode == 'prof':
+            download = HttpResponse(marshal.dumps(profiler.stats), content_type='application/octet-stream')
+            view = request.resolver_match.view_name if request.resolver_match else 'request'
+            download['Content-Disposition'] = f'attachment; filename="{view}.prof"'
+            return download
+
+        out = io.StringIO()
+        out.write(f"{request.method} {request.get_full_path()} -> {response.status_code}\n\n")
+        pstats.Stats(profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(self.limit)
+        return HttpResponse(out.getvalue(), content_type='text/plain; charset=utf-8')
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise with an async path: the static file lookup is in memory, only serving runs in a thread."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for the replica router. A request that writes (or uses an
+    unsafe method) sets a short-lived cookie; while it is present the user's
+    reads go to the primary, so they never see a replica that has not caught
+    up with their own change yet.
+    """
+    sync_capable = True
+    async_capable = True
+    unsafe_methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_STICKY_COOKIE', 'primary_pin')
+        self.seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with tracking_writes(pinned=self.cookie_name in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        alias = replica_alias()
+        if alias:
+            # Refresh the lag check off the event loop; the router only reads the cached result there
+            await sync_to_async(lag_monitor.healthy)(alias)
+        with tracking_writes(pinned=self.cookie_name in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self._finish(request, response, state)
+
+    def _finish(self, request, response, state):
+        if state['wrote'] or request.method in self.unsafe_methods:
+            response.set_cookie(self.cookie_name, '1', max_age=self.seconds, httponly=True,
+                                samesite='Lax', secure=request.is_secure())
+        return response
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:17
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# PostgreSQL-only search infrastructure. Other backends (SQLite for local
+# development) skip it and the search service falls back to icontains.
+POSTGRES_FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION core_client_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.company_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW."group", '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.account_no, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_client_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF company_name, "group", account_no ON core_client
+    FOR EACH ROW EXECUTE FUNCTION core_client_search_vector_update()
+    """,
+    """
+    UPDATE core_client SET search_vector =
+        setweight(to_tsvector('simple', coalesce(company_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce("group", '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(account_no, '')), 'B')
+    """,
+    "CREATE INDEX IF NOT EXISTS core_client_search_vector_gin ON core_client USING gin (search_vector)",
+    # Trigram similarity (typo-tolerant matching) on the raw company name
+    "CREATE INDEX IF NOT EXISTS core_client_company_name_trgm ON core_client USING gin (company_name gin_trgm_ops)",
+    # icontains compiles to UPPER(col) LIKE UPPER('%term%'); these serve the admin search and legacy filters
+    "CREATE INDEX IF NOT EXISTS core_client_company_name_upper_trgm ON core_client USING gin (UPPER(company_name) gin_trgm_ops)",
+    'CREATE INDEX IF NOT EXISTS core_client_group_upper_trgm ON core_client USING gin (UPPER("group") gin_trgm_ops)',
+    "CREATE INDEX IF NOT EXISTS core_client_account_no_upper_trgm ON core_client USING gin (UPPER(account_no) gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS core_client_account_no_upper_trgm",
+    "DROP INDEX IF EXISTS core_client_group_upper_trgm",
+    "DROP INDEX IF EXISTS core_client_company_name_upper_trgm",
+    "DROP INDEX IF EXISTS core_client_company_name_trgm",
+    "DROP INDEX IF EXISTS core_client_search_vector_gin",
+    "DROP TRIGGER IF EXISTS core_client_search_vector_trigger ON core_client",
+    "DROP FUNCTION IF EXISTS core_client_search_vector_update()",
+]
+
+
+def _run_postgres_sql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_signupotp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            _run_postgres_sql(POSTGRES_FORWARD_SQL),
+            _run_postgres_sql(POSTGRES_REVERSE_SQL),
+        ),
+    ]
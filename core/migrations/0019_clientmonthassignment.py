@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientMonthAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.PositiveSmallIntegerField(choices=[(1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'), (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'), (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')])),
+                ('person', models.CharField(blank=True, max_length=100)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_assignments', to='core.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['person', 'year', 'month'], name='core_assign_person_idx'), models.Index(fields=['year', 'month'], name='core_assign_year_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('client', 'month'), name='unique_client_month_assignment')],
+            },
+        ),
+    ]
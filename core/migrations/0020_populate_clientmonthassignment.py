@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def populate_assignments(apps, schema_editor):
+    """Copy every Client.months mapping into ClientMonthAssignment rows."""
+    Client = apps.get_model('core', 'Client')
+    ClientMonthAssignment = apps.get_model('core', 'ClientMonthAssignment')
+    batch = []
+    rows = Client.objects.order_by('id').values_list('id', 'year', 'months').iterator(chunk_size=2000)
+    for client_id, year, months in rows:
+        if not isinstance(months, dict):
+            continue
+        for month_key, person in months.items():
+            try:
+                month = int(month_key)
+            except (TypeError, ValueError):
+                continue
+            if 1 <= month <= 12:
+                batch.append(ClientMonthAssignment(
+                    client_id=client_id, year=year, month=month, person=str(person or '')[:100]))
+        if len(batch) >= 5000:
+            ClientMonthAssignment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ClientMonthAssignment.objects.bulk_create(batch)
+
+
+def clear_assignments(apps, schema_editor):
+    apps.get_model('core', 'ClientMonthAssignment').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_clientmonthassignment'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_assignments, clear_assignments),
+    ]
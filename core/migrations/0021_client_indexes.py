@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:27
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_populate_clientmonthassignment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['company_name', 'id'], name='core_client_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.db.models.functions.text.Upper('company_name'), name='core_client_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['account_no'], name='core_client_account_no_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['year', 'group'], name='core_client_year_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['group'], name='core_client_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['first_allocated_person', 'year'], name='core_client_first_person_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['review_person', 'year'], name='core_client_review_person_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_client_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('window_start', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window_start'], name='core_ratelimit_window_idx')],
+                'constraints': [models.UniqueConstraint(fields=('key', 'window_start'), name='unique_rate_limit_bucket')],
+            },
+        ),
+    ]
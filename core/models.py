@@ -1,8 +1,33 @@
 # models.py
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, router, transaction
+from django.db.models.functions import Upper
 from django.utils import timezone
 from datetime import timedelta
 
+from msystem.db_routers import primary_reads
+
+
+class ClientQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        ``update()`` sends no signals, so when ``months`` or ``year`` change the
+        clients' ClientMonthAssignment rows are resynced here. ``bulk_update``
+        writes through this method too.
+        """
+        if not {'months', 'year'} & set(kwargs):
+            return super().update(**kwargs)
+        from core.assignments import sync_client_ids
+
+        db = router.db_for_write(self.model, **self._hints)
+        with transaction.atomic(using=db), primary_reads():
+            # Ids first: the filter may match on the year being changed
+            client_ids = list(self.using(db).values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            sync_client_ids(client_ids)
+        return updated
+
 
 class Client(models.Model):
     company_name = models.CharField(max_length=255)
@@ -22,19 +47,172 @@ class Client(models.Model):
     year = models.IntegerField(default=2025)
     months = models.JSONField(default=dict)  # Store month number -> person name mappings
     remark = models.TextField(blank=True, null=True)
+    # Full-text document over company_name/group/account_no. On PostgreSQL a
+    # database trigger keeps it current (see migration 0017); unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ClientQuerySet.as_manager()
+
+    class Meta:
+        # B-tree indexes for the listing order, exact lookups and admin filters.
+        # Substring/fuzzy search uses the trigram and GIN indexes from 0017.
+        indexes = [
+            models.Index(fields=['company_name', 'id'], name='core_client_name_id_idx'),
+            models.Index(Upper('company_name'), name='core_client_name_upper_idx'),
+            models.Index(fields=['account_no'], name='core_client_account_no_idx'),
+            models.Index(fields=['year', 'group'], name='core_client_year_group_idx'),
+            models.Index(fields=['group'], name='core_client_group_idx'),
+            models.Index(fields=['first_allocated_person', 'year'], name='core_client_first_person_idx'),
+            models.Index(fields=['review_person', 'year'], name='core_client_review_person_idx'),
+        ]
+
     def __str__(self):
         return self.company_name
 
 
+MONTH_CHOICES = [
+    (1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'),
+    (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'),
+    (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December'),
+]
+
+
+class ClientMonthAssignment(models.Model):
+    """
+    One completed month for a client, i.e. Client.months normalized into rows
+    so per-person / per-month workload can be queried through indexes.
+    Kept in sync with Client.months by core.assignments.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='month_assignments')
+    year = models.IntegerField()  # copy of client.year, so (person, year, month) is one index
+    month = models.PositiveSmallIntegerField(choices=MONTH_CHOICES)
+    person = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'month'], name='unique_client_month_assignment'),
+        ]
+        indexes = [
+            models.Index(fields=['person', 'year', 'month'], name='core_assign_person_idx'),
+            models.Index(fields=['year', 'month'], name='core_assign_year_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} {self.year}-{self.month:02d}: {self.person}"
+
+
 class SignupOTP(models.Model):
     email = models.EmailField()
     code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    # How long a code can be used (its email is not delivered after that either)
+    LIFETIME = timedelta(minutes=10)
+
     def is_expired(self) -> bool:
-        # OTP expires after 10 minutes
-        return self.created_at < timezone.now() - timedelta(minutes=10)
+        return self.created_at < timezone.now() - self.LIFETIME
+
+    def __str__(self):
+        return f"{self.email} - {self.code} ({'used' if self.is_used else 'active'})"
+
+
+class Job(models.Model):
+    """A unit of background work (e.g. a spreadsheet import/export) run by `manage.py run_jobs`."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.CharField(max_length=500, blank=True)   # path of the uploaded file, if any
+    result_file = models.CharField(max_length=500, blank=True)  # path of the downloadable output, if any
+    result = models.JSONField(default=dict, blank=True)         # summary returned by the handler
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed while the job runs; a running job whose heartbeat stops is re-queued (core.jobs)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    @property
+    def percent(self) -> int:
+        if not self.total:
+            return 100 if self.status == self.STATUS_SUCCEEDED else 0
+        return min(100, int(self.progress * 100 / self.total))
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class RateLimitBucket(models.Model):
+    """Attempts counted for one rate-limit key in one fixed window (see core.ratelimit)."""
+    key = models.CharField(max_length=255)
+    window_start = models.BigIntegerField()  # unix time the window began
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window_start'], name='unique_rate_limit_bucket'),
+        ]
+        indexes = [models.Index(fields=['window_start'], name='core_ratelimit_window_idx')]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_start}: {self.count}"
+
+
+class OutboundEmail(models.Model):
+    """An email waiting in (or sent from) the outbox; delivered by `manage.py send_queued_mail`."""
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)  # list of recipient addresses
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Past this the content (an OTP, a reset link) is useless, so the message is failed, not sent
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx')]
+
+    def is_expired(self, now=None):
+        return self.expires_at is not None and self.expires_at <= (now or timezone.now())
 
     def __str__(self):
-        return f"{self.email} - {self.code} ({'used' if self.is_used else 'active'})"
\ No newline at end of file
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
@@ -0,0 +1,225 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination for Client listings.
+
+Pages are ordered by a stable, unique key (``company_name, id`` by default)
+and addressed by an opaque cursor that encodes the boundary row of the
+previous page. Fetching page 500 costs the same as fetching page 1 because
+the database seeks straight to the boundary instead of skipping rows with
+OFFSET, and the total is estimated/cached rather than counted on every load.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ORDERING = ('company_name', 'id')
+
+
+def get_page_size(value, default=None, maximum=None):
+    """Parse a ``page_size`` query parameter, clamped to the configured maximum."""
+    default = default or getattr(settings, 'CLIENT_LIST_PAGE_SIZE', 50)
+    maximum = maximum or getattr(settings, 'CLIENT_LIST_MAX_PAGE_SIZE', 500)
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(values, direction):
+    """Encode the boundary key values and direction ('n' or 'p') as a URL-safe token."""
+    payload = json.dumps({'k': list(values), 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, ordering=DEFAULT_ORDERING):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+    Returns (values, direction) or (None, None) if the token is missing or malformed.
+    """
+    if not token:
+        return None, None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values, direction = data['k'], data['d']
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        logger.warning("Ignoring malformed pagination cursor")
+        return None, None
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(ordering):
+        return None, None
+    return values, direction
+
+
+def _keyset_filter(ordering, values, forward):
+    """
+    Build the row-value comparison ``(a, b) > (x, y)`` (or ``<``) as a Q object:
+    ``a >= x AND (a > x OR (a = x AND b > y))``. All ordering fields must be
+    non-null.
+
+    The leading ``a >= x`` is redundant for correctness but lets the planner
+    turn the condition into a range seek on the (a, b) index; on the OR alone
+    PostgreSQL walks the index from the start and filters, so deep pages
+    would cost O(offset) again.
+    """
+    op = 'gt' if forward else 'lt'
+    condition = Q()
+    equal_so_far = Q()
+    for field_name, value in zip(ordering, values):
+        condition |= equal_so_far & Q(**{f'{field_name}__{op}': value})
+        equal_so_far &= Q(**{field_name: value})
+    bound = Q(**{f'{ordering[0]}__{op}e': values[0]})
+    return bound & condition
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move to its neighbours."""
+
+    def __init__(self, object_list, page_size, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _page_queryset(queryset, values, direction, page_size, ordering):
+    """Rows to fetch for one page: ``page_size + 1`` rows after/before the boundary key."""
+    if values is None:
+        return queryset.order_by(*ordering)[:page_size + 1]
+    if direction == 'n':
+        return queryset.filter(_keyset_filter(ordering, values, forward=True)).order_by(*ordering)[:page_size + 1]
+    descending = [f'-{name}' for name in ordering]
+    return queryset.filter(_keyset_filter(ordering, values, forward=False)).order_by(*descending)[:page_size + 1]
+
+
+def _build_page(rows, values, direction, page_size, ordering):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if values is None:
+        has_next, has_prev = has_more, False
+    elif direction == 'n':
+        has_next, has_prev = has_more, True
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    def key_of(obj):
+        # Model instances, or dicts from values() (the JSON API)
+        if isinstance(obj, dict):
+            return [obj[name] for name in ordering]
+        return [getattr(obj, name) for name in ordering]
+
+    next_cursor = encode_cursor(key_of(rows[-1]), 'n') if rows and has_next else None
+    prev_cursor = encode_cursor(key_of(rows[0]), 'p') if rows and has_prev else None
+    return KeysetPage(rows, page_size, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def paginate_keyset(queryset, cursor=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """
+    Return a ``KeysetPage`` of ``queryset`` ordered by ``ordering``.
+
+    ``cursor`` is the token from a previous page's ``next_cursor`` or
+    ``prev_cursor``. Any filters already applied to ``queryset`` (e.g. the
+    search box) are kept, so cursors stay valid while paging through results.
+    One extra row is fetched to detect whether a further page exists.
+    """
+    page_size = page_size or get_page_size(None)
+    values, direction = decode_cursor(cursor, ordering)
+    rows = list(_page_queryset(queryset, values, direction, page_size, ordering))
+    return _build_page(rows, values, direction, page_size, ordering)
+
+
+async def apaginate_keyset(queryset, cursor=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """Async version of ``paginate_keyset`` (prefetch_related lookups are honoured)."""
+    page_size = page_size or get_page_size(None)
+    values, direction = decode_cursor(cursor, ordering)
+    page_queryset = _page_queryset(queryset, values, direction, page_size, ordering)
+    rows = [obj async for obj in page_queryset.aiterator(chunk_size=page_size + 1)]
+    return _build_page(rows, values, direction, page_size, ordering)
+
+
+def estimated_table_rows(model, using='default'):
+    """
+    Planner row estimate for ``model``'s table (PostgreSQL only).
+    Returns None on other backends or when the table has never been analyzed.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def count_for_listing(queryset, search=''):
+    """
+    Total row count for a listing without running COUNT(*) on every page load.
+
+    Unfiltered listings on PostgreSQL use the planner's estimate once the table
+    is larger than ``CLIENT_LIST_EXACT_COUNT_THRESHOLD``. Everything else gets an
+    exact count that is cached for ``CLIENT_LIST_COUNT_CACHE_SECONDS`` per
+    search term. Returns (total, is_estimate).
+    """
+    if not search:
+        estimate = estimated_table_rows(queryset.model, using=queryset.db)
+        threshold = getattr(settings, 'CLIENT_LIST_EXACT_COUNT_THRESHOLD', 10000)
+        if estimate is not None and estimate > threshold:
+            return estimate, True
+
+    key = _count_cache_key(queryset, search)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, timeout=getattr(settings, 'CLIENT_LIST_COUNT_CACHE_SECONDS', 60))
+    return total, False
+
+
+async def acount_for_listing(queryset, search=''):
+    """Async version of ``count_for_listing``."""
+    if not search:
+        estimate = await sync_to_async(estimated_table_rows)(queryset.model, using=queryset.db)
+        threshold = getattr(settings, 'CLIENT_LIST_EXACT_COUNT_THRESHOLD', 10000)
+        if estimate is not None and estimate > threshold:
+            return estimate, True
+
+    key = _count_cache_key(queryset, search)
+    total = await cache.aget(key)
+    if total is None:
+        total = await queryset.acount()
+        await cache.aset(key, total, timeout=getattr(settings, 'CLIENT_LIST_COUNT_CACHE_SECONDS', 60))
+    return total, False
+
+
+def _count_cache_key(queryset, search):
+    digest = hashlib.sha1(search.encode('utf-8')).hexdigest()
+    return f"listing_count:{queryset.model._meta.label_lower}:{digest}"
@@ -0,0 +1,157 @@
+# core/ratelimit.py
+"""
+Sliding-window rate limiting backed by the database, shared by every
+gunicorn worker (no Redis needed).
+
+Attempts are counted in fixed windows stored in ``RateLimitBucket``. Each hit
+is a single atomic upsert (``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``)
+so concurrent workers never lose counts. The sliding window is approximated
+from the current and previous buckets:
+
+    estimate = previous * (1 - elapsed_fraction_of_current_window) + current
+
+which avoids the burst at window boundaries that a plain fixed window allows.
+
+Views opt in with the ``rate_limit`` decorator; limits are configured per
+scope in ``settings.RATE_LIMITS`` as ``(attempts, window_seconds)``.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import connection, transaction
+from django.db.models import F
+from django.shortcuts import redirect
+
+from core.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_SQL = (
+    "INSERT INTO {table} ({key}, window_start, {count}) VALUES (%s, %s, 1) "
+    "ON CONFLICT ({key}, window_start) DO UPDATE SET {count} = {table}.{count} + 1 "
+    "RETURNING {count}"
+)
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    estimate: float
+    limit: int
+    retry_after: int  # seconds until the estimate drops back under the limit (0 when allowed)
+
+
+def client_ip(request):
+    """
+    Caller's IP. Behind RATE_LIMIT_TRUSTED_PROXIES proxies (1 on Render) the
+    address appended by the outermost trusted proxy to X-Forwarded-For is used;
+    entries further left are client-supplied and can be spoofed.
+    """
+    proxies = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(proxies, len(hops))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _increment(key, window_start):
+    """Add one attempt to (key, window_start) atomically and return the new count."""
+    if connection.vendor in ('postgresql', 'sqlite'):
+        quote = connection.ops.quote_name
+        sql = _UPSERT_SQL.format(table=quote(RateLimitBucket._meta.db_table), key=quote('key'), count=quote('count'))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [key, window_start])
+            return cursor.fetchone()[0]
+    # Portable fallback: UPDATE is atomic per row; insert the row if it does not exist yet
+    with transaction.atomic():
+        updated = RateLimitBucket.objects.filter(key=key, window_start=window_start).update(
+            count=F('count') + 1)
+        if not updated:
+            bucket, created = RateLimitBucket.objects.get_or_create(key=key, window_start=window_start,
+                                                                    defaults={'count': 1})
+            if not created:
+                RateLimitBucket.objects.filter(pk=bucket.pk).update(count=F('count') + 1)
+        return RateLimitBucket.objects.get(key=key, window_start=window_start).count
+
+
+def hit(key, limit, window, now=None):
+    """Record one attempt for ``key`` and decide whether it is within ``limit`` per ``window`` seconds."""
+    now = time.time() if now is None else now
+    window_start = int(now // window) * window
+    current = _increment(key, window_start)
+    previous = RateLimitBucket.objects.filter(key=key, window_start=window_start - window).values_list(
+        'count', flat=True).first() or 0
+    elapsed = (now - window_start) / window
+    estimate = previous * (1 - elapsed) + current
+    if estimate <= limit:
+        return RateLimitResult(True, estimate, limit, 0)
+    # The previous window's weight decays linearly; once it no longer pushes us over, we are allowed again
+    if current > limit or not previous:
+        retry_after = window_start + window - now
+    else:
+        retry_after = (1 - (limit - current) / previous - elapsed) * window
+    return RateLimitResult(False, estimate, limit, max(1, math.ceil(retry_after)))
+
+
+def reset(key):
+    RateLimitBucket.objects.filter(key=key).delete()
+
+
+def _request_keys(request, scope, keys):
+    values = []
+    for name in keys:
+        if name == 'ip':
+            value = client_ip(request)
+        elif name.startswith('post:'):
+            value = (request.POST.get(name[5:]) or '').strip().lower()
+        else:
+            raise ValueError(f"Unknown rate limit key: {name}")
+        if value:
+            values.append(f"{scope}:{name}:{value}"[:255])
+    return values
+
+
+def rate_limit(scope, keys=('ip',), methods=('POST',)):
+    """
+    Limit a view to ``settings.RATE_LIMITS[scope]`` attempts per key.
+
+    ``keys`` may contain 'ip' and 'post:<field>' (e.g. 'post:email', so one
+    account cannot be brute-forced from many addresses). Each key is counted
+    separately and the request is refused if any of them is over the limit:
+    the user gets an error message and is redirected back to the form.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limits = getattr(settings, 'RATE_LIMITS', {})
+            if request.method not in methods or scope not in limits:
+                return view(request, *args, **kwargs)
+            limit, window = limits[scope]
+            for key in _request_keys(request, scope, keys):
+                result = hit(key, limit, window)
+                if not result.allowed:
+                    logger.warning(f"Rate limit exceeded for {key} ({result.estimate:.1f}/{limit} per {window}s)")
+                    minutes = max(1, math.ceil(result.retry_after / 60))
+                    messages.error(request, f"Too many attempts. Please try again in {minutes} minute(s).")
+                    response = redirect(request.path)
+                    response['Retry-After'] = str(result.retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cleanup(older_than=None):
+    """Delete buckets that can no longer affect any limit; returns the number removed."""
+    if older_than is None:
+        longest = max((window for _, window in getattr(settings, 'RATE_LIMITS', {}).values()), default=3600)
+        older_than = 2 * longest
+    deleted, _ = RateLimitBucket.objects.filter(window_start__lt=time.time() - older_than).delete()
+    return deleted
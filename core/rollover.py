@@ -0,0 +1,120 @@
+# core/rollover.py
+"""
+Year rollover: copy a year's clients into the next year with no months done.
+
+Each year's work lives in its own Client row, so starting a new year means
+cloning every client with ``year`` changed and ``months`` cleared. When the
+target year is still empty (the usual first run) the copy is one
+``INSERT ... SELECT`` inside the database. Otherwise rows are read with
+``values()`` and the missing ones written with batched ``bulk_create``.
+
+Re-running is safe: a client counts as already rolled over when the target
+year has a row with the same company name and account number (compared
+case-insensitively, as many times as the source year has it), so only the
+missing ones are created.
+"""
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import JSONField, Value
+
+from core.caching import invalidate_client_cache
+from core.models import Client
+
+logger = logging.getLogger(__name__)
+
+COPIED_FIELDS = (
+    'company_name', 'group', 'account_no', 'bank_name', 'email',
+    'first_allocated_person', 'review_person', 'remark',
+)
+
+
+@dataclass
+class RolloverResult:
+    from_year: int
+    to_year: int
+    created: int = 0
+    skipped: int = 0
+    dry_run: bool = False
+    # (company_name, account_no) samples for the dry-run diff
+    new: list = field(default_factory=list)
+    existing: list = field(default_factory=list)
+
+
+def client_key(company_name, account_no):
+    """Identity of a client across years."""
+    return ((company_name or '').strip().upper(), (account_no or '').strip().upper())
+
+
+def rollover_year(from_year, to_year, clients=None, dry_run=False, batch_size=None, sample_size=20):
+    """
+    Copy ``clients`` (default: every client in ``from_year``) into ``to_year``
+    with empty ``months``. Returns a ``RolloverResult``; with ``dry_run``
+    nothing is written and the result lists what would be created/skipped.
+    """
+    if from_year == to_year:
+        raise ValueError("The source and target year must differ.")
+    batch_size = batch_size or getattr(settings, 'ROLLOVER_BATCH_SIZE', 2000)
+    clients = Client.objects.all() if clients is None else clients
+    result = RolloverResult(from_year, to_year, dry_run=dry_run)
+
+    with transaction.atomic():
+        # Clients already in the target year, counted so duplicates within a year roll over once each
+        remaining = Counter(
+            client_key(name, account_no)
+            for name, account_no in Client.objects.filter(year=to_year).values_list('company_name', 'account_no')
+        )
+        source = clients.filter(year=from_year)
+        if not remaining and not dry_run:
+            result.created = _copy_in_database(source, to_year)
+            if result.created:
+                invalidate_client_cache()
+            logger.info(f"Rolled over {result.created} clients from {from_year} to {to_year}")
+            return result
+
+        rows = source.order_by('id').values(*COPIED_FIELDS)
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            key = client_key(row['company_name'], row['account_no'])
+            if remaining[key]:
+                remaining[key] -= 1
+                result.skipped += 1
+                if len(result.existing) < sample_size:
+                    result.existing.append(key)
+                continue
+            result.created += 1
+            if len(result.new) < sample_size:
+                result.new.append(key)
+            if dry_run:
+                continue
+            batch.append(Client(**row, year=to_year, months={}))
+            if len(batch) >= batch_size:
+                Client.objects.bulk_create(batch, batch_size=batch_size)
+                batch = []
+        if batch:
+            Client.objects.bulk_create(batch, batch_size=batch_size)
+        if result.created and not dry_run:
+            # Cleared months mean there are no month assignments to create
+            invalidate_client_cache()
+
+    if not dry_run:
+        logger.info(f"Rolled over {result.created} clients from {from_year} to {to_year} "
+                    f"({result.skipped} already present)")
+    return result
+
+
+def _copy_in_database(source, to_year):
+    """INSERT ... SELECT the ``source`` clients into ``to_year``; returns the number of rows copied."""
+    rows = source.order_by().annotate(
+        rollover_year=Value(to_year), rollover_months=Value({}, output_field=JSONField()),
+    ).values_list(*COPIED_FIELDS, 'rollover_year', 'rollover_months')
+    connection = connections[source.db]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(Client._meta.get_field(name).column) for name in (*COPIED_FIELDS, 'year', 'months'))
+    select_sql, params = rows.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(Client._meta.db_table)} ({columns}) {select_sql}", params)
+        return cursor.rowcount
@@ -0,0 +1,131 @@
+# core/search.py
+"""
+Shared Client search service used by client_list, search_details and search_company.
+
+Two backends implement the same interface:
+
+* ``PostgresSearchBackend`` matches against the trigger-maintained
+  ``Client.search_vector`` (GIN indexed) with prefix tsqueries, falls back to
+  trigram similarity on ``company_name`` for typos, and ranks by
+  ``ts_rank + similarity``.
+* ``SimpleSearchBackend`` uses portable ``icontains`` filters and a CASE-based
+  rank, so SQLite (local development) behaves the same way, just slower.
+
+The backend is picked per database from ``settings.CLIENT_SEARCH_BACKEND``
+('auto', 'postgres' or 'simple').
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from core.models import Client
+
+SEARCH_FIELDS = ('company_name', 'group', 'account_no')
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(term):
+    """Split a search term into lowercase word tokens (punctuation is dropped)."""
+    return _TOKEN_RE.findall((term or '').lower())
+
+
+class SimpleSearchBackend:
+    """Portable backend built on ``icontains``; works on every database."""
+
+    name = 'simple'
+
+    def filter(self, queryset, term, match_all=True):
+        """Restrict ``queryset`` to clients matching ``term`` (no ordering applied)."""
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+        condition = Q()
+        for token in tokens:
+            token_q = Q()
+            for field_name in SEARCH_FIELDS:
+                token_q |= Q(**{f'{field_name}__icontains': token})
+            condition = (condition & token_q) if match_all else (condition | token_q)
+        return queryset.filter(condition)
+
+    def rank(self, queryset, term, match_all=True):
+        """Matching clients ordered best-first (exact name, then prefix, then substring)."""
+        term = (term or '').strip()
+        return self.filter(queryset, term, match_all=match_all).annotate(
+            rank=Case(
+                When(company_name__iexact=term, then=Value(3)),
+                When(company_name__istartswith=term, then=Value(2)),
+                When(account_no__iexact=term, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('-rank', 'company_name', 'id')
+
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    """Full-text + trigram backend; requires migration 0017 (pg_trgm, GIN indexes, trigger)."""
+
+    name = 'postgres'
+
+    def _query(self, tokens, match_all):
+        from django.contrib.postgres.search import SearchQuery
+
+        # Tokens only contain \w characters, so they are safe inside a raw tsquery
+        joiner = ' & ' if match_all else ' | '
+        raw = joiner.join(f"{token}:*" for token in tokens)
+        return SearchQuery(raw, search_type='raw', config='simple')
+
+    def filter(self, queryset, term, match_all=True):
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+        return queryset.filter(
+            Q(search_vector=self._query(tokens, match_all))
+            | Q(company_name__trigram_similar=term.strip())
+        )
+
+    def rank(self, queryset, term, match_all=True):
+        from django.contrib.postgres.search import SearchRank, TrigramSimilarity
+
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+        query = self._query(tokens, match_all)
+        return self.filter(queryset, term, match_all=match_all).annotate(
+            rank=SearchRank(F('search_vector'), query)
+            + TrigramSimilarity('company_name', term.strip()),
+        ).order_by('-rank', 'company_name', 'id')
+
+
+BACKENDS = {
+    'simple': SimpleSearchBackend,
+    'postgres': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """Backend instance for database alias ``using`` according to CLIENT_SEARCH_BACKEND."""
+    name = getattr(settings, 'CLIENT_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'postgres' if connections[using].vendor == 'postgresql' else 'simple'
+    return BACKENDS[name]()
+
+
+def filter_clients(term, queryset=None, match_all=True):
+    """Unordered queryset of clients matching ``term`` (for listings with their own ordering)."""
+    queryset = Client.objects.all() if queryset is None else queryset
+    return get_search_backend(queryset.db).filter(queryset, term, match_all=match_all)
+
+
+def search_clients(term, queryset=None, match_all=True):
+    """Clients matching ``term`` ordered by relevance, best match first."""
+    queryset = Client.objects.all() if queryset is None else queryset
+    return get_search_backend(queryset.db).rank(queryset, term, match_all=match_all)
+
+
+def exact_company_matches(term, queryset=None):
+    """Clients whose company name equals ``term`` case-insensitively."""
+    queryset = Client.objects.all() if queryset is None else queryset
+    return queryset.filter(company_name__iexact=(term or '').strip())
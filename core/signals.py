@@ -0,0 +1,43 @@
+# core/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.assignments import sync_month_assignments
+from core.caching import client_cache, invalidate_client_cache
+from core.models import Client
+from core.suggest import suggest_index
+
+
+@receiver(post_save, sender=Client)
+def sync_client_month_assignments(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Mirror Client.months into ClientMonthAssignment after every single-row save."""
+    if raw:
+        return
+    if update_fields is not None and not {'months', 'year'} & set(update_fields):
+        return
+    sync_month_assignments([(instance.pk, instance.year, instance.months)])
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def invalidate_cached_clients(sender, **kwargs):
+    """Any client write makes cached search results and details stale."""
+    invalidate_client_cache()
+
+
+@receiver(post_save, sender=Client)
+def update_suggest_index_on_save(sender, instance, raw=False, **kwargs):
+    """Keep this process's autocomplete index current (other processes rebuild on the version bump)."""
+    if raw:
+        return
+    pk, company_name, account_no = instance.pk, instance.company_name, instance.account_no
+    version = client_cache.version()
+    transaction.on_commit(lambda: suggest_index.client_saved(pk, company_name, account_no, version))
+
+
+@receiver(post_delete, sender=Client)
+def update_suggest_index_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    version = client_cache.version()
+    transaction.on_commit(lambda: suggest_index.client_deleted(pk, version))
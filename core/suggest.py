@@ -0,0 +1,182 @@
+# core/suggest.py
+"""
+In-memory prefix index behind the ``/search/suggest/`` autocomplete endpoint.
+
+Each process keeps a sorted list of normalized company names and account
+numbers with the client id next to each key. A prefix lookup is a
+``bisect`` to the first key >= the prefix followed by a short forward scan,
+so suggestions never touch the database and stay well under a millisecond
+at 100k clients.
+
+The index is built on first use and kept current two ways:
+
+* single saves and deletes in this process update it incrementally from the
+  post_save/post_delete signals (core/signals.py), once the transaction commits
+* every other write (other processes, ``bulk_create``/``update()``) bumps the
+  client cache version (core.caching); a lookup that sees a version the index
+  has not caught up with rebuilds it, at most every SUGGEST_INDEX_REBUILD_SECONDS
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from core.caching import client_cache
+from core.models import Client
+from msystem.db_routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+MATCH_FIELDS = ('company_name', 'account_no')
+
+
+def normalize_prefix(value):
+    """Key form of a name or account number: case-folded with single spaces."""
+    return ' '.join((value or '').split()).casefold()
+
+
+class PrefixIndex:
+    """Sorted (key, client id) arrays for one process; safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._ids = []
+        self._fields = []
+        self._clients = {}  # id -> (company_name, account_no)
+        self.version = None
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._clients)
+
+    def build(self):
+        """Load every client and replace the index (values_list, no model instances)."""
+        started = time.perf_counter()
+        with primary_reads():
+            # Read the version first: a write during the load makes the index look stale, never fresh
+            version = client_cache.version()
+            rows = list(Client.objects.values_list('id', 'company_name', 'account_no').iterator(chunk_size=5000))
+        entries = []
+        clients = {}
+        for pk, company_name, account_no in rows:
+            clients[pk] = (company_name, account_no)
+            entries.extend(self._entries(pk, company_name, account_no))
+        entries.sort()
+        with self._lock:
+            self._keys = [key for key, _, _ in entries]
+            self._fields = [field for _, field, _ in entries]
+            self._ids = [pk for _, _, pk in entries]
+            self._clients = clients
+            self.version = version
+            self.built_at = time.monotonic()
+        logger.info(f"Suggest index built: {len(clients)} clients, {len(entries)} keys "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _entries(self, pk, company_name, account_no):
+        for field, value in zip(MATCH_FIELDS, (company_name, account_no)):
+            key = normalize_prefix(value)
+            if key:
+                yield key, field, pk
+
+    def add(self, pk, company_name, account_no):
+        """Insert or replace one client."""
+        with self._lock:
+            self._discard(pk)
+            self._clients[pk] = (company_name, account_no)
+            for key, field, _ in self._entries(pk, company_name, account_no):
+                position = bisect_right(self._keys, key)
+                self._keys.insert(position, key)
+                self._fields.insert(position, field)
+                self._ids.insert(position, pk)
+
+    def remove(self, pk):
+        with self._lock:
+            self._discard(pk)
+
+    def _discard(self, pk):
+        existing = self._clients.pop(pk, None)
+        if existing is None:
+            return
+        for key, _, _ in self._entries(pk, *existing):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == pk:
+                    del self._keys[position]
+                    del self._fields[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def lookup(self, prefix, limit=10):
+        """Up to ``limit`` distinct (company_name, account_no) matches for ``prefix``, in key order."""
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            while position < len(self._keys) and len(results) < limit:
+                if not self._keys[position].startswith(prefix):
+                    break
+                pk = self._ids[position]
+                company_name, account_no = self._clients[pk]
+                # The same company appears once per year; suggest it once
+                identity = (company_name, account_no)
+                if identity not in seen:
+                    seen.add(identity)
+                    results.append({
+                        'id': pk,
+                        'company_name': company_name,
+                        'account_no': account_no,
+                        'match': self._fields[position],
+                    })
+                position += 1
+        return results
+
+
+class SuggestIndex:
+    """The process-wide PrefixIndex, (re)built when the client cache version moves on."""
+
+    def __init__(self):
+        self.index = PrefixIndex()
+        self._build_lock = threading.Lock()
+
+    def _ensure_current(self):
+        index = self.index
+        if index.version is not None:
+            if index.version == client_cache.version():
+                return
+            min_age = getattr(settings, 'SUGGEST_INDEX_REBUILD_SECONDS', 30)
+            if time.monotonic() - index.built_at < min_age:
+                return
+        with self._build_lock:
+            # Another thread may have rebuilt it while this one waited
+            if index.version is None or index.version != client_cache.version():
+                index.build()
+
+    def suggest(self, prefix, limit=10):
+        self._ensure_current()
+        return self.index.lookup(prefix, limit=limit)
+
+    def client_saved(self, pk, company_name, account_no, version_before):
+        """Apply a committed save from this process (called after the cache invalidation ran)."""
+        self._apply(version_before, lambda: self.index.add(pk, company_name, account_no))
+
+    def client_deleted(self, pk, version_before):
+        self._apply(version_before, lambda: self.index.remove(pk))
+
+    def _apply(self, version_before, change):
+        index = self.index
+        if index.version is None:
+            return  # Not built yet; the first lookup loads the current data
+        change()
+        # If our own invalidation was the only write since the index was current, it is current again
+        if index.version == version_before and client_cache.version() == version_before + 1:
+            index.version = version_before + 1
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,114 @@
+# core/synthetic.py
+"""
+Synthetic Client data for benchmarks and load checks.
+
+Generated rows look like the real table: uppercased company names with legal
+suffixes, bank/account pairs, allocated and review persons, a ``months`` map
+of month number -> person and a list of emails. ``corrupt`` misspells a name
+the way a typed import row does, for the fuzzy-match and duplicate benchmarks.
+"""
+import random
+
+from core.assignments import sync_clients
+from core.caching import invalidate_client_cache
+from core.models import Client
+
+NAME_WORDS = [
+    'ALPHA', 'APEX', 'ATLAS', 'BLUE', 'BRIGHT', 'CEDAR', 'CORAL', 'CREST', 'DELTA',
+    'EAGLE', 'ECHO', 'EVERGREEN', 'FALCON', 'GOLDEN', 'GRANITE', 'HARBOR', 'HORIZON',
+    'IRON', 'JADE', 'KEYSTONE', 'LAKE', 'LIBERTY', 'MAPLE', 'MERIDIAN', 'NORTH',
+    'OAK', 'OCEAN', 'PARIKH', 'PEAK', 'PINE', 'PIONEER', 'PRIME', 'QUANTUM', 'RIVER',
+    'ROYAL', 'SHAH', 'SILVER', 'SOLAR', 'SUMMIT', 'SUNRISE', 'TRINITY', 'UNITED',
+    'VALLEY', 'VERTEX', 'VISTA', 'WEST', 'WILLOW', 'ZENITH',
+]
+NAME_KINDS = [
+    'ACCOUNTING', 'CONSULTING', 'DENTAL', 'ENTERPRISES', 'FOODS', 'HOLDINGS',
+    'HOSPITALITY', 'LOGISTICS', 'MEDICAL', 'MOTORS', 'PARTNERS', 'PROPERTIES',
+    'RETAIL', 'SERVICES', 'SOLUTIONS', 'SUPPLY', 'TECHNOLOGIES', 'TRADING',
+]
+NAME_SUFFIXES = ['LLC', 'INC', 'CORP', 'LTD', 'LLP', 'CO']
+GROUPS = ['GROUP A', 'GROUP B', 'GROUP C', 'RESTAURANTS', 'HOTELS', 'MEDICAL', 'RETAIL']
+BANKS = ['CHASE', 'BANK OF AMERICA', 'WELLS FARGO', 'CITI', 'PNC', 'TD BANK', 'CAPITAL ONE']
+PEOPLE = [
+    'AARAV', 'DIYA', 'HARSH', 'ISHA', 'KRISHNA', 'MEERA', 'NEEL', 'PRIYA',
+    'RAHUL', 'SNEHA', 'SWETANG', 'TANVI', 'VIKRAM', 'ZARA',
+]
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _typo(rng, word):
+    if len(word) < 3:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(('replace', 'drop', 'swap', 'insert'))
+    if kind == 'replace':
+        return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+    if kind == 'drop':
+        return word[:i] + word[i + 1:]
+    if kind == 'swap':
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word[:i] + rng.choice(LETTERS) + word[i:]
+
+
+def corrupt(rng, name):
+    """``name`` with one or two typos and, half the time, its words reordered."""
+    words = name.split()
+    for _ in range(rng.choice((1, 1, 2))):
+        i = rng.randrange(len(words))
+        words[i] = _typo(rng, words[i])
+    if rng.random() < 0.5:
+        rng.shuffle(words)
+    return ' '.join(words)
+
+
+def company_name(rng):
+    """A plausible uppercased company name such as 'SILVER PEAK LOGISTICS LLC'."""
+    words = rng.sample(NAME_WORDS, rng.choice((1, 2, 2, 3)))
+    return ' '.join(words + [rng.choice(NAME_KINDS), rng.choice(NAME_SUFFIXES)])
+
+
+def client_values(rng, index, year=2025):
+    """Field values for one synthetic client; ``index`` keeps account numbers unique."""
+    completed = rng.randint(0, 12)
+    months = {str(m): rng.choice(PEOPLE) for m in sorted(rng.sample(range(1, 13), completed))}
+    name = company_name(rng)
+    slug = name.split()[0].lower()
+    return {
+        'company_name': name,
+        'group': rng.choice(GROUPS),
+        'account_no': f"{rng.randint(1000, 9999)}{index:07d}",
+        'bank_name': rng.choice(BANKS),
+        'email': [f"{slug}{index}@example.com" for _ in range(rng.choice((0, 1, 1, 2)))],
+        'first_allocated_person': rng.choice(PEOPLE),
+        'review_person': rng.choice(PEOPLE),
+        'year': year,
+        'months': months,
+        'remark': '' if rng.random() < 0.8 else 'FOLLOW UP WITH CLIENT',
+    }
+
+
+def generate_clients(count, seed=0, year=2025):
+    """Yield ``count`` unsaved Client instances (deterministic for a given seed)."""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield Client(**client_values(rng, index, year=year))
+
+
+def seed_clients(count, seed=0, year=2025, batch_size=2000):
+    """
+    Insert ``count`` synthetic clients with ``bulk_create`` (plus their month
+    assignments). Returns the number created.
+    """
+    created = 0
+    batch = []
+    for client in generate_clients(count, seed=seed, year=year):
+        batch.append(client)
+        if len(batch) >= batch_size:
+            sync_clients(Client.objects.bulk_create(batch, batch_size=batch_size), batch_size=batch_size)
+            created += len(batch)
+            batch = []
+    if batch:
+        sync_clients(Client.objects.bulk_create(batch, batch_size=batch_size), batch_size=batch_size)
+        created += len(batch)
+    invalidate_client_cache()
+    return created
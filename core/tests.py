@@ -1,3 +1,1500 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
 
-# Create your tests here.
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin import helpers
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections, router, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.shortcuts import resolve_url
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ratelimit
+from core.analytics import build_report
+from core.assignments import completed_by
+from core.benchmarking import consume_response, measure, percentile
+from core.caching import VERSION_KEY, ClientCache, client_cache, normalize_term
+from core.duplicates import merge_clients
+from core.exporters import get_export_format
+from core.fuzzy import did_you_mean, fuzzy_index
+from core.importers import IMPORT_MODE_MERGE, ImportFileError, SheetReader, error_report_path, import_clients
+from core.jobs import ProgressReporter, claim_next_job, enqueue_job, expire_job_files, requeue_stale_jobs, run_job
+from core.mail import queue_mail, send_batch
+from core.metrics import MetricsStore, RequestMetrics, record_request, store as metrics_store
+from core.management.commands.run_jobs import Command as RunJobsCommand
+from core.middleware import ReplicaStickinessMiddleware
+from core.models import Client, ClientMonthAssignment, Job, OutboundEmail, RateLimitBucket, SignupOTP
+from core.pagination import DEFAULT_ORDERING, _keyset_filter, paginate_keyset
+from core.search import (
+    PostgresSearchBackend, SimpleSearchBackend, exact_company_matches, filter_clients, get_search_backend,
+    search_clients, tokenize,
+)
+from core.suggest import PrefixIndex, suggest_index
+from core.synthetic import seed_clients
+from msystem.db_routers import PRIMARY, lag_monitor, primary_reads, replica_reads, tracking_writes, use_replica
+
+WATCHED_TABLES = (Client._meta.db_table, ClientMonthAssignment._meta.db_table)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _plan_nodes(child)
+
+
+def plan_problems(queryset, ordered=False, allow_walk=False):
+    """
+    What is wrong with ``queryset``'s plan on the Client tables: sequential
+    scans, index walks without a bound (an index read from one end with the
+    WHERE clause applied as a filter), and for ``ordered`` pages a sort
+    instead of reading in index order. ``allow_walk`` is for an unfiltered
+    first page, where reading the index from the start is the point.
+    """
+    problems = []
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # Small test tables make a seq scan the cheapest plan; with it off
+            # the planner has to show which index (if any) serves the query
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        for node in _plan_nodes(plan):
+            table = node.get('Relation Name')
+            node_type = node['Node Type']
+            if table in WATCHED_TABLES and node_type == 'Seq Scan':
+                problems.append(f"sequential scan on {table}")
+            elif (table in WATCHED_TABLES and node_type in ('Index Scan', 'Index Only Scan')
+                  and 'Index Cond' not in node and not allow_walk):
+                problems.append(f"unbounded walk of {node['Index Name']}")
+            elif ordered and node_type in ('Sort', 'Incremental Sort'):
+                problems.append("sort instead of index order")
+        return problems, json.dumps(plan, indent=1)
+
+    plan = queryset.explain()
+    for line in plan.splitlines():
+        # "SCAN core_client" / "SCAN core_client USING INDEX ..." read the whole table or index;
+        # "SEARCH core_client USING INDEX ... (company_name>?)" seeks
+        match = re.search(r'\bSCAN (\w+)', line)
+        if match and match.group(1) in WATCHED_TABLES and not allow_walk:
+            problems.append(f"full scan of {match.group(1)}: {line.strip()}")
+        if ordered and 'USE TEMP B-TREE FOR ORDER BY' in line:
+            problems.append("sort instead of index order")
+    return problems, plan
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated names so pages split inside a run of equal company names
+        Client.objects.bulk_create([
+            Client(company_name=f"COMPANY {index % 7}", account_no=str(index), year=2025)
+            for index in range(40)
+        ])
+        cls.ordered = list(Client.objects.order_by('company_name', 'id').values_list('id', flat=True))
+
+    def test_pages_forward_and_back_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = paginate_keyset(Client.objects.all(), cursor=cursor, page_size=6)
+            seen += [client.id for client in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.ordered)
+
+        back, cursor = [client.id for client in page], page.prev_cursor
+        while cursor:
+            page = paginate_keyset(Client.objects.all(), cursor=cursor, page_size=6)
+            back = [client.id for client in page] + back
+            cursor = page.prev_cursor
+        self.assertEqual(back, self.ordered)
+
+    def test_filter_has_a_leading_range_bound(self):
+        # Without it the OR cannot be used as an index range and deep pages walk the index
+        forward = str(Client.objects.filter(_keyset_filter(('company_name', 'id'), ['COMPANY 3', 5], True)).query)
+        backward = str(Client.objects.filter(_keyset_filter(('company_name', 'id'), ['COMPANY 3', 5], False)).query)
+        self.assertIn('"company_name" >= COMPANY 3 AND', forward)
+        self.assertIn('"company_name" <= COMPANY 3 AND', backward)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MonthAssignmentSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('months', 'months@example.com', 'pw')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def test_queryset_update_resyncs_the_month_assignments(self):
+        acme = Client.objects.create(company_name="ACME", year=2025, months={'1': 'ANN'})
+        Client.objects.create(company_name="OTHER", year=2025, months={'1': 'ANN'})
+        Client.objects.filter(company_name="ACME").update(months={'3': 'BOB'}, year=2026)
+
+        self.assertEqual(list(acme.month_assignments.values_list('year', 'month', 'person')), [(2026, 3, 'BOB')])
+        export = b''.join(get_export_format('csv').stream(Client.objects.filter(pk=acme.pk))).decode()
+        self.assertIn('March (BOB)', export)
+        self.assertNotIn('January', export)
+        listing = self.client.get(reverse('client_list'), {'search': 'ACME'}).content.decode()
+        self.assertIn('MARCH', listing)
+        self.assertNotIn('JANUARY', listing)
+        # Clients outside the update keep their assignments
+        self.assertEqual(ClientMonthAssignment.objects.exclude(client=acme).count(), 1)
+
+    def test_bulk_update_resyncs_the_month_assignments(self):
+        acme = Client.objects.create(company_name="ACME", year=2025, months={'1': 'ANN'})
+        acme.months = {'1': 'ANN', '2': 'CAT'}
+        Client.objects.bulk_update([acme], ['months'])
+        self.assertEqual(sorted(acme.month_assignments.values_list('month', 'person')), [(1, 'ANN'), (2, 'CAT')])
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the queries behind the Client views and fail when one stops using an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for offset in range(2):
+            seed_clients(1000, seed=42 + offset, year=2025 - offset)
+        with connection.cursor() as cursor:
+            for table in WATCHED_TABLES:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+        cls.sample = Client.objects.order_by('company_name', 'id')[500]
+
+    def assertUsesIndexes(self, queryset, ordered=False, allow_walk=False):
+        problems, plan = plan_problems(queryset, ordered=ordered, allow_walk=allow_walk)
+        self.assertFalse(problems, f"{'; '.join(problems)}\n{plan}")
+
+    def _keyset_page(self, forward):
+        ordering = list(DEFAULT_ORDERING)
+        condition = _keyset_filter(ordering, [self.sample.company_name, self.sample.id], forward=forward)
+        if not forward:
+            ordering = [f'-{field_name}' for field_name in ordering]
+        return Client.objects.filter(condition).order_by(*ordering)[:51]
+
+    def test_client_list_pages(self):
+        self.assertUsesIndexes(Client.objects.order_by(*DEFAULT_ORDERING)[:51], ordered=True, allow_walk=True)
+        self.assertUsesIndexes(self._keyset_page(forward=True), ordered=True)
+        self.assertUsesIndexes(self._keyset_page(forward=False), ordered=True)
+
+    def test_unbounded_keyset_filter_is_rejected(self):
+        # The OR form alone walks the whole index; the check has to catch that
+        name, pk = self.sample.company_name, self.sample.id
+        condition = Q(company_name__gt=name) | Q(company_name=name, id__gt=pk)
+        problems, _ = plan_problems(Client.objects.filter(condition).order_by(*DEFAULT_ORDERING)[:51], ordered=True)
+        self.assertTrue(problems)
+
+    def test_filters(self):
+        sample = self.sample
+        checks = {
+            'admin filter year+group': Client.objects.filter(year=sample.year, group=sample.group),
+            'by first allocated person': Client.objects.filter(
+                first_allocated_person=sample.first_allocated_person, year=sample.year),
+            'by review person': Client.objects.filter(review_person=sample.review_person, year=sample.year),
+            'month assignments for a page': ClientMonthAssignment.objects.filter(
+                client_id__in=[sample.id]).order_by('client_id', 'month'),
+            'completed by person': completed_by(sample.first_allocated_person, sample.year, 1),
+        }
+        for label, queryset in checks.items():
+            with self.subTest(label):
+                self.assertUsesIndexes(queryset)
+
+    def test_search(self):
+        if connection.vendor != 'postgresql':
+            # SQLite compiles iexact/icontains to LIKE, which cannot use a B-tree index;
+            # PostgreSQL uses UPPER() = UPPER() and the trigram/GIN indexes
+            self.skipTest("search plans are only index-backed on PostgreSQL")
+        name = self.sample.company_name
+        token = name.split()[0]
+        checks = {
+            'search_details exact match': exact_company_matches(name.lower()).order_by('id')[:1],
+            'client_list search': filter_clients(token, match_all=False).order_by(*DEFAULT_ORDERING)[:51],
+            'search_details ranked search': search_clients(name)[:1],
+            'search_company search': search_clients(token)[:20],
+        }
+        for label, queryset in checks.items():
+            with self.subTest(label):
+                self.assertUsesIndexes(queryset)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ClientCacheVersionTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_evicted_version_never_goes_back(self):
+        cache = ClientCache()
+        cache.invalidate()
+        cache.invalidate()
+        before = cache.version()
+        stale_key = cache.make_key('details', 'acme')
+        caches['default'].delete(VERSION_KEY)  # culled by the cache backend
+        self.assertGreater(cache.version(), before)
+        self.assertNotEqual(cache.make_key('details', 'acme'), stale_key)
+
+    def test_invalidate_bumps_the_version(self):
+        cache = ClientCache()
+        before = cache.version()
+        cache.invalidate()
+        self.assertEqual(cache.version(), before + 1)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SEARCH_COMPANY_MAX_RESULTS=10,
+)
+class CompanySearchCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search', 'search@example.com', 'pw')
+        Client.objects.bulk_create([Client(company_name=f"Acme {i:02}", year=2025) for i in range(30)])
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def test_caches_a_bounded_list_of_ids(self):
+        for url in (reverse('search_company'), reverse('search_company_async')):
+            with self.subTest(url=url):
+                caches['default'].clear()
+                response = self.client.get(url, {'q': 'a'})
+                results = list(response.context['results'])
+                self.assertEqual(len(results), 10)
+                self.assertTrue(all(isinstance(client, Client) for client in results))
+                cached = caches['default'].get(client_cache.make_key('company_search_ids', normalize_term('a')))
+                self.assertEqual(cached, [client.pk for client in results])
+
+    def test_deleted_rows_drop_out_of_cached_results(self):
+        first = self.client.get(reverse('search_company'), {'q': 'acme'}).context['results'][0]
+        first.delete()  # on_commit invalidation never runs inside a TestCase
+        results = list(self.client.get(reverse('search_company'), {'q': 'acme'}).context['results'])
+        self.assertNotIn(first.pk, [client.pk for client in results])
+        self.assertEqual(len(results), 9)
+
+
+# view -> (most queries per request, p50 latency budget in ms at VIEW_BUDGET_ROWS clients)
+VIEW_BUDGETS = {
+    'client_list': (5, 300),
+    'client_list search': (5, 300),
+    'search_details': (5, 150),
+    'search_company': (5, 500),
+    'api_clients': (3, 150),
+    'analytics': (17, 400),
+    'export_excel csv': (4, 1000),
+    'export_excel xlsx': (4, 1500),
+    'import_excel 200 rows': (19, 2000),
+}
+VIEW_BUDGET_ROWS = 2000
+# Slow CI machines can loosen the latency budgets without touching the query budgets
+LATENCY_FACTOR = float(os.environ.get('VIEW_BUDGET_LATENCY_FACTOR', '1'))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    # One export chunk at these sizes, so the export budgets do not depend on the row count
+    EXPORT_CHUNK_SIZE=5000,
+)
+class ViewBudgetTests(TestCase):
+    """
+    The benchmark_views scenarios on seeded data, with a query and a latency
+    budget per view, so a regression fails the build instead of only showing
+    up in a benchmark report.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('budget', 'budget@example.com', None)
+        seed_clients(VIEW_BUDGET_ROWS // 4, seed=42)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def _grow(self):
+        seed_clients(VIEW_BUDGET_ROWS - Client.objects.count(), seed=43)
+
+    def _scenarios(self):
+        name = Client.objects.order_by('id')[7].company_name
+        token = name.split()[0]
+        import_ids = list(Client.objects.order_by('id').values_list('id', flat=True)[:200])
+        import_body = b''.join(get_export_format('csv').stream(Client.objects.filter(pk__in=import_ids)))
+
+        def import_file():
+            upload = SimpleUploadedFile('budget.csv', import_body, content_type='text/csv')
+            with transaction.atomic():
+                response = self.client.post(reverse('import_excel'), {'excel_file': upload, 'mode': 'append'})
+                transaction.set_rollback(True)
+            return response
+
+        return {
+            'client_list': lambda: self.client.get(reverse('client_list')),
+            'client_list search': lambda: self.client.get(reverse('client_list'), {'search': token}),
+            'search_details': lambda: self.client.get(reverse('search_details'), {'search': name}),
+            'search_company': lambda: self.client.get(reverse('search_company'), {'q': token}),
+            'api_clients': lambda: self.client.get(reverse('api_clients')),
+            'analytics': lambda: self.client.get(reverse('analytics')),
+            'export_excel csv': lambda: self.client.get(reverse('export_excel', args=['csv'])),
+            'export_excel xlsx': lambda: self.client.get(reverse('export_excel', args=['xlsx'])),
+            'import_excel 200 rows': import_file,
+        }
+
+    def _cold_queries(self):
+        """Queries per scenario on an empty cache (the expensive path)."""
+        counts = {}
+        for name, run in self._scenarios().items():
+            caches['default'].clear()
+
+            def request():
+                response = run()
+                consume_response(response)  # streamed bodies run their queries while being read
+                return response
+            response, _, queries, _ = measure(request)
+            self.assertLess(response.status_code, 400, name)
+            counts[name] = queries
+        return counts
+
+    def test_query_budgets(self):
+        small = self._cold_queries()
+        self._grow()
+        large = self._cold_queries()
+        for name, (max_queries, _) in VIEW_BUDGETS.items():
+            with self.subTest(name):
+                self.assertLessEqual(large[name], max_queries)
+                # Constant per request: more rows must not mean more queries (N+1)
+                self.assertEqual(large[name], small[name])
+
+    def test_latency_budgets(self):
+        self._grow()
+        for name, run in self._scenarios().items():
+            budget_ms = VIEW_BUDGETS[name][1] * LATENCY_FACTOR
+            consume_response(run())  # warm-up
+            timings = [measure(lambda: consume_response(run()))[1] for _ in range(5)]
+            with self.subTest(name):
+                self.assertLessEqual(percentile(timings, 50), budget_ms)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MailExpiryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_expired_messages_are_failed_not_sent(self):
+        stale = queue_mail('Old OTP', 'OTP: 123456', ['a@example.com'],
+                           expires_at=timezone.now() - timedelta(seconds=1))
+        live = queue_mail('New OTP', 'OTP: 654321', ['a@example.com'],
+                          expires_at=timezone.now() + timedelta(minutes=10))
+        plain = queue_mail('Hello', 'No expiry', ['a@example.com'])
+        self.assertEqual(send_batch(), (2, 1))
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['Hello', 'New OTP'])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, OutboundEmail.STATUS_FAILED)
+        self.assertIn('Expired', stale.last_error)
+        for email in (live, plain):
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboundEmail.STATUS_SENT)
+
+    def test_otp_and_reset_emails_expire_with_their_codes(self):
+        self.client.post(reverse('signup'), {'send_otp': '1', 'username': 'new', 'email': 'new@example.com'})
+        otp = SignupOTP.objects.get(email='new@example.com')
+        self.assertEqual(OutboundEmail.objects.get().expires_at, otp.created_at + SignupOTP.LIFETIME)
+
+        OutboundEmail.objects.all().delete()
+        User.objects.create_user('old', 'old@example.com', 'pw')
+        before = timezone.now()
+        self.client.post(reverse('forgot_password'), {'email': 'old@example.com'})
+        expires_at = OutboundEmail.objects.get().expires_at
+        reset_timeout = timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+        self.assertGreaterEqual(expires_at, before + reset_timeout)
+        self.assertLessEqual(expires_at, timezone.now() + reset_timeout)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BulkEditViewTests(TestCase):
+    APPLY = {'edit-operation': 'persons', 'edit-review_person': 'BOB', 'apply': '1'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create_user('editor', 'editor@example.com', 'pw')
+        cls.editor.user_permissions.add(Permission.objects.get(codename='change_client'))
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'pw')
+        cls.acme = Client.objects.create(company_name="ACME", group="A", year=2025)
+        cls.beta = Client.objects.create(company_name="BETA", group="B", year=2025)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_needs_change_permission(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(reverse('bulk_edit'), {'ids': [self.acme.pk], **self.APPLY})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Client.objects.filter(review_person='BOB').exists())
+
+    def test_empty_selection_is_rejected(self):
+        self.client.force_login(self.editor)
+        response = self.client.post(reverse('bulk_edit'), {'search': '', 'group': '', **self.APPLY})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['selection'].non_field_errors())
+        self.assertFalse(Client.objects.filter(review_person='BOB').exists())
+
+    def test_filtered_selection_is_applied(self):
+        self.client.force_login(self.editor)
+        self.client.post(reverse('bulk_edit'), {'group': 'a', **self.APPLY})
+        self.assertEqual(list(Client.objects.filter(review_person='BOB')), [self.acme])
+
+
+class ClientAdminActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', None)
+        cls.viewer = User.objects.create_user('viewer', 'viewer@example.com', None, is_staff=True)
+        cls.viewer.user_permissions.add(Permission.objects.get(codename='view_client'))
+
+    def _post_action(self, user, action, clients, **extra):
+        self.client.force_login(user)
+        return self.client.post(reverse('admin:core_client_changelist'), {
+            'action': action, helpers.ACTION_CHECKBOX_NAME: [client.pk for client in clients], **extra})
+
+    def test_bulk_edit_needs_change_permission(self):
+        client = Client.objects.create(company_name="Acme", year=2025)
+        form = {'edit-operation': 'persons', 'edit-first_allocated_person': 'ANN', 'apply': '1'}
+        self._post_action(self.viewer, 'bulk_edit', [client], **form)
+        client.refresh_from_db()
+        self.assertNotEqual(client.first_allocated_person, 'ANN')
+        self._post_action(self.admin, 'bulk_edit', [client], **form)
+        client.refresh_from_db()
+        self.assertEqual(client.first_allocated_person, 'ANN')
+
+    def test_bulk_edit_confirmation_posts_back_the_selection(self):
+        clients = [Client.objects.create(company_name=f"Acme {i}", year=2025) for i in range(3)]
+        page = self._post_action(self.admin, 'bulk_edit', clients[:1], select_across='1', index='0')
+        form = dict(re.findall(r'<input type="hidden" name="([^"]+)" value="([^"]*)"', page.content.decode()))
+        form.update({'edit-operation': 'persons', 'edit-review_person': 'BOB', 'apply': '1'})
+        form.pop('csrfmiddlewaretoken', None)
+        self.client.post(reverse('admin:core_client_changelist'), form)
+        self.assertEqual(Client.objects.filter(review_person='BOB').count(), 3)
+
+    def test_rollover_copies_each_selected_client_once(self):
+        acme = Client.objects.create(company_name="Acme", account_no="1", year=2025)
+        Client.objects.create(company_name="Beta", account_no="2", year=2026)
+        # "Select all" on the unfiltered changelist: the copies made into 2026 match it too
+        self._post_action(self.admin, 'rollover_to_next_year', [acme], select_across='1', index='0')
+        self.assertEqual(set(Client.objects.filter(year=2026).values_list('company_name', flat=True)), {'Acme', 'Beta'})
+        self.assertEqual(list(Client.objects.filter(year=2027).values_list('company_name', flat=True)), ['Beta'])
+
+    def test_rollover_needs_add_permission(self):
+        client = Client.objects.create(company_name="Acme", year=2025)
+        self._post_action(self.viewer, 'rollover_to_next_year', [client])
+        self.assertFalse(Client.objects.filter(year=2026).exists())
+
+    def test_merge_lists_the_groups_before_merging(self):
+        clients = [Client.objects.create(company_name=f"Acme {i}", year=2025) for i in range(3)]
+        response = self._post_action(self.admin, 'merge_duplicates', clients)
+        self.assertTemplateUsed(response, 'admin/core/client/merge_duplicates.html')
+        self.assertEqual(response.context['merged_count'], 2)
+        self.assertEqual(Client.objects.count(), 3)
+        self._post_action(self.admin, 'merge_duplicates', clients, post='yes')
+        self.assertEqual(list(Client.objects.values_list('pk', flat=True)), [clients[0].pk])
+
+    def test_merge_across_the_changelist_needs_its_own_confirmation(self):
+        clients = [Client.objects.create(company_name=f"Acme {i}", year=2025) for i in range(3)]
+        self._post_action(self.admin, 'merge_duplicates', clients[:1], select_across='1', post='yes')
+        self.assertEqual(Client.objects.count(), 3)
+        self._post_action(self.admin, 'merge_duplicates', clients[:1], select_across='1', post='yes',
+                          confirm_select_across='yes')
+        self.assertEqual(Client.objects.count(), 1)
+
+    def test_merge_needs_change_and_delete_permissions(self):
+        clients = [Client.objects.create(company_name=f"Acme {i}", year=2025) for i in range(2)]
+        self.viewer.user_permissions.add(Permission.objects.get(codename='change_client'))
+        self._post_action(self.viewer, 'merge_duplicates', clients, post='yes')
+        self.assertEqual(Client.objects.count(), 2)
+
+    def test_find_duplicates_merge_is_all_or_nothing(self):
+        for name, account_no in [("SILVER PEAK LOGISTICS LLC", "111"), ("SILVER PEAK LOGISTIC LLC", "111"),
+                                 ("GOLDEN HARBOR FOODS INC", "222"), ("GOLDEN HARBOUR FOODS INC", "222")]:
+            Client.objects.create(company_name=name, account_no=account_no, year=2025)
+        calls = []
+
+        def merge_then_fail(clients):
+            calls.append(clients)
+            if len(calls) > 1:
+                raise ValueError("Only clients of the same year can be merged.")
+            return merge_clients(clients)
+
+        with mock.patch('core.management.commands.find_duplicates.merge_clients', side_effect=merge_then_fail):
+            with self.assertRaises(CommandError):
+                call_command('find_duplicates', '--merge', stdout=io.StringIO())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Client.objects.count(), 4)
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica', REPLICA_ROUTED_APPS=['core'])
+class ReplicaRoutingTests(TestCase):
+    """
+    PrimaryReplicaRouter decisions with a 'replica' alias mirroring the test
+    database (manage.py check_replica_routing probes a real replica).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        mirror = {**connections[PRIMARY].settings_dict, 'TEST': {'MIRROR': PRIMARY}}
+        # settings.DATABASES is the connection handler's own dict, so this also makes connections['replica']
+        cls.enterClassContext(mock.patch.dict(settings.DATABASES, {'replica': mirror}))
+        cls.addClassCleanup(cls._drop_replica_connection)
+
+    @classmethod
+    def _drop_replica_connection(cls):
+        if hasattr(connections._connections, 'replica'):
+            connections['replica'].close()
+            del connections['replica']
+
+    def setUp(self):
+        lag_monitor.reset()
+        self.addCleanup(lag_monitor.reset)
+
+    def _read_db(self, model=Client):
+        return router.db_for_read(model)
+
+    def test_only_use_replica_reads_use_the_replica(self):
+        self.assertEqual(self._read_db(), PRIMARY)
+        with replica_reads():
+            self.assertEqual(self._read_db(), 'replica')
+            self.assertEqual(Client.objects.all().db, 'replica')
+            self.assertEqual(self._read_db(User), PRIMARY)  # auth is not in REPLICA_ROUTED_APPS
+        self.assertEqual(use_replica(self._read_db)(), 'replica')
+        self.assertEqual(self._read_db(), PRIMARY)
+        self.assertEqual(router.db_for_write(Client), PRIMARY)
+
+    def test_primary_reads_use_the_primary(self):
+        with replica_reads(), primary_reads():
+            self.assertEqual(self._read_db(), PRIMARY)
+
+    def test_reads_after_a_write_in_the_request_use_the_primary(self):
+        with tracking_writes() as state, replica_reads():
+            self.assertEqual(self._read_db(), 'replica')
+            Client.objects.create(company_name="Acme", year=2025)
+            self.assertTrue(state['wrote'])
+            self.assertEqual(self._read_db(), PRIMARY)
+
+    def test_primary_pin_cookie_pins_reads_to_the_primary(self):
+        seen = []
+
+        @use_replica
+        def view(request):
+            seen.append(self._read_db())
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+        self.assertNotIn('primary_pin', middleware(factory.get('/')).cookies)
+        self.assertIn('primary_pin', middleware(factory.post('/')).cookies)
+        pinned = factory.get('/')
+        pinned.COOKIES['primary_pin'] = '1'
+        middleware(pinned)
+        self.assertEqual(seen, ['replica', 'replica', PRIMARY])
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        with replica_reads():
+            with mock.patch.object(lag_monitor, 'lag_seconds', return_value=60.0):
+                self.assertEqual(self._read_db(), PRIMARY)
+            lag_monitor.reset()
+            with mock.patch.object(lag_monitor, 'lag_seconds', side_effect=DatabaseError("connection refused")):
+                self.assertEqual(self._read_db(), PRIMARY)
+            lag_monitor.reset()
+            self.assertEqual(self._read_db(), 'replica')
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jobs', 'jobs@example.com', 'pw')
+
+    def setUp(self):
+        files_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, files_dir, ignore_errors=True)
+        self.enterContext(override_settings(JOB_FILES_DIR=files_dir))
+
+    def _running_job(self, started_ago, heartbeat_ago):
+        now = timezone.now()
+        return Job.objects.create(
+            kind='export_clients', status=Job.STATUS_RUNNING, started_at=now - timedelta(seconds=started_ago),
+            heartbeat_at=now - timedelta(seconds=heartbeat_ago) if heartbeat_ago is not None else None)
+
+    def test_only_jobs_with_a_stopped_heartbeat_are_requeued(self):
+        alive = self._running_job(started_ago=7200, heartbeat_ago=10)
+        dead = self._running_job(started_ago=7200, heartbeat_ago=600)
+        legacy = self._running_job(started_ago=7200, heartbeat_ago=None)
+        with override_settings(JOB_STALE_SECONDS=300):
+            self.assertEqual(requeue_stale_jobs(), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[alive.pk], Job.STATUS_RUNNING)
+        self.assertEqual(statuses[dead.pk], Job.STATUS_QUEUED)
+        self.assertEqual(statuses[legacy.pk], Job.STATUS_QUEUED)
+
+    def test_progress_reports_refresh_the_heartbeat(self):
+        job = self._running_job(started_ago=7200, heartbeat_ago=600)
+        ProgressReporter(job)(5, 10, force=True)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 5)
+        self.assertGreater(job.heartbeat_at, timezone.now() - timedelta(seconds=60))
+
+    def test_failed_import_removes_its_upload(self):
+        upload = SimpleUploadedFile('broken.xlsx', b'not a workbook')
+        enqueue_job('import_clients', params={'filename': 'broken.xlsx'}, user=self.user, uploaded_file=upload)
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertFalse(os.path.exists(job.input_file))
+
+    def test_export_files_expire(self):
+        Client.objects.create(company_name="ACME", year=2025)
+        enqueue_job('export_clients', params={'format': 'csv'}, user=self.user)
+        job = run_job(claim_next_job())
+        self.assertTrue(os.path.exists(job.result_file))
+        self.assertEqual(expire_job_files(max_age_seconds=3600), 0)
+        Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(expire_job_files(max_age_seconds=3600), 1)
+        self.assertFalse(os.path.exists(job.result_file))
+        job.refresh_from_db()
+        self.assertEqual(job.result_file, '')
+
+    def test_background_export_needs_a_post(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_excel', args=['csv']), {'background': '1'})
+        consume_response(response)
+        self.assertFalse(Job.objects.exists())
+        response = self.client.post(reverse('export_excel', args=['csv']))
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('job_detail', args=[job.pk]))
+
+
+IMPORT_HEADER = ['Company Name', 'Account No', 'Year', 'Email', 'First Allocated Person', 'Months']
+IMPORT_ROWS = [
+    ['acme llc', '111', '2025', 'a@acme.com; b@acme.com', 'ann', 'January (ANN), March'],
+    ['', '222', '2025', '', '', ''],                      # row 3: no company name
+    ['beta inc', '333', 'soon', '', '', ''],              # row 4: bad year
+    ['gamma co', '444', '2025', 'not-an-email', '', ''],  # row 5: bad email
+    ['delta llp', '555', '2025', '', '', 'Smarch'],       # row 6: bad month
+    ['echo ltd', '', '', '', '', ''],
+]
+
+
+def sheet_upload(name, rows, header=IMPORT_HEADER):
+    """An uploaded .csv or .xlsx with ``header`` and ``rows``."""
+    if name.endswith('.csv'):
+        text = io.StringIO()
+        csv.writer(text).writerows([header, *rows])
+        return SimpleUploadedFile(name, text.getvalue().encode())
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(header)
+    for row in rows:
+        workbook.active.append([value if value != '' else None for value in row])
+    body = io.BytesIO()
+    workbook.save(body)
+    return SimpleUploadedFile(name, body.getvalue())
+
+
+class ImportClientsTests(TestCase):
+    def setUp(self):
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+        self.enterContext(override_settings(IMPORT_REPORT_DIR=report_dir))
+
+    def test_valid_rows_are_created_and_bad_rows_reported(self):
+        for name in ('clients.csv', 'clients.xlsx'):
+            with self.subTest(name=name):
+                Client.objects.all().delete()
+                result = import_clients(sheet_upload(name, IMPORT_ROWS))
+                self.assertEqual((result.total, result.created, result.rejected), (6, 2, 4))
+
+                acme = Client.objects.get(company_name='ACME LLC')
+                self.assertEqual(acme.account_no, '111')
+                self.assertEqual(acme.first_allocated_person, 'ANN')
+                self.assertEqual(acme.email, ['a@acme.com', 'b@acme.com'])
+                self.assertEqual(acme.months, {'1': 'ANN', '3': 'ANN'})
+                self.assertEqual(sorted(acme.month_assignments.values_list('month', flat=True)), [1, 3])
+                echo = Client.objects.get(company_name='ECHO LTD')
+                self.assertEqual((echo.account_no, echo.year, echo.email, echo.months), (None, 2025, [], {}))
+
+                with open(error_report_path(result.report_token), newline='', encoding='utf-8') as report:
+                    errors = {int(row['row']): row['errors'] for row in csv.DictReader(report)}
+                self.assertEqual(sorted(errors), [3, 4, 5, 6])
+                self.assertIn("company_name is required", errors[3])
+                self.assertIn("year is not a number", errors[4])
+                self.assertIn("invalid email address", errors[5])
+                self.assertIn("invalid months", errors[6])
+
+    def test_missing_required_column_is_refused(self):
+        with self.assertRaisesMessage(ImportFileError, "Missing columns"):
+            import_clients(sheet_upload('clients.csv', [['A']], header=['Group']))
+        self.assertFalse(Client.objects.exists())
+
+    def test_dry_run_writes_nothing(self):
+        result = import_clients(sheet_upload('clients.csv', IMPORT_ROWS), dry_run=True)
+        self.assertEqual((result.created, result.rejected), (2, 4))
+        self.assertFalse(Client.objects.exists())
+
+    def test_merge_is_idempotent_and_updates_only_changed_fields(self):
+        rows = [['acme llc', '111', '2025', '', 'ann', 'January'], ['beta inc', '333', '2025', '', 'bob', '']]
+        first = import_clients(sheet_upload('clients.csv', rows), mode=IMPORT_MODE_MERGE)
+        self.assertEqual((first.created, first.updated, first.unchanged), (2, 0, 0))
+        again = import_clients(sheet_upload('clients.csv', rows), mode=IMPORT_MODE_MERGE)
+        self.assertEqual((again.created, again.updated, again.unchanged), (0, 0, 2))
+        self.assertEqual(Client.objects.count(), 2)
+
+        rows[1][4] = 'cat'
+        changed = import_clients(sheet_upload('clients.csv', rows), mode=IMPORT_MODE_MERGE)
+        self.assertEqual((changed.created, changed.updated, changed.unchanged), (0, 1, 1))
+        self.assertEqual(changed.summary['field_changes'], {'first_allocated_person': 1})
+        self.assertEqual(Client.objects.get(company_name='BETA INC').first_allocated_person, 'CAT')
+
+    def test_merge_reports_clients_missing_from_the_sheet(self):
+        Client.objects.create(company_name='OLD CO', account_no='999', year=2025)
+        rows = [['acme llc', '111', '2025', '', '', '']]
+        result = import_clients(sheet_upload('clients.csv', rows), mode=IMPORT_MODE_MERGE, report_missing=True)
+        self.assertEqual((result.created, result.missing), (1, 1))
+        with open(error_report_path(result.missing_token), newline='', encoding='utf-8') as report:
+            self.assertEqual([row['company_name'] for row in csv.DictReader(report)], ['OLD CO'])
+
+
+class ExportRoundTripTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.full = Client.objects.create(
+            company_name="ACME & SONS", group="G1", account_no="111", bank_name="HSBC",
+            email=['a@acme.com', 'b@acme.com'], first_allocated_person="ANN", review_person="BOB",
+            year=2025, months={'1': 'ANN', '3': 'BOB'}, remark=" <tab>\there ",
+        )
+        cls.empty = Client.objects.create(company_name="BARE", year=2024)
+
+    def expected_rows(self):
+        return [
+            ["ACME & SONS", "G1", "111", "ANN", "BOB", 2025, "January (ANN), March (BOB)", " <tab>\there ",
+             "a@acme.com, b@acme.com", "HSBC"],
+            ["BARE", None, None, None, None, 2024, None, None, None, None],
+        ]
+
+    def export(self, list_type):
+        export_format = get_export_format(list_type)
+        return b''.join(export_format.stream(Client.objects.all()))
+
+    def test_xlsx_opens_in_openpyxl_with_the_database_rows(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(io.BytesIO(self.export('xlsx')), read_only=True)
+        # read-only mode drops trailing empty cells, so pad rows back to the header width
+        rows = [list(row) + [None] * (10 - len(row)) for row in workbook.active.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], ["Company Name", "Group", "Account No", "First Allocated Person",
+                                   "Review Person", "Year", "Months", "Remark", "Email", "Bank Name"])
+        self.assertEqual(rows[1:], self.expected_rows())
+
+    def test_xlsx_is_streamed_in_several_chunks(self):
+        from core.exporters import iter_client_rows, stream_xlsx
+
+        # random names so the sheet does not compress down to a single deflate block
+        Client.objects.bulk_create(Client(company_name=os.urandom(16).hex(), year=2025) for _ in range(1000))
+        chunks = list(stream_xlsx(iter_client_rows(), flush_size=4096))
+        self.assertGreater(len(chunks), 2)
+
+        from openpyxl import load_workbook
+        sheet = load_workbook(io.BytesIO(b''.join(chunks)), read_only=True).active
+        self.assertEqual(sum(1 for _ in sheet.iter_rows()), 1003)
+
+    def test_csv_matches_the_database_rows(self):
+        body = self.export('csv').decode('utf-8')
+        self.assertTrue(body.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(body[1:])))
+        self.assertEqual(rows[0][0], "Company Name")
+        expected = [['' if value is None else str(value) for value in row] for row in self.expected_rows()]
+        self.assertEqual(rows[1:], expected)
+
+    def test_ndjson_keeps_email_and_months_structure(self):
+        records = [json.loads(line) for line in self.export('ndjson').decode('utf-8').splitlines()]
+        self.assertEqual(records, [
+            {'id': self.full.id, 'company_name': "ACME & SONS", 'group': "G1", 'account_no': "111",
+             'first_allocated_person': "ANN", 'review_person': "BOB", 'year': 2025,
+             'months': {'1': 'ANN', '3': 'BOB'}, 'remark': " <tab>\there ",
+             'email': ['a@acme.com', 'b@acme.com'], 'bank_name': "HSBC"},
+            {'id': self.empty.id, 'company_name': "BARE", 'group': None, 'account_no': None,
+             'first_allocated_person': None, 'review_person': None, 'year': 2024,
+             'months': {}, 'remark': None, 'email': [], 'bank_name': None},
+        ])
+
+    def test_unknown_list_type_falls_back_to_xlsx(self):
+        self.assertEqual(get_export_format('client').extension, 'xlsx')
+        self.assertEqual(get_export_format(None).extension, 'xlsx')
+
+
+class ColumnarRoundTripTests(TestCase):
+    def setUp(self):
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+        self.enterContext(override_settings(IMPORT_REPORT_DIR=report_dir))
+        Client.objects.create(
+            company_name="ACME", group="G1", account_no="111", bank_name="HSBC",
+            email=['a@acme.com', 'b@acme.com'], first_allocated_person="ANN", review_person="BOB",
+            year=2025, months={'1': 'ANN', '12': 'BOB'}, remark="FIRST",
+        )
+        Client.objects.create(company_name="BARE", year=2024)
+
+    def snapshot(self):
+        return list(Client.objects.order_by('company_name').values(
+            'company_name', 'group', 'account_no', 'bank_name', 'email', 'first_allocated_person',
+            'review_person', 'year', 'months', 'remark'))
+
+    def test_export_then_import_restores_the_clients(self):
+        for kind in ('parquet', 'arrow'):
+            with self.subTest(kind=kind):
+                before = self.snapshot()
+                body = b''.join(get_export_format(kind).stream(Client.objects.all()))
+                Client.objects.all().delete()
+
+                result = import_clients(SimpleUploadedFile(f'clients.{kind}', body), batch_size=1)
+                self.assertEqual((result.total, result.created, result.rejected), (2, 2, 0))
+                self.assertEqual(self.snapshot(), before)
+                acme = Client.objects.get(company_name="ACME")
+                self.assertEqual(sorted(acme.month_assignments.values_list('month', 'person')),
+                                 [(1, 'ANN'), (12, 'BOB')])
+
+                again = import_clients(SimpleUploadedFile(f'clients.{kind}', body), mode=IMPORT_MODE_MERGE)
+                self.assertEqual((again.created, again.updated, again.unchanged), (0, 0, 2))
+
+    def test_bad_records_are_reported_with_spreadsheet_row_numbers(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            'company_name': ['good co', None, 'bad mail'],
+            'year': pa.array([2025, 2025, 2025], pa.int32()),
+            'email': [['x@good.com'], None, ['nope']],
+        })
+        body = io.BytesIO()
+        pq.write_table(table, body)
+        result = import_clients(SimpleUploadedFile('clients.parquet', body.getvalue()))
+
+        self.assertEqual((result.created, result.rejected), (1, 2))
+        self.assertEqual(Client.objects.get(company_name="GOOD CO").email, ['x@good.com'])
+        with open(error_report_path(result.report_token), newline='', encoding='utf-8') as report:
+            errors = {int(row['row']): row['errors'] for row in csv.DictReader(report)}
+        self.assertEqual(sorted(errors), [3, 4])
+        self.assertIn("company_name is required", errors[3])
+        self.assertIn("invalid email address", errors[4])
+
+
+class RateLimitTests(TestCase):
+    # The first window starts exactly at START, so the window fractions are easy to follow
+    LIMIT, WINDOW, START = 3, 60, 6000.0
+
+    def hit(self, offset, key='login:ip:1.2.3.4'):
+        return ratelimit.hit(key, self.LIMIT, self.WINDOW, now=self.START + offset)
+
+    def test_attempts_up_to_the_limit_are_allowed(self):
+        results = [self.hit(offset) for offset in (0, 1, 2)]
+        self.assertTrue(all(result.allowed for result in results))
+        self.assertEqual([result.estimate for result in results], [1, 2, 3])
+        self.assertEqual(RateLimitBucket.objects.get().count, 3)
+
+    def test_attempt_over_the_limit_is_denied_until_the_window_ends(self):
+        for offset in (0, 1, 2):
+            self.hit(offset)
+        denied = self.hit(20)
+        self.assertFalse(denied.allowed)
+        self.assertEqual(denied.retry_after, 40)
+        self.assertTrue(self.hit(0, key='login:ip:5.6.7.8').allowed)
+
+    def test_previous_window_weight_decays_after_rollover(self):
+        for offset in (0, 1, 2, 3):
+            self.hit(offset)
+        # 1s into the next window: 4 * 59/60 + 1 is still over the limit
+        early = self.hit(61)
+        self.assertFalse(early.allowed)
+        self.assertEqual(early.retry_after, 29)
+        # 45s in: 4 * 0.25 + 2 = 3 is back within the limit
+        self.assertTrue(self.hit(105).allowed)
+        # two windows on, neither earlier window counts any more
+        late = self.hit(180)
+        self.assertTrue(late.allowed)
+        self.assertEqual(late.estimate, 1)
+
+    @override_settings(RATE_LIMITS={'login': (10, 300)})
+    def test_job_worker_maintenance_prunes_old_buckets(self):
+        now = int(timezone.now().timestamp())
+        RateLimitBucket.objects.create(key='old', window_start=now - 3600, count=5)
+        RateLimitBucket.objects.create(key='recent', window_start=now - 300, count=5)
+
+        RunJobsCommand(stdout=io.StringIO(), stderr=io.StringIO())._maintain()
+
+        self.assertEqual(list(RateLimitBucket.objects.values_list('key', flat=True)), ['recent'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ClientsApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', 'api@example.com', 'pw')
+        cls.acme = Client.objects.create(company_name="ACME", year=2025, email=['a@acme.com'])
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def get(self, **headers):
+        return self.client.get(reverse('api_clients'), {'fields': 'id,company_name'}, headers=headers)
+
+    def test_matching_if_none_match_returns_304_without_querying(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['results'], [{'id': self.acme.id, 'company_name': "ACME"}])
+
+        with self.assertNumQueries(2):  # session and user only; the page is not read
+            again = self.get(if_none_match=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_client_write_changes_the_etag(self):
+        before = self.get()['ETag']
+        self.acme.company_name = "ACME LTD"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.acme.save()
+
+        after = self.get(if_none_match=before)
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before)
+        self.assertEqual(after.json()['results'][0]['company_name'], "ACME LTD")
+
+    def test_etag_depends_on_the_query(self):
+        self.assertNotEqual(self.get()['ETag'], self.client.get(reverse('api_clients'))['ETag'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('api_clients'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown field(s): password", response.json()['fields'])
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertIn(self.get().status_code, (401, 403))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SuggestIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('suggest', 'suggest@example.com', 'pw')
+        cls.acme = Client.objects.create(company_name="ACME  Corp", account_no="A-1", year=2024)
+        Client.objects.create(company_name="ACME  Corp", account_no="A-1", year=2025)
+        Client.objects.create(company_name="Acme Ltd", account_no="A-2", year=2025)
+        Client.objects.create(company_name="Beta", account_no="ACM-9", year=2025)
+
+    def setUp(self):
+        caches['default'].clear()
+        # A fresh index per test; the signal handlers update whatever suggest_index.index is
+        self.enterContext(mock.patch.object(suggest_index, 'index', PrefixIndex()))
+
+    def names(self, prefix, **kwargs):
+        return [result['company_name'] for result in suggest_index.suggest(prefix, **kwargs)]
+
+    def test_prefix_lookup_matches_names_and_account_numbers(self):
+        with self.assertNumQueries(1):  # the build; lookups never touch the database
+            self.assertEqual(self.names("acme c"), ["ACME  Corp"])
+            # key order: "acm-9" sorts before "acme corp"; the two ACME years are suggested once
+            self.assertEqual(self.names("ac"), ["Beta", "ACME  Corp", "Acme Ltd"])
+            self.assertEqual(self.names("AC", limit=2), ["Beta", "ACME  Corp"])
+            self.assertEqual(self.names("zzz"), [])
+            self.assertEqual(self.names("  "), [])
+        beta = suggest_index.suggest("acm-")[0]
+        self.assertEqual((beta['account_no'], beta['match']), ("ACM-9", 'account_no'))
+
+    def test_save_updates_the_index_without_a_rebuild(self):
+        self.names("a")
+        with mock.patch.object(PrefixIndex, 'build') as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                Client.objects.create(company_name="Acorn", account_no="A-3", year=2025)
+            self.acme.company_name = "Zeta"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.acme.save()
+            self.assertEqual(self.names("acor"), ["Acorn"])
+            self.assertEqual(self.names("zet"), ["Zeta"])
+        build.assert_not_called()
+        self.assertEqual(suggest_index.index.version, client_cache.version())
+
+    def test_delete_removes_the_client(self):
+        self.names("a")
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.filter(company_name="Beta").delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names("acm"), ["ACME  Corp", "Acme Ltd"])
+
+    def test_rebuilds_once_another_process_bumps_the_version(self):
+        self.names("a")
+        # Another process: a bulk write that sends no signals, then its version bump
+        Client.objects.bulk_create([Client(company_name="Acorn", year=2025)])
+        client_cache.invalidate()
+
+        with override_settings(SUGGEST_INDEX_REBUILD_SECONDS=3600):
+            self.assertEqual(self.names("acor"), [])  # rebuilt at most once per interval
+        with override_settings(SUGGEST_INDEX_REBUILD_SECONDS=0):
+            self.assertEqual(self.names("acor"), ["Acorn"])
+        self.assertEqual(suggest_index.index.version, client_cache.version())
+
+    def test_endpoint_returns_suggestions(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_suggest'), {'q': 'acme l', 'limit': 'x'})
+        self.assertEqual(response.json()['results'][0]['company_name'], "Acme Ltd")
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DidYouMeanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('fuzzy', 'fuzzy@example.com', 'pw')
+        Client.objects.bulk_create([
+            Client(company_name="ACME CORPORATION", year=2024),
+            Client(company_name="ACME CORPORATION", year=2025),
+            Client(company_name="ZENITH HOLDINGS", year=2025),
+            Client(company_name="NORTHWIND TRADERS", year=2025),
+        ])
+
+    def setUp(self):
+        caches['default'].clear()
+        self.enterContext(mock.patch.object(fuzzy_index, 'index', None))
+        self.client.force_login(self.user)
+
+    def names(self, term, shown=None):
+        return [match.company_name for match in did_you_mean(term, shown=shown)]
+
+    def test_typos_and_reordered_words_are_suggested(self):
+        self.assertEqual(self.names("acme corporaton"), ["ACME CORPORATION"])
+        self.assertEqual(self.names("Holdings, Zenth"), ["ZENITH HOLDINGS"])
+        self.assertEqual(self.names("northwind"), ["NORTHWIND TRADERS"])
+
+    def test_no_close_name_gives_no_suggestions(self):
+        self.assertEqual(self.names("qwxyz plumbing"), [])
+        self.assertEqual(self.names("!!"), [])
+
+    def test_the_shown_company_is_not_suggested(self):
+        acme = Client.objects.filter(company_name="ACME CORPORATION").first()
+        self.assertEqual(self.names("acme corporation", shown=acme), [])
+        self.assertNotIn("ACME CORPORATION", self.names("acme corp", shown=acme))
+
+    def test_search_details_lists_the_suggestions(self):
+        response = self.client.get(reverse('search_details'), {'search': 'zenth holdngs'})
+        self.assertEqual([match.company_name for match in response.context['did_you_mean']], ["ZENITH HOLDINGS"])
+        self.assertContains(response, "Did you mean")
+        self.assertContains(response, "?search=ZENITH%20HOLDINGS")
+
+        response = self.client.get(reverse('search_details'), {'search': 'qwxyz'})
+        self.assertEqual(response.context['did_you_mean'], [])
+        self.assertNotContains(response, "Did you mean")
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RequestMetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('metrics', 'metrics@example.com', 'pw')
+        cls.admin = User.objects.create_superuser('metrics-admin', 'admin@example.com', 'pw')
+        Client.objects.bulk_create([Client(company_name=f"CO {i}", year=2025) for i in range(3)])
+
+    def setUp(self):
+        caches['default'].clear()
+        metrics_store.clear()
+        self.addCleanup(metrics_store.clear)
+        self.payloads = []
+
+        def record(*args, **kwargs):
+            self.payloads.append(record_request(*args, **kwargs))
+            return self.payloads[-1]
+        self.enterContext(mock.patch('core.middleware.record_request', side_effect=record))
+
+    def payload(self):
+        self.assertEqual(len(self.payloads), 1)
+        return self.payloads[0]
+
+    def test_server_timing_header_splits_the_request(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_clients'))
+        names = [part.split(';')[0].strip() for part in response['Server-Timing'].split(',')]
+        self.assertEqual(names, ['db', 'tpl', 'view', 'total'])
+
+    def test_query_count_matches_the_queries_run(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_clients'))
+        # session, user and the page itself
+        self.assertEqual(len(queries), 3)
+        payload = self.payload()
+        self.assertEqual((payload['view'], payload['queries'], payload['status']), ('api_clients', 3, 200))
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        self.assertEqual(payload['response_bytes'], len(response.content))
+        self.assertEqual(metrics_store.summary()[0]['requests'], 1)
+
+    def test_streamed_responses_are_sized_once_the_body_is_sent(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_excel', args=['csv']))
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.payloads, [])  # the export runs while the body is iterated
+
+        body = b''.join(response.streaming_content)
+        payload = self.payload()
+        self.assertEqual(payload['response_bytes'], len(body))
+        self.assertGreaterEqual(payload['queries'], 2)  # clients and their months, read while streaming
+
+    def test_profiling_is_refused_for_non_superusers(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_clients'), {'_profile': '1'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'function calls', response.content)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('api_clients'), {'_profile': '1'})
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'function calls', response.content)
+
+
+class AnalyticsReportTests(TestCase):
+    def test_null_and_empty_values_share_one_none_row(self):
+        Client.objects.create(company_name="A", year=2025, group=None, months={'1': 'ANN'})
+        Client.objects.create(company_name="B", year=2025, group='', months={'1': 'ANN', '2': 'BOB'})
+        Client.objects.create(company_name="C", year=2025, group='', review_person='')
+        Client.objects.create(company_name="D", year=2024, group='G1', review_person='BOB', months={'3': 'BOB'})
+
+        report = build_report()
+        self.assertEqual(
+            [(row['key'], row['clients'], row['months_completed']) for row in report['by_group']],
+            [('(none)', 3, 3), ('G1', 1, 1)],
+        )
+        self.assertEqual([(row['key'], row['clients']) for row in report['by_review_person']],
+                         [('(none)', 3), ('BOB', 1)])
+        self.assertEqual([(row['key'], row['clients']) for row in report['by_year']], [(2025, 3), (2024, 1)])
+        self.assertEqual([(row['person'], row['months_completed']) for row in report['completed_by_person']],
+                         [('ANN', 2), ('BOB', 2)])
+
+        self.assertEqual([row['key'] for row in build_report(year=2024)['by_group']], ['G1'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AsyncViewTests(TestCase):
+    """The /async/ views must answer exactly like their sync counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async', 'async@example.com', 'pw')
+        Client.objects.create(company_name="ACME CORPORATION", account_no="A-1", year=2025,
+                              months={'1': 'ANN', '3': 'BOB'})
+        Client.objects.create(company_name="ACME TRADING", year=2025, group="G1")
+        Client.objects.bulk_create([Client(company_name=f"BETA {i:02}", year=2024) for i in range(5)])
+
+    def setUp(self):
+        caches['default'].clear()
+        self.enterContext(mock.patch.object(fuzzy_index, 'index', None))
+
+    def summarize(self, name, context):
+        if name == 'client_list':
+            return {
+                'clients': [(c.pk, [(a.month, a.person) for a in c.month_assignments.all()])
+                            for c in context['clients']],
+                'total': context['total'],
+                'next': context['page'].next_cursor,
+            }
+        if name == 'search_details':
+            company = context['company']
+            return {
+                'company': company.pk if company else None,
+                'months': context['company_months'],
+                'did_you_mean': [match.company_name for match in context['did_you_mean']],
+            }
+        if name == 'search_company':
+            return [client.pk for client in context['results']]
+        return None
+
+    async def test_async_views_match_the_sync_views(self):
+        await self.client.aforce_login(self.user)
+        await self.async_client.aforce_login(self.user)
+        cases = [
+            ('dashboard', {}),
+            ('client_list', {}),
+            ('client_list', {'page_size': 3}),
+            ('client_list', {'search': 'acme'}),
+            ('search_details', {'search': 'acme corporation'}),
+            ('search_details', {'search': 'acme corporaton'}),
+            ('search_details', {'search': 'qwxyz'}),
+            ('search_company', {'q': 'beta'}),
+            ('search_company', {'q': 'nothing here'}),
+        ]
+        for name, params in cases:
+            with self.subTest(name=name, params=params):
+                sync = await sync_to_async(self.client.get)(reverse(name), params)
+                response = await self.async_client.get(reverse(f'{name}_async'), params)
+                self.assertEqual((response.status_code, sync.status_code), (200, 200))
+                self.assertEqual([t.name for t in response.templates], [t.name for t in sync.templates])
+                self.assertEqual(self.summarize(name, response.context), self.summarize(name, sync.context))
+
+    async def test_async_views_require_login(self):
+        response = await self.async_client.get(reverse('client_list_async'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f"{resolve_url(settings.LOGIN_URL)}?next=/async/client_list/")
+
+
+class SheetReaderTests(TestCase):
+    ROWS = [
+        ['alpha', '1', '2025', '', '', ''],
+        ['', '', '', '', '', ''],         # row 3: blank, skipped
+        ['beta', '2', '2025', '', '', ''],
+        ['gamma', '3'],                   # row 5: ragged, padded
+        ['delta', '4', '2025', 'bad', '', ''],
+        ['epsilon', '5', '2025', '', '', ''],
+    ]
+
+    def setUp(self):
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+        self.enterContext(override_settings(IMPORT_REPORT_DIR=report_dir))
+
+    def test_rows_are_read_in_batches_keeping_row_numbers(self):
+        for name in ('clients.csv', 'clients.xlsx'):
+            with self.subTest(name=name):
+                frames = list(SheetReader(sheet_upload(name, self.ROWS), batch_size=2).batches())
+                self.assertEqual([len(frame) for frame in frames], [2, 2, 1])
+                # index = spreadsheet row number - 2
+                self.assertEqual([list(frame.index) for frame in frames], [[0, 2], [3, 4], [5]])
+                self.assertEqual(list(frames[0].columns), IMPORT_HEADER)
+                gamma = frames[1].iloc[0]
+                self.assertEqual((gamma['Company Name'], gamma['Year']), ('gamma', None))
+
+    def test_csv_byte_order_mark_is_not_part_of_the_header(self):
+        upload = SimpleUploadedFile('clients.csv', '\ufeffCompany Name,Year\nacme,2025\n'.encode('utf-8'))
+        frame = next(SheetReader(upload).batches())
+        self.assertEqual(list(frame.columns), ['Company Name', 'Year'])
+
+    def test_header_only_and_empty_files(self):
+        frames = list(SheetReader(sheet_upload('clients.csv', [])).batches())
+        self.assertEqual((len(frames), len(frames[0])), (1, 0))
+        with self.assertRaisesMessage(ImportFileError, "The file is empty."):
+            list(SheetReader(SimpleUploadedFile('clients.csv', b'')).batches())
+
+    def test_rejected_rows_keep_their_row_numbers_across_batches(self):
+        result = import_clients(sheet_upload('clients.xlsx', self.ROWS), batch_size=2)
+        self.assertEqual((result.total, result.created, result.rejected), (5, 4, 1))
+        with open(error_report_path(result.report_token), newline='', encoding='utf-8') as report:
+            self.assertEqual([row['row'] for row in csv.DictReader(report)], ['6'])
+
+    def test_upload_size_limit_is_configurable(self):
+        self.client.force_login(User.objects.create_user('importer', 'importer@example.com', 'pw'))
+        with override_settings(IMPORT_MAX_UPLOAD_MB=0):
+            response = self.client.post(reverse('import_excel'),
+                                        {'excel_file': sheet_upload('clients.csv', self.ROWS)})
+        self.assertContains(response, "File size too large. Maximum size is 0MB")
+        self.assertFalse(Client.objects.exists())
+
+        response = self.client.post(reverse('import_excel'),
+                                    {'excel_file': sheet_upload('clients.csv', self.ROWS)})
+        self.assertContains(response, "Imported 4 clients. 1 rows were rejected")
+        self.assertEqual(Client.objects.count(), 4)
+
+
+class ColumnarFormatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('columnar', 'columnar@example.com', 'pw')
+        Client.objects.create(company_name="ACME", year=2025, email=['a@acme.com', 'b@acme.com'],
+                              months={'1': 'ANN', '12': 'BOB'})
+        Client.objects.bulk_create([Client(company_name=f"CO {i}", year=2024) for i in range(9)])
+
+    def test_parquet_export_has_typed_columns_and_row_groups(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with override_settings(EXPORT_CHUNK_SIZE=2, EXPORT_COLUMNAR_ROW_GROUP_SIZE=4):
+            chunks = list(get_export_format('parquet').stream(Client.objects.all()))
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(parquet.metadata.num_rows, 10)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)  # 4 + 4 + 2 rows
+        self.assertGreater(len(chunks), 3)
+
+        table = parquet.read()
+        self.assertEqual(table.schema.field('email').type, pa.list_(pa.string()))
+        self.assertTrue(pa.types.is_struct(table.schema.field('months').type))
+        acme = table.slice(0, 1).to_pylist()[0]
+        self.assertEqual(acme['email'], ['a@acme.com', 'b@acme.com'])
+        self.assertEqual({month: person for month, person in acme['months'].items() if person},
+                         {'january': 'ANN', 'december': 'BOB'})
+        self.assertEqual(table.slice(1, 1).to_pylist()[0]['email'], [])
+
+    def test_arrow_export_is_served_from_the_export_url(self):
+        import pyarrow as pa
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_excel', args=['arrow']))
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.file')
+        self.assertIn('client_list.arrow', response['Content-Disposition'])
+        table = pa.ipc.open_file(io.BytesIO(b''.join(response.streaming_content))).read_all()
+        self.assertEqual(table.num_rows, 10)
+
+    def test_map_months_and_plain_string_columns_are_imported(self):
+        import pyarrow as pa
+
+        # A file written by another tool: months as a map, every other column a string
+        table = pa.table({
+            'company_name': ['zeta'],
+            'year': ['2026'],
+            'email': pa.array([['z@zeta.com', None]], pa.list_(pa.string())),
+            'months': pa.array([[('march', 'ann'), ('may', None)]], pa.map_(pa.string(), pa.string())),
+        })
+        body = io.BytesIO()
+        with pa.ipc.new_file(body, table.schema) as writer:
+            writer.write_table(table)
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+        with override_settings(IMPORT_REPORT_DIR=report_dir):
+            result = import_clients(SimpleUploadedFile('zeta.feather', body.getvalue()))
+
+        self.assertEqual((result.created, result.rejected), (1, 0))
+        zeta = Client.objects.get(company_name="ZETA")
+        self.assertEqual((zeta.year, zeta.email), (2026, ['z@zeta.com']))
+        self.assertEqual(zeta.months, {'3': 'ann'})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ClientSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher', 'searcher@example.com', 'pw')
+        cls.clients = {
+            name: Client.objects.create(company_name=name, group=group, account_no=account_no, year=2025)
+            for name, group, account_no in [
+                ("GLOBEX", None, "GX-1"),
+                ("GLOBEX INDUSTRIES", "NORTH", None),
+                ("UNITED GLOBEX", None, None),
+                ("INITECH", "GLOBEX PARTNERS", None),
+                ("HOOLI", None, "77"),
+            ]
+        }
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def names(self, queryset):
+        return [client.company_name for client in queryset]
+
+    def test_tokens_drop_punctuation_and_case(self):
+        self.assertEqual(tokenize("Globex, Inc. (North)"), ['globex', 'inc', 'north'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_ranking_puts_exact_then_prefix_matches_first(self):
+        self.assertEqual(self.names(search_clients("globex")),
+                         ["GLOBEX", "GLOBEX INDUSTRIES", "INITECH", "UNITED GLOBEX"])
+        self.assertEqual(self.names(search_clients("77")), ["HOOLI"])
+        self.assertEqual(self.names(search_clients("  ")), [])
+
+    def test_every_token_must_match_unless_any_is_asked_for(self):
+        self.assertEqual(self.names(search_clients("globex north")), ["GLOBEX INDUSTRIES"])
+        self.assertEqual(sorted(self.names(filter_clients("hooli initech", match_all=False))), ["HOOLI", "INITECH"])
+        self.assertFalse(filter_clients("hooli initech").exists())
+
+    def test_exact_matches_ignore_case_and_surrounding_spaces(self):
+        self.assertEqual(self.names(exact_company_matches("  globex ")), ["GLOBEX"])
+
+    def test_backend_follows_the_setting_and_database(self):
+        expected = PostgresSearchBackend if connection.vendor == 'postgresql' else SimpleSearchBackend
+        self.assertIsInstance(get_search_backend(), expected)
+        with override_settings(CLIENT_SEARCH_BACKEND='simple'):
+            self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+
+    def test_views_use_the_search_service(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_details'), {'search': 'globex industries'})
+        self.assertEqual(response.context['company'], self.clients["GLOBEX INDUSTRIES"])
+        # An exact name wins outright; otherwise the ranked search answers
+        response = self.client.get(reverse('search_company'), {'q': 'globex'})
+        self.assertEqual(self.names(response.context['results']), ["GLOBEX"])
+        response = self.client.get(reverse('search_company'), {'q': 'glob'})
+        self.assertEqual(self.names(response.context['results'])[:2], ["GLOBEX", "GLOBEX INDUSTRIES"])
+        response = self.client.get(reverse('client_list'), {'search': 'hooli initech'})
+        self.assertEqual(sorted(self.names(response.context['clients'])), ["HOOLI", "INITECH"])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', 'viewer@example.com', 'pw')
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'pw')
+
+    def setUp(self):
+        caches['default'].clear()
+        metrics_store.clear()
+        self.addCleanup(metrics_store.clear)
+
+    def finished_metrics(self, queries=(), total_ms=5):
+        metrics = RequestMetrics()
+        for sql in queries:
+            metrics.queries += 1
+            metrics.statements[sql] += 1
+        metrics.started = 0.0
+        metrics.finished = total_ms / 1000
+        return metrics
+
+    def test_requests_are_logged_as_json_lines(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+        payload = json.loads(logs.records[-1].getMessage().removeprefix('request '))
+        self.assertEqual((payload['view'], payload['status'], payload['user']), ('dashboard', 200, self.user.pk))
+        self.assertEqual(payload['response_bytes'], len(response.content))
+        self.assertGreater(payload['template_ms'], 0)
+        self.assertEqual(payload['flags'], [])
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=100, REQUEST_METRICS_MAX_QUERIES=5,
+                       REQUEST_METRICS_DUPLICATE_QUERIES=3)
+    def test_slow_and_query_heavy_requests_are_flagged(self):
+        request = RequestFactory().get('/clients/')
+        response = HttpResponse(b'ok')
+        self.assertEqual(record_request(request, response, self.finished_metrics(total_ms=50))['flags'], [])
+
+        with self.assertLogs('core.metrics', 'WARNING'):
+            payload = record_request(request, response, self.finished_metrics(
+                queries=['SELECT a'] * 4 + ['SELECT b', 'SELECT c'], total_ms=150))
+        self.assertEqual(payload['flags'], ['slow', 'many_queries', 'n_plus_one'])
+        self.assertEqual((payload['queries'], payload['duplicate_queries']), (6, 4))
+
+    def test_store_keeps_a_rolling_window_per_view(self):
+        store = MetricsStore(window=3)
+        for total in (10, 20, 30, 400):
+            store.add('client_list', total, 1, 2, 3)
+        store.add('dashboard', 5, 0, 4, 1)
+        rows = store.summary()
+        self.assertEqual([row['view'] for row in rows], ['client_list', 'dashboard'])  # slowest p95 first
+        self.assertEqual((rows[0]['requests'], rows[0]['max_ms'], rows[0]['p50_ms']), (3, 400, 30))
+
+    def test_metrics_page_is_for_superusers_only(self):
+        self.client.force_login(self.user)
+        self.assertRedirects(self.client.get(reverse('request_metrics')), reverse('dashboard'),
+                             fetch_redirect_response=False)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('dashboard'))
+        data = self.client.get(reverse('request_metrics'), {'format': 'json'}).json()
+        self.assertIn('dashboard', [row['view'] for row in data['views']])
+        self.assertContains(self.client.get(reverse('request_metrics')), 'dashboard')
+
+        self.client.post(reverse('request_metrics'))
+        # only the reset request itself, recorded after the clear
+        self.assertEqual([row['view'] for row in metrics_store.summary()], ['request_metrics'])
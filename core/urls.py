@@ -1,10 +1,11 @@
 # client/urls.py
 from django.urls import path
-from . import views
+from . import views, async_views, api
 
 urlpatterns = [
     path('search_details/', views.search_details, name='search_details'),
     path('search_company/', views.search_company, name='search_company'), 
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('', views.login_view, name='login'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('users/', views.manage_users, name='manage_users'),
@@ -12,9 +13,23 @@ urlpatterns = [
     path('add/', views.client_add, name='client_add'),
     path('edit/<int:pk>/', views.client_update, name='client_update'),
     path('delete/<int:pk>/', views.client_delete_select, name='client_delete_select'),
+    path('bulk_edit/', views.bulk_edit, name='bulk_edit'),
     path('signup/', views.signup_view, name='signup'),
     path('import_excel/', views.import_excel, name='import_excel'),
+    path('import_excel/errors/<str:token>/', views.import_error_report, name='import_error_report'),
     path('export_excel/<str:list_type>/', views.export_excel, name='export_excel'),
+    path('analytics/', views.analytics, name='analytics'),
+    path('analytics/api/', views.analytics_api, name='analytics_api'),
+    path('metrics/', views.request_metrics, name='request_metrics'),
+    path('api/clients/', api.clients, name='api_clients'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    # Async (ASGI) versions of the read-only views
+    path('async/dashboard/', async_views.dashboard, name='dashboard_async'),
+    path('async/client_list/', async_views.client_list, name='client_list_async'),
+    path('async/search_details/', async_views.search_details, name='search_details_async'),
+    path('async/search_company/', async_views.search_company, name='search_company_async'),
     path('logout/', views.user_logout, name='logout'),
     path('forgot-password/', views.forgot_password, name='forgot_password'),
     path('password-reset/<uidb64>/<token>/', views.password_reset_confirm, name='password_reset_confirm'),
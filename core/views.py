@@ -3,27 +3,41 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Q
-from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse, FileResponse, Http404, JsonResponse
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.template.loader import render_to_string
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
-from django.core.cache import cache
 from django.conf import settings
-from django.utils import timezone
 import logging
 import ast
 import random
 import os
 from datetime import timedelta
-import pandas as pd
-import openpyxl
-from core.models import Client, SignupOTP
-from core.forms import ClientForm
+from django.utils import timezone
+from core.models import Client, ClientMonthAssignment, SignupOTP, Job
+from core.forms import ClientForm, BulkSelectionForm, BulkEditForm
+from core.pagination import paginate_keyset, get_page_size, count_for_listing
+from core.search import filter_clients, search_clients, exact_company_matches
+from core.exporters import get_export_format
+from core.importers import (
+    import_clients, error_report_path, ImportFileError, IMPORT_MODES, IMPORT_MODE_APPEND, IMPORT_MODE_MERGE,
+    COLUMNAR_EXTENSIONS,
+)
+from core.jobs import enqueue_job
+from core.assignments import months_by_client
+from core.analytics import get_report, available_years
+from core.metrics import store as metrics_store
+from core.caching import client_cache, normalize_term
+from core.ratelimit import rate_limit
+from core.mail import queue_mail
+from core.bulk import select_clients, apply_operation
+from core.suggest import suggest_index
+from core.fuzzy import did_you_mean
+from msystem.db_routers import use_replica
 
 logger = logging.getLogger(__name__)
 
@@ -86,23 +100,7 @@ def setup_deployment(request):
     return render(request, 'core/setup_deployment.html')
 
 
-def _throttle(request, name: str, limit: int, window_seconds: int) -> bool:
-    """
-    Simple per-IP throttle using Django cache.
-    Returns True if the caller exceeded the limit within the window.
-    """
-    ip = request.META.get("REMOTE_ADDR", "")
-    key = f"throttle:{name}:{ip}"
-    now = timezone.now().timestamp()
-    data = cache.get(key, {"count": 0, "start": now})
-    # reset window if expired
-    if now - data.get("start", now) > window_seconds:
-        data = {"count": 0, "start": now}
-    data["count"] += 1
-    cache.set(key, data, timeout=window_seconds)
-    return data["count"] > limit
-
-
+@rate_limit('forgot_password', keys=('ip', 'post:email'))
 def forgot_password(request):
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
@@ -129,27 +127,22 @@ def forgot_password(request):
                 'user': user,
                 'reset_link': reset_link,
             })
-            # Send email using configured email backend (SendGrid or SMTP)
-            send_mail(
+            # Queued in the outbox; `manage.py send_queued_mail` delivers it (SendGrid or SMTP)
+            queue_mail(
                 subject=subject,
                 message=message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[email],
                 html_message=message,
-                fail_silently=False,
+                # The link stops working after PASSWORD_RESET_TIMEOUT
+                expires_at=timezone.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT),
             )
-            logger.info(f"Password reset email sent successfully to {email}")
             messages.success(request, "Password reset email sent! Please check your inbox.")
             return redirect('login')
         except Exception as e:
-            logger.error(f"Failed to send password reset email: {e}")
-            error_msg = str(e)
-            if "Authentication Required" in error_msg or "gsmtp" in error_msg:
-                messages.error(
-                    request, "Email service not configured. Please contact administrator.")
-            else:
-                messages.error(
-                    request, f"Could not send password reset email. Error: {error_msg}")
+            logger.error(f"Failed to queue password reset email: {e}")
+            messages.error(
+                request, f"Could not send password reset email. Error: {str(e)}")
             return render(request, 'core/forgot_password.html')
     
     return render(request, 'core/forgot_password.html')
@@ -180,6 +173,7 @@ def password_reset_confirm(request, uidb64, token):
         return redirect('login')
 
 
+@rate_limit('signup', keys=('ip', 'post:email'))
 def signup_view(request):
     """
     Two-step signup with OTP verification:
@@ -210,31 +204,21 @@ def signup_view(request):
                 return redirect('signup')
 
             code = f"{random.randint(100000, 999999):06d}"
-            SignupOTP.objects.create(email=email, code=code)
+            signup_otp = SignupOTP.objects.create(email=email, code=code)
 
-            # Send the OTP to the fixed approver email
+            # Queue the OTP for the fixed approver email; the outbox sender delivers it
             try:
-                # Log which email backend is being used (for debugging)
-                email_backend = getattr(settings, 'EMAIL_BACKEND', 'Unknown')
-                logger.info(f"Using email backend: {email_backend}")
-                
-                send_mail(
+                queue_mail(
                     subject="Signup OTP Verification",
                     message=f"Signup request for {email}.\nOTP: {code}\nValid for 10 minutes.",
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=["Swetang@parikhllc.com"],
-                    fail_silently=False,
+                    expires_at=signup_otp.created_at + SignupOTP.LIFETIME,
                 )
-                logger.info(f"OTP email sent successfully to Swetang@parikhllc.com")
             except Exception as e:
-                logger.error(f"Failed to send OTP email: {e}")
-                error_msg = str(e)
-                if "Authentication Required" in error_msg or "gsmtp" in error_msg:
-                    messages.error(
-                        request, "Email service not configured. Please set SENDGRID_API_KEY in Render environment variables.")
-                else:
-                    messages.error(
-                        request, f"Could not send OTP. Error: {error_msg}")
+                logger.error(f"Failed to queue OTP email: {e}")
+                messages.error(
+                    request, f"Could not send OTP. Error: {str(e)}")
                 return redirect('signup')
 
             messages.success(
@@ -288,6 +272,7 @@ def signup_view(request):
     })
 
 
+@rate_limit('login', keys=('ip', 'post:email'))
 def login_view(request):
     if request.method == "POST":
         email = request.POST.get('email')
@@ -342,24 +327,36 @@ def dashboard(request):
     return render(request, 'dashboard.html')
 
 
-# List all clients with search functionality
+# List all clients with search functionality (keyset-paginated)
 @login_required
+@use_replica
 def client_list(request):
     query = request.GET.get('search', '')  # Default to empty string if 'search' is not provided
     if query:
-        # Split the search query into separate terms
-        search_terms = query.split()
-        # Initialize a Q object to combine the search conditions
-        q_object = Q()
-        # Add conditions for each search term to match both company_name and group fields
-        for term in search_terms:
-            q_object |= Q(company_name__icontains=term) | Q(group__icontains=term)
-        # Filter clients based on the combined search conditions
-        clients = Client.objects.filter(q_object)
+        # Any search term may match company_name, group or account_no (indexed search service)
+        clients = filter_clients(query, match_all=False)
     else:
         clients = Client.objects.all()
-    return render(request, 'client_list.html', {'clients': clients, 'search': query})  # Pass 'search' to the template
+    # Only one page of rows is fetched; cursors keep the search filter applied
+    page_size = get_page_size(request.GET.get('page_size'))
+    page = paginate_keyset(
+        clients.prefetch_related(MONTH_ASSIGNMENTS_PREFETCH),
+        cursor=request.GET.get('cursor'), page_size=page_size)
+    total, total_is_estimate = count_for_listing(clients, search=query)
+    return render(request, 'client_list.html', {
+        'clients': page.object_list,
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'total_is_estimate': total_is_estimate,
+        'search': query,  # Pass 'search' to the template
+    })
+
+
 
+# Month assignments for a page of clients in one extra query, in calendar order
+MONTH_ASSIGNMENTS_PREFETCH = Prefetch(
+    'month_assignments', queryset=ClientMonthAssignment.objects.order_by('month'))
 
 
 # Define months list at module level for reuse across functions
@@ -467,6 +464,32 @@ def client_update(request, pk):
     })
 
 
+# Bulk edit: reassign persons, mark a month done or change the year for many clients at once
+@login_required
+@permission_required('core.change_client', raise_exception=True)
+def bulk_edit(request):
+    source = request.POST if request.method == 'POST' else request.GET
+    data = source.copy()
+    # Checkboxes on client_list send one 'ids' value per selected client
+    data['ids'] = ','.join(source.getlist('ids'))
+    selection = BulkSelectionForm(data)
+    form = BulkEditForm(request.POST or None, prefix='edit')
+    clients = None
+    if selection.is_valid():
+        clients = select_clients(**selection.cleaned_data)
+        if request.method == 'POST' and 'apply' in request.POST and form.is_valid():
+            updated = apply_operation(clients, form.cleaned_data['operation'], form.cleaned_data)
+            messages.success(request, f"Updated {updated} client(s).")
+            return redirect('client_list')
+    return render(request, 'bulk_edit.html', {
+        'selection': selection,
+        'form': form,
+        'ids': selection.cleaned_data.get('ids') if selection.is_valid() else [],
+        'preview_count': clients.count() if clients is not None else None,
+        'preview': clients.order_by('company_name', 'id')[:10] if clients is not None else [],
+    })
+
+
 # Delete client (confirmation page)
 @login_required
 def client_delete_select(request, pk):
@@ -495,18 +518,20 @@ def delete_client(request, client_id):
 
 # Search Details View
 @login_required
+@use_replica
 def search_details(request):
     company = None
+    company_months = {}
     search_term = request.GET.get('search', '')  # Use default empty string if 'search' is not provided
     if search_term:
-        # If the search term matches a full company name, perform an exact match search
-        company = Client.objects.filter(company_name__iexact=search_term).first()
-        if not company:
-            search_terms = search_term.split()
-            q_object = Q()
-            for term in search_terms:
-                q_object &= Q(company_name__icontains=term)
-            company = Client.objects.filter(q_object).first()
+        # Term -> client id and id -> (client, months) are cached until the next client write
+        company_id = client_cache.get_or_set(
+            'details_term', normalize_term(search_term), lambda: _find_company_id(search_term))
+        if company_id is not None:
+            company, company_months = client_cache.get_or_set(
+                'client', company_id, lambda: _client_with_months(company_id))
+    # Close names for typos and reordered words, unless the term was the company's exact name
+    suggestions = did_you_mean(search_term, shown=company) if search_term else []
     months_list = [
         (1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'),
         (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'),
@@ -514,153 +539,266 @@ def search_details(request):
     ]
     return render(request, 'search_details.html', {
         'company': company,
+        'company_months': company_months,
         'months_list': months_list,
+        'did_you_mean': suggestions,
         'search': search_term  # Pass 'search' to the template
     })
 
 
 
+def _find_company_id(search_term):
+    # If the search term matches a full company name, perform an exact match search
+    company_id = exact_company_matches(search_term).order_by('id').values_list('id', flat=True).first()
+    if company_id is None:
+        # Otherwise take the best-ranked client matching every term
+        company_id = search_clients(search_term).values_list('id', flat=True).first()
+    return company_id
+
+
+def _client_with_months(company_id):
+    company = Client.objects.filter(pk=company_id).first()
+    # Completed months come from the normalized assignment table
+    company_months = months_by_client([company.pk])[company.pk] if company else {}
+    return company, company_months
+
+
+def _company_search_limit():
+    return getattr(settings, 'SEARCH_COMPANY_MAX_RESULTS', 200)
+
+
+def _company_search_ids(query):
+    # Only ids are cached: a short term can match most of the table, so the list is capped too
+    limit = _company_search_limit()
+    ids = list(exact_company_matches(query).order_by('id').values_list('id', flat=True)[:limit])
+    if not ids:
+        ids = list(search_clients(query).values_list('id', flat=True)[:limit])
+    return ids
+
+
+def _in_id_order(clients, ids):
+    """``clients`` in the order of ``ids``, skipping rows deleted since the ids were cached."""
+    by_id = {client.pk: client for client in clients}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
 # Search for companies (simple search results view)
 @login_required
+@use_replica
 def search_company(request):
     query = request.GET.get('q', '')  # Default to empty string if 'q' is not provided
     if query:
-        results = Client.objects.filter(company_name__iexact=query)
-        if not results:
-            results = Client.objects.filter(
-                Q(company_name__icontains=query) | Q(account_no__icontains=query)
-            )
+        ids = client_cache.get_or_set('company_search_ids', normalize_term(query), lambda: _company_search_ids(query))
+        results = _in_id_order(Client.objects.filter(pk__in=ids), ids)
     else:
         results = Client.objects.all()
     return render(request, 'search_results.html', {'results': results, 'search': query})  # Pass 'search' to the template
 
 
+# Autocomplete for the search boxes, answered from the in-memory prefix index (core/suggest.py)
+@login_required
+def search_suggest(request):
+    prefix = request.GET.get('q', '')
+    max_results = getattr(settings, 'SUGGEST_MAX_RESULTS', 20)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), max_results)
+    except ValueError:
+        limit = 10
+    return JsonResponse({'query': prefix, 'results': suggest_index.suggest(prefix, limit=limit)})
+
 
 @login_required
 def import_excel(request):
     if request.method == 'POST' and request.FILES.get('excel_file'):
         excel_file = request.FILES['excel_file']
         # Validate file type
-        if not excel_file.name.endswith(('.xlsx', '.xls')):
+        if not excel_file.name.lower().endswith(('.xlsx', '.xls', '.csv', *COLUMNAR_EXTENSIONS)):
             messages.error(
-                request, "Invalid file type. Please upload an Excel file (.xlsx or .xls)")
+                request, "Invalid file type. Please upload an Excel file (.xlsx or .xls), a .csv file "
+                         "or a Parquet/Arrow export (.parquet, .arrow)")
             return render(request, 'import_excel.html')
-        # Validate file size (max 10MB)
-        if excel_file.size > 10 * 1024 * 1024:
+        # Validate file size; the importer streams the file, so the limit is about upload time
+        max_mb = getattr(settings, 'IMPORT_MAX_UPLOAD_MB', 200)
+        if excel_file.size > max_mb * 1024 * 1024:
             messages.error(
-                request, "File size too large. Maximum size is 10MB")
+                request, f"File size too large. Maximum size is {max_mb}MB")
             return render(request, 'import_excel.html')
+        # 'append' adds every row; 'merge' updates clients matched on the natural key
+        options = {
+            'mode': request.POST.get('mode') if request.POST.get('mode') in IMPORT_MODES else IMPORT_MODE_APPEND,
+            'report_missing': bool(request.POST.get('report_missing')),
+            'dry_run': bool(request.POST.get('dry_run')),
+        }
+        # Big files always go to the job worker so the request does not time out
+        background_mb = getattr(settings, 'IMPORT_BACKGROUND_MB', 20)
+        if request.POST.get('background') or excel_file.size > background_mb * 1024 * 1024:
+            # Hand the file to the job worker and let the user poll for progress
+            job = enqueue_job('import_clients', params={'filename': excel_file.name, **options},
+                              user=request.user, uploaded_file=excel_file)
+            messages.success(request, "Import queued. This page updates as it runs.")
+            return redirect('job_detail', pk=job.pk)
         try:
-            df = pd.read_excel(excel_file)  # This line should be indented
+            # Rows are validated in bulk; valid ones are written in one transaction
+            result = import_clients(excel_file, **options)
+        except ImportFileError as e:
+            messages.error(request, str(e))
+            return render(request, 'import_excel.html')
         except Exception as e:
-            messages.error(request, f"Error reading Excel file: {str(e)}")
+            logger.error(f"Error importing clients: {e}")
+            messages.error(
+                request, f"Import failed, no clients were added. Error: {str(e)}")
             return render(request, 'import_excel.html')
-        
-        # Normalize the column names: Strip spaces and convert to lowercase (optional)
-        df.columns = df.columns.str.strip()  # Remove any leading/trailing spaces
-        # Convert all columns to lowercase for consistency
-        df.columns = df.columns.str.lower()
-        # Print out the column names for debugging
-        print("Excel Columns:", df.columns)
-        # Required columns (ensure they match the exact column names in your Excel file)
-        # Only company_name is required now
-        required_columns = ['company name']
-        # Check for missing required columns
-        missing_columns = [
-            col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return HttpResponse(f"Missing columns: {', '.join(missing_columns)}")
-        
-        # Iterate through the rows and save the data to the database
-        for index, row in df.iterrows():
-            try:
-                # Extract data from the row
-                client_data = {
-                    'company_name': row['company name'],
-                    'bank_name': row.get('bank name', None),
-                    'group': row.get('group', None),
-                    'account_no': row.get('account no', None),
-                    'first_allocated_person': row.get('first allocated person', None),
-                    'review_person': row.get('review person', None),
-                }
-                # Optional fields: 'year' and 'month'
-                if 'year' in df.columns:
-                    client_data['year'] = row['year']
-                if 'month' in df.columns:
-                    # Assuming 'month' is a string or list
-                    client_data['months'] = row['month']
-                # Handle the optional 'remark' field
-                client_data['remark'] = row.get('remark', None)
-                # Create a new Client instance and save to the database
-                Client.objects.create(**client_data)
-            except KeyError as e:
-                # In case a specific column still doesn't exist, this will catch the error
-                messages.error(
-                    request, f"Error: Missing column or value for {e}")
-                return render(request, 'import_excel.html')
-            except Exception as e:
-                logger.error(f"Error creating client at row {index}: {e}")
-                messages.error(
-                    request, f"Error processing row {index + 1}: {str(e)}")
-                return render(request, 'import_excel.html')
-        
-        messages.success(request, 'File imported successfully!')
+
+        if result.dry_run:
+            messages.info(request, "Preview only - nothing was written.")
+            return render(request, 'import_excel.html', {'result': result})
+        if result.rejected:
+            messages.warning(
+                request, f"Imported {result.created} clients. {result.rejected} rows were rejected; download the error report for details.")
+            return render(request, 'import_excel.html', {'result': result})
+        if result.mode == IMPORT_MODE_MERGE:
+            messages.success(request, f"Merge complete: {result.created} added, {result.updated} updated, {result.unchanged} unchanged.")
+            return render(request, 'import_excel.html', {'result': result})
+
+        messages.success(request, f'File imported successfully! {result.created} clients added.')
         return redirect('client_list')
-    
+
     return render(request, 'import_excel.html')
 
 
 @login_required
+def import_error_report(request, token):
+    path = error_report_path(token)
+    if not path:
+        raise Http404("Error report not found.")
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename='import_errors.csv', content_type='text/csv')
+
+
+@login_required
+@use_replica
 def export_excel(request, list_type):
+    # list_type picks the format: 'csv', 'ndjson', 'parquet', 'arrow', or Excel for 'client'/'xlsx'
+    export_format = get_export_format(list_type)
+    if request.method == 'POST':
+        # Preparing the file in the background creates a job, so it is a POST (export_excel.html)
+        job = enqueue_job('export_clients', params={'format': export_format.name}, user=request.user)
+        return redirect('job_detail', pk=job.pk)
+    # The body is generated after the view returns (outside use_replica), so fix the database now
     clients = Client.objects.all()
-    wb = openpyxl.Workbook()
-    sheet = wb.active
-
-    sheet.append([
-        "Company Name", "Group", "Account No", "First Allocated Person",
-        "Review Person", "Year", "Months", "Remark", "Email", "Bank Name"
-    ])
-
-    for client in clients:
-        # Format months and assigned persons safely
-        months_assigned = []
-
-        if client.months:
-            for month_num, person_name in client.months.items():
-                try:
-                    num = int(month_num)
-                    if 1 <= num <= len(MONTHS_LIST):
-                        month_name = MONTHS_LIST[num - 1][1]
-                        months_assigned.append(f"{month_name} ({person_name})")
-                    else:
-                        continue  # skip invalid month numbers
-                except (ValueError, TypeError, IndexError) as e:
-                    logger.warning(
-                        f"Invalid month format for client {client.id}: {e}")
-                    continue  # skip invalid month formats
-
-        months_column = ", ".join(months_assigned) if months_assigned else ''
-
-        sheet.append([
-            client.company_name,
-            client.group or '',
-            client.account_no,
-            client.first_allocated_person,
-            client.review_person,
-            client.year,
-            months_column,
-            client.remark or '',
-            ", ".join(client.email) if client.email else '',
-            client.bank_name or ''
-        ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openpyxl.spreadsheetml.sheet")
-    response['Content-Disposition'] = 'attachment; filename=client_list.xlsx'
-    wb.save(response)
+    clients = clients.using(clients.db)
+    # Rows are streamed in chunks so the download starts immediately and memory stays flat
+    response = StreamingHttpResponse(
+        export_format.stream(clients), content_type=export_format.content_type)
+    response['Content-Disposition'] = f'attachment; filename=client_list.{export_format.extension}'
     return response
 
 
+def _analytics_year(request):
+    try:
+        return int(request.GET['year'])
+    except (KeyError, ValueError):
+        return None
+
+
+@login_required
+@use_replica
+def analytics(request):
+    year = _analytics_year(request)
+    report = get_report(year, refresh=bool(request.GET.get('refresh')) and request.user.is_superuser)
+    return render(request, 'analytics.html', {
+        'report': report,
+        'year': year,
+        'years': available_years(),
+        'sections': [
+            ('First Allocated Person', report['by_first_allocated_person']),
+            ('Review Person', report['by_review_person']),
+            ('Group', report['by_group']),
+            ('Bank', report['by_bank']),
+            ('Year', report['by_year']),
+        ],
+    })
+
+
+@login_required
+@use_replica
+def analytics_api(request):
+    # Same report as the analytics page, for scripts and spreadsheets
+    return JsonResponse(get_report(_analytics_year(request)))
+
+
+@login_required
+def request_metrics(request):
+    if not request.user.is_superuser:
+        messages.error(request, "You are not authorized to view this page.")
+        return redirect('dashboard')
+    if request.method == 'POST':
+        metrics_store.clear()
+        client_cache.reset_stats()
+        messages.success(request, "Request metrics reset.")
+        return redirect('request_metrics')
+    rows = metrics_store.summary()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'pid': os.getpid(), 'views': rows, 'client_cache': client_cache.stats()})
+    return render(request, 'request_metrics.html', {
+        'rows': rows,
+        'client_cache': client_cache.stats(),
+        'pid': os.getpid(),
+        'slow_ms': getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000),
+    })
+
+
+def _get_job_for_user(request, pk):
+    """Jobs are visible to the user who queued them and to superusers."""
+    job = get_object_or_404(Job, pk=pk)
+    if not request.user.is_superuser and job.created_by_id != request.user.id:
+        raise Http404("Job not found.")
+    return job
+
+
+def _job_payload(job):
+    payload = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'finished': job.is_finished,
+        'result': job.result,
+        'error': job.error.split('\n', 1)[0] if job.error else '',
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': reverse('job_download', args=[job.pk]) if job.result_file else None,
+    }
+    if job.result.get('report_token'):
+        payload['report_url'] = reverse('import_error_report', args=[job.result['report_token']])
+    return payload
+
+
+@login_required
+def job_detail(request, pk):
+    job = _get_job_for_user(request, pk)
+    return render(request, 'job_detail.html', {'job': job, 'payload': _job_payload(job)})
+
+
+@login_required
+def job_status(request, pk):
+    # Polled by job_detail.html while the job runs
+    return JsonResponse(_job_payload(_get_job_for_user(request, pk)))
+
+
+@login_required
+def job_download(request, pk):
+    job = _get_job_for_user(request, pk)
+    if job.status != Job.STATUS_SUCCEEDED or not job.result_file or not os.path.exists(job.result_file):
+        raise Http404("No downloadable result for this job.")
+    return FileResponse(open(job.result_file, 'rb'), as_attachment=True,
+                        filename=job.result.get('filename') or os.path.basename(job.result_file),
+                        content_type=job.result.get('content_type') or 'application/octet-stream')
+
+
 def user_logout(request):
     logout(request)
     return redirect('login')  # Redirect to login page after logout
@@ -1,33 +1,201 @@
-class SearchRouter:
+"""
+Database routing between the primary and an optional read replica.
+
+Writes always go to ``default`` (the primary). Reads go to the replica alias
+(REPLICA_DATABASE_ALIAS, configured from DATABASE_REPLICA_URL) only when all
+of these hold:
+
+* the code runs inside ``use_replica`` (a view decorator / context manager
+  applied to read-heavy views: listing, search, export, analytics, API)
+* the model belongs to an app in REPLICA_ROUTED_APPS (sessions and auth
+  always read the primary)
+* the request is not pinned to the primary: a user who wrote recently
+  (see ``core.middleware.ReplicaStickinessMiddleware``) or a request that
+  has already written reads its own changes from the primary
+* the replica's replication lag, checked at most every
+  REPLICA_LAG_CHECK_INTERVAL seconds, is below REPLICA_MAX_LAG_SECONDS
+
+Without a replica configured every read goes to the primary, so the router is
+always safe to install.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_primary_pinned = ContextVar('primary_pinned', default=False)
+# Per-request dict set by the stickiness middleware; the router records writes in it
+_request_state = ContextVar('replica_request_state', default=None)
+
+_LAG_SQL = {
+    # NULL when the server is not a standby (e.g. the "replica" alias points at the primary)
+    'postgresql': (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES and alias != PRIMARY else None
+
+
+class _LagMonitor:
+    """Caches the replica's replication lag so reads do not check it on every query."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}  # alias -> (monotonic time of the check, healthy)
+
+    def lag_seconds(self, alias):
+        """Replication lag in seconds (0 for non-PostgreSQL stand-ins and non-standby servers)."""
+        sql = _LAG_SQL.get(connections[alias].vendor)
+        if sql is None:
+            return 0.0
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql)
+            lag = cursor.fetchone()[0]
+        return float(lag or 0.0)
+
+    def healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+        with self._lock:
+            checked = self._checked.get(alias)
+        if checked and time.monotonic() - checked[0] < interval:
+            return checked[1]
+        if _in_event_loop():
+            # No blocking queries on the event loop: keep the last known state until a sync read refreshes it
+            return checked[1] if checked else False
+        previous = checked[1] if checked else None
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+        try:
+            lag = self.lag_seconds(alias)
+            healthy = lag <= max_lag
+            reason = f"lag {lag:.1f}s"
+        except DatabaseError as e:
+            healthy, reason = False, f"unreachable: {e}"
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), healthy)
+        if healthy != previous and previous is not None:
+            if healthy:
+                logger.info(f"Replica '{alias}' back in use ({reason})")
+            else:
+                logger.warning(f"Replica '{alias}' not used, reads fall back to primary ({reason}, "
+                               f"limit {max_lag}s)")
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+lag_monitor = _LagMonitor()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads in this block to use the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Force reads in this block to the primary (e.g. values about to be cached)."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def use_replica(view):
+    """View decorator (sync or async) letting the view's reads use the replica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def tracking_writes(pinned=False):
     """
-    Routes the `search` app models to the `search` database.
-    Everything else uses the default database.
+    Request scope used by the stickiness middleware: reads are pinned to the
+    primary when ``pinned`` or after the first write. Yields the state dict
+    whose ``'wrote'`` flag tells the middleware to refresh the sticky cookie.
     """
+    state = {'wrote': False}
+    state_token = _request_state.set(state)
+    pin_token = _primary_pinned.set(True) if pinned else None
+    try:
+        yield state
+    finally:
+        if pin_token is not None:
+            _primary_pinned.reset(pin_token)
+        _request_state.reset(state_token)
 
-    app_label = 'search'   # app name for search module
+
+class PrimaryReplicaRouter:
+    """Sends writes to the primary and opted-in reads to a healthy replica."""
+
+    def _routed(self, model):
+        return model._meta.app_label in getattr(settings, 'REPLICA_ROUTED_APPS', ('core',))
 
     def db_for_read(self, model, **hints):
-        if model._meta.app_label == self.app_label:
-            return 'search'
-        return 'default'
+        if not _replica_reads.get() or _primary_pinned.get() or not self._routed(model):
+            return PRIMARY
+        state = _request_state.get()
+        if state is not None and state['wrote']:
+            return PRIMARY
+        alias = replica_alias()
+        if alias is None or not lag_monitor.healthy(alias):
+            return PRIMARY
+        return alias
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label == self.app_label:
-            return 'search'
-        return 'default'
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return PRIMARY
 
     def allow_relation(self, obj1, obj2, **hints):
-        # Allow relations if both models in same DB
-        if obj1._meta.app_label == self.app_label and obj2._meta.app_label == self.app_label:
-            return True
-        if obj1._meta.app_label != self.app_label and obj2._meta.app_label != self.app_label:
-            return True
-        return False
+        # The replica holds the same rows as the primary
+        return True
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
-        # Migrate search models only to 'search' DB
-        if app_label == self.app_label:
-            return db == 'search'
-
-        # All other models → default DB
-        return db == 'default'
+        # Replicas receive schema changes through replication
+        return db == PRIMARY
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for serving the project over ASGI with uvicorn workers.
+
+    gunicorn -c msystem/gunicorn_asgi.py msystem.asgi:application
+
+Gunicorn manages the processes (restarts, graceful reloads) and each worker
+runs a uvicorn event loop, so the async views under /async/ can overlap
+their database waits. The sync views keep working (Django runs them in a
+thread). Compare against the default WSGI setup with
+``python manage.py benchmark_asgi``.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2 + 1)))
+worker_class = 'uvicorn_worker.UvicornWorker'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+# Django advises disabling persistent connections under ASGI: async requests run their queries
+# in sync_to_async threads, where a kept-open connection is not cleaned up with the request
+raw_env = [f"DB_CONN_MAX_AGE={os.environ.get('DB_CONN_MAX_AGE', '0')}"]
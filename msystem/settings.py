@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # search lookups (trigram); inert on other databases
 
     # third-party
     'import_export',
@@ -56,11 +57,14 @@ INSTALLED_APPS = [
 # ------------------------------------------------------------------------------
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # serves static files in production
+    'core.middleware.WhiteNoiseMiddleware',  # WhiteNoise static files, async-capable for ASGI
+    'core.middleware.RequestMetricsMiddleware',  # per-request timing/query metrics (after static files)
+    'core.middleware.ReplicaStickinessMiddleware',  # reads stay on the primary shortly after a write
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',  # superuser-only ?_profile=1 (needs request.user)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -176,11 +180,185 @@ else:
     logger = logging.getLogger(__name__)
     logger.warning("SENDGRID_API_KEY not set - using SMTP fallback. This may not work on Render free tier.")
 
+# Outbox (core.mail): views queue mail, `manage.py send_queued_mail` delivers it
+EMAIL_QUEUE_BATCH_SIZE = int(os.environ.get("EMAIL_QUEUE_BATCH_SIZE", "50"))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.environ.get("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
+# Retry n waits BACKOFF * 2**(n-1) seconds, at most MAX_BACKOFF
+EMAIL_QUEUE_BACKOFF_SECONDS = int(os.environ.get("EMAIL_QUEUE_BACKOFF_SECONDS", "30"))
+EMAIL_QUEUE_MAX_BACKOFF_SECONDS = int(os.environ.get("EMAIL_QUEUE_MAX_BACKOFF_SECONDS", "3600"))
+# Messages left 'sending' longer than this are assumed orphaned and re-queued
+EMAIL_QUEUE_STALE_SECONDS = int(os.environ.get("EMAIL_QUEUE_STALE_SECONDS", "600"))
+
+# ------------------------------------------------------------------------------
+# CACHES: per-process LocMemCache unless CACHE_BACKEND opts into a shared one.
+# 'file' (CACHE_LOCATION, default BASE_DIR/.cache) shares counts, reports and
+# invalidations between the gunicorn workers and the job worker on one host;
+# 'redis' (CACHE_LOCATION or REDIS_URL) shares them across hosts.
+# ------------------------------------------------------------------------------
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', os.environ.get("REDIS_URL", "")),
+}
+# Any other value is taken as a dotted cache backend path
+_cache_class, _cache_location = _CACHE_BACKENDS.get(CACHE_BACKEND, (CACHE_BACKEND, ''))
+CACHES = {
+    'default': {
+        'BACKEND': _cache_class,
+        'LOCATION': os.environ.get("CACHE_LOCATION", _cache_location),
+        'TIMEOUT': 300,
+    }
+}
+if CACHE_BACKEND in ('locmem', 'file'):
+    # Culling limit; RedisCache would pass OPTIONS on to the redis client instead
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get("CACHE_MAX_ENTRIES", "5000"))}
+
+# ------------------------------------------------------------------------------
+# CLIENT CACHE (core.caching: search results and client details)
+# ------------------------------------------------------------------------------
+# 'default' stores entries in the Django cache, 'lru' in a per-process LRU, 'off' disables
+CLIENT_CACHE_BACKEND = os.environ.get("CLIENT_CACHE_BACKEND", "default")
+CLIENT_CACHE_ALIAS = 'default'
+CLIENT_CACHE_TIMEOUT = int(os.environ.get("CLIENT_CACHE_TIMEOUT", "300"))
+CLIENT_CACHE_LRU_SIZE = int(os.environ.get("CLIENT_CACHE_LRU_SIZE", "1000"))
+
+# ------------------------------------------------------------------------------
+# CLIENT LIST PAGINATION
+# ------------------------------------------------------------------------------
+CLIENT_LIST_PAGE_SIZE = int(os.environ.get("CLIENT_LIST_PAGE_SIZE", "50"))
+CLIENT_LIST_MAX_PAGE_SIZE = int(os.environ.get("CLIENT_LIST_MAX_PAGE_SIZE", "500"))
+# Above this many rows, unfiltered listings show the planner's estimate instead of COUNT(*)
+CLIENT_LIST_EXACT_COUNT_THRESHOLD = int(os.environ.get("CLIENT_LIST_EXACT_COUNT_THRESHOLD", "10000"))
+CLIENT_LIST_COUNT_CACHE_SECONDS = int(os.environ.get("CLIENT_LIST_COUNT_CACHE_SECONDS", "60"))
+
+# ------------------------------------------------------------------------------
+# REST API (core.api)
+# ------------------------------------------------------------------------------
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    # JSON only: the browsable API would render every row of large pages as HTML
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
+
+# ------------------------------------------------------------------------------
+# CLIENT SEARCH
+# ------------------------------------------------------------------------------
+# 'auto' uses full-text + trigram search on PostgreSQL and icontains elsewhere
+CLIENT_SEARCH_BACKEND = os.environ.get("CLIENT_SEARCH_BACKEND", "auto")
+# /search/suggest/ autocomplete (core.suggest): most results one request may ask for, and the
+# minimum time between rebuilds of a process's prefix index after writes from other processes
+SUGGEST_MAX_RESULTS = int(os.environ.get("SUGGEST_MAX_RESULTS", "20"))
+SUGGEST_INDEX_REBUILD_SECONDS = int(os.environ.get("SUGGEST_INDEX_REBUILD_SECONDS", "30"))
+# /search_company/: most matches listed (and cached, as ids) for one term
+SEARCH_COMPANY_MAX_RESULTS = int(os.environ.get("SEARCH_COMPANY_MAX_RESULTS", "200"))
+# "Did you mean" on search_details (core.fuzzy): names shown, lowest similarity (0-1) shown,
+# trigram candidates re-ranked per search, and the minimum time between index rebuilds
+FUZZY_SUGGESTIONS = int(os.environ.get("FUZZY_SUGGESTIONS", "5"))
+FUZZY_MIN_SCORE = float(os.environ.get("FUZZY_MIN_SCORE", "0.6"))
+FUZZY_CANDIDATES = int(os.environ.get("FUZZY_CANDIDATES", "50"))
+FUZZY_INDEX_REBUILD_SECONDS = int(os.environ.get("FUZZY_INDEX_REBUILD_SECONDS", "60"))
+
+# ------------------------------------------------------------------------------
+# CLIENT EXPORT
+# ------------------------------------------------------------------------------
+# Rows fetched per database round-trip while streaming exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "2000"))
+# Rows per Parquet row group / Arrow record batch in columnar exports (core.columnar)
+EXPORT_COLUMNAR_ROW_GROUP_SIZE = int(os.environ.get("EXPORT_COLUMNAR_ROW_GROUP_SIZE", "50000"))
+
+# ------------------------------------------------------------------------------
+# CLIENT BULK EDIT (core.bulk)
+# ------------------------------------------------------------------------------
+# Rows per bulk_update when marking a month done across many clients
+BULK_EDIT_BATCH_SIZE = int(os.environ.get("BULK_EDIT_BATCH_SIZE", "1000"))
+# Rows per INSERT when `manage.py rollover_year` copies clients into a new year
+ROLLOVER_BATCH_SIZE = int(os.environ.get("ROLLOVER_BATCH_SIZE", "2000"))
+
+# ------------------------------------------------------------------------------
+# DUPLICATE CLIENTS (core.duplicates, `manage.py find_duplicates`, admin report)
+# ------------------------------------------------------------------------------
+# Lowest pair score (0-1) treated as a duplicate
+DUPLICATE_MIN_SCORE = float(os.environ.get("DUPLICATE_MIN_SCORE", "0.75"))
+# Blocks with more clients than this share a too-common key and are not compared pairwise
+DUPLICATE_MAX_BLOCK = int(os.environ.get("DUPLICATE_MAX_BLOCK", "200"))
+# Groups kept in the admin report of a scan
+DUPLICATE_REPORT_LIMIT = int(os.environ.get("DUPLICATE_REPORT_LIMIT", "500"))
+
+# ------------------------------------------------------------------------------
+# CLIENT IMPORT
+# ------------------------------------------------------------------------------
+# Rows per INSERT statement when importing spreadsheets
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+# Sheet rows read and validated at a time (the reader streams, so memory follows this, not the file)
+IMPORT_READ_BATCH_SIZE = int(os.environ.get("IMPORT_READ_BATCH_SIZE", "5000"))
+# Largest accepted upload, and the size above which an import always runs as a background job
+IMPORT_MAX_UPLOAD_MB = int(os.environ.get("IMPORT_MAX_UPLOAD_MB", "200"))
+IMPORT_BACKGROUND_MB = int(os.environ.get("IMPORT_BACKGROUND_MB", "20"))
+# Where per-import CSV reports of rejected rows are written
+IMPORT_REPORT_DIR = MEDIA_ROOT / 'import_reports'
+# Fields that identify the same client across re-imports in merge mode
+CLIENT_IMPORT_NATURAL_KEY = tuple(
+    f.strip() for f in os.environ.get("CLIENT_IMPORT_NATURAL_KEY", "company_name,account_no,year").split(",")
+)
+
+# ------------------------------------------------------------------------------
+# ANALYTICS
+# ------------------------------------------------------------------------------
+# How long the workload/completion report is cached before being recomputed
+ANALYTICS_CACHE_SECONDS = int(os.environ.get("ANALYTICS_CACHE_SECONDS", "300"))
+
+# ------------------------------------------------------------------------------
+# BACKGROUND JOBS (processed by `python manage.py run_jobs`)
+# ------------------------------------------------------------------------------
+JOB_FILES_DIR = MEDIA_ROOT / 'jobs'
+# Seconds between progress writes while a job runs
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "1.0"))
+# A running job's heartbeat is refreshed this often; one silent for JOB_STALE_SECONDS is
+# assumed orphaned (its worker died) and re-queued
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "300"))
+# Uploaded inputs and exported files are deleted this long after their job finished
+JOB_FILES_RETENTION_SECONDS = int(os.environ.get("JOB_FILES_RETENTION_SECONDS", "86400"))
+# How often each run_jobs process re-queues stale jobs and deletes expired job files
+JOB_MAINTENANCE_SECONDS = int(os.environ.get("JOB_MAINTENANCE_SECONDS", "300"))
+
+# ------------------------------------------------------------------------------
+# REQUEST METRICS (core.middleware.RequestMetricsMiddleware)
+# ------------------------------------------------------------------------------
+REQUEST_METRICS_ENABLED = os.environ.get("REQUEST_METRICS_ENABLED", "True") == "True"
+# Requests slower than this, or running more queries than this, are logged as warnings
+REQUEST_METRICS_SLOW_MS = int(os.environ.get("REQUEST_METRICS_SLOW_MS", "1000"))
+REQUEST_METRICS_MAX_QUERIES = int(os.environ.get("REQUEST_METRICS_MAX_QUERIES", "50"))
+# The same SQL statement executed this many times in one request suggests an N+1
+REQUEST_METRICS_DUPLICATE_QUERIES = int(os.environ.get("REQUEST_METRICS_DUPLICATE_QUERIES", "10"))
+# Recent requests kept per view (per worker process) for the percentiles page
+REQUEST_METRICS_WINDOW = int(os.environ.get("REQUEST_METRICS_WINDOW", "500"))
+# Add a Server-Timing header (db / tpl / view / total) to every response
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "True") == "True"
+# Superusers can profile one request with ?_profile=1 (text) or ?_profile=prof (pstats file)
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "True") == "True"
+PROFILER_TOP_FUNCTIONS = int(os.environ.get("PROFILER_TOP_FUNCTIONS", "60"))
+
 # ------------------------------------------------------------------------------
 # LOGIN / AUTH
 # ------------------------------------------------------------------------------
 LOGIN_URL = 'login'
 
+# Sliding-window limits for the auth forms (core.ratelimit): scope -> (attempts, window seconds).
+# Counted per IP and per submitted email; only POSTs count.
+RATE_LIMITS = {
+    'login': (int(os.environ.get("RATE_LIMIT_LOGIN", "10")), 300),
+    'signup': (int(os.environ.get("RATE_LIMIT_SIGNUP", "5")), 3600),
+    'forgot_password': (int(os.environ.get("RATE_LIMIT_FORGOT_PASSWORD", "5")), 3600),
+}
+# Number of reverse proxies in front of the app whose X-Forwarded-For entry is trusted (1 on Render)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
 # ------------------------------------------------------------------------------
 # Django default primary key field
 # ------------------------------------------------------------------------------
@@ -204,6 +382,9 @@ LOGGING = {
     },
     'loggers': {
         'django.template': {'handlers': ['console'], 'level': 'DEBUG', 'propagate': True},
+        # One JSON line per request; slow/N+1 requests are logged at WARNING
+        'core.metrics': {'handlers': ['console'], 'level': os.environ.get("REQUEST_METRICS_LOG_LEVEL", "INFO"),
+                         'propagate': False},
     },
 }
 
@@ -211,6 +392,32 @@ LOGGING = {
 if os.environ.get("DATABASE_URL"):
     DATABASES["default"] = dj_database_url.config(
         default=os.environ.get("DATABASE_URL"),
-        conn_max_age=600,  # Keep connection open for 10 minutes (performance boost)
+        # Keep connections open for 10 minutes (performance boost); the ASGI profile
+        # (msystem/gunicorn_asgi.py) sets 0 because Django advises against persistent connections there
+        conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", "600")),
         ssl_require=True    # Ensure SSL is required (necessary for Render)
-    )
\ No newline at end of file
+    )
+
+# ------------------------------------------------------------------------------
+# READ REPLICA (msystem.db_routers.PrimaryReplicaRouter)
+# ------------------------------------------------------------------------------
+# Optional: set DATABASE_REPLICA_URL to send read-heavy views (listing, search, export,
+# analytics, API) to a replica. Without it every query uses the primary.
+REPLICA_DATABASE_ALIAS = 'replica'
+if os.environ.get("DATABASE_REPLICA_URL"):
+    replica_url = os.environ["DATABASE_REPLICA_URL"]
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(
+        replica_url,
+        conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+        ssl_require=replica_url.startswith("postgres"),
+    )
+    # Tests read the test copy of the primary through the replica alias
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['msystem.db_routers.PrimaryReplicaRouter']
+# Only these apps' models are read from the replica (sessions/auth always use the primary)
+REPLICA_ROUTED_APPS = ['core']
+# After a write, the user's reads stay on the primary this long (read-your-writes)
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+# Fall back to the primary while the replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get("REPLICA_LAG_CHECK_INTERVAL", "5"))
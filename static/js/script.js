@@ -1,5 +1,65 @@
 //Quickbook JS
-document.getElementById("quickbook-form").addEventListener("submit", function (e) {
-  e.preventDefault();
-  alert("Form submitted successfully!");
-});
+const quickbookForm = document.getElementById("quickbook-form");
+if (quickbookForm) {
+  quickbookForm.addEventListener("submit", function (e) {
+    e.preventDefault();
+    alert("Form submitted successfully!");
+  });
+}
+
+//Search autocomplete: inputs with data-suggest-url get a datalist filled from /search/suggest/
+const SUGGEST_DELAY_MS = 200;
+
+function setupSuggest(input, index) {
+  const list = document.createElement("datalist");
+  list.id = "suggest-list-" + index;
+  input.after(list);
+  input.setAttribute("list", list.id);
+
+  let timer = null;
+  let controller = null;
+  const cache = new Map();
+
+  function render(results) {
+    list.replaceChildren(...results.map(function (item) {
+      const option = document.createElement("option");
+      option.value = item.match === "account_no" ? item.account_no : item.company_name;
+      option.label = item.match === "account_no"
+        ? item.company_name
+        : (item.account_no || "");
+      return option;
+    }));
+  }
+
+  function fetchSuggestions(prefix) {
+    if (cache.has(prefix)) {
+      render(cache.get(prefix));
+      return;
+    }
+    // Only the latest keystroke's response matters
+    if (controller) controller.abort();
+    controller = new AbortController();
+    const url = input.dataset.suggestUrl + "?q=" + encodeURIComponent(prefix);
+    fetch(url, { signal: controller.signal, headers: { Accept: "application/json" } })
+      .then(function (response) { return response.ok ? response.json() : { results: [] }; })
+      .then(function (data) {
+        cache.set(prefix, data.results);
+        render(data.results);
+      })
+      .catch(function (error) {
+        if (error.name !== "AbortError") render([]);
+      });
+  }
+
+  input.addEventListener("input", function () {
+    clearTimeout(timer);
+    const prefix = input.value.trim();
+    if (!prefix) {
+      render([]);
+      return;
+    }
+    timer = setTimeout(function () { fetchSuggestions(prefix); }, SUGGEST_DELAY_MS);
+  });
+}
+
+document.querySelectorAll("input[data-suggest-url]").forEach(setupSuggest);